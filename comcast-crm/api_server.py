@@ -4,25 +4,62 @@ Comcast CRM API Server
 Serves map data and accepts WhatsApp webhook updates
 """
 
+import argparse
 import json
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 import sqlite3
 
-# Add parent dir to path
-sys.path.insert(0, '/Users/xfinch/.openclaw/workspace/comcast-crm')
-from ghl_sync import GHLComcastSync
+from config import BASE_DIR, DB_PATH, MAP_DIR
 
-DB_PATH = "/Users/xfinch/.openclaw/workspace/comcast-crm/comcast.db"
+_local = threading.local()
+
+MAX_BODY_BYTES = 1024 * 1024
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """One connection per server thread, reused across requests"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
     return conn
 
+class StaticCache:
+    """In-memory copies of served files, re-read when the file's mtime or size changes"""
+    
+    def __init__(self):
+        self._files = {}
+        self._lock = threading.Lock()
+    
+    def get(self, filepath):
+        """(bytes, etag) for filepath; raises FileNotFoundError"""
+        stat = os.stat(filepath)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(filepath)
+        if cached is None or cached[0] != version:
+            with open(filepath, 'rb') as f:
+                content = f.read()
+            cached = (version, content, f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"')
+            with self._lock:
+                self._files[filepath] = cached
+        return cached[1], cached[2]
+
+static_cache = StaticCache()
+
 class APIHandler(BaseHTTPRequestHandler):
+    # Keep-alive; every response carries Content-Length
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections give their worker back after this many seconds
+    timeout = 5
+    # Headers and body go out in separate writes; without this, Nagle + delayed ACK
+    # adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+    
     def log_message(self, format, *args):
         # Suppress default logging
         pass
@@ -48,15 +85,23 @@ class APIHandler(BaseHTTPRequestHandler):
             self.send_error(404)
     
     def serve_html(self, filepath, content_type='text/html'):
-        """Serve static HTML file"""
+        """Serve static HTML file from the in-memory cache"""
         try:
-            with open(filepath, 'r') as f:
-                content = f.read()
+            content, etag = static_cache.get(filepath)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
             self.send_response(200)
             self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(content)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(content.encode())
+            self.wfile.write(content)
         except FileNotFoundError:
             self.send_error(404)
         except Exception as e:
@@ -64,32 +109,54 @@ class APIHandler(BaseHTTPRequestHandler):
     
     def serve_review_html(self):
         """Serve review queue page"""
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.serve_html(os.path.join(script_dir, 'review.html'))
+        self.serve_html(os.path.join(BASE_DIR, 'review.html'))
     
     def serve_map_html(self):
         """Serve main map page"""
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        parent_dir = os.path.dirname(script_dir)
-        self.serve_html(os.path.join(parent_dir, 'comcast', 'index.html'))
+        self.serve_html(os.path.join(MAP_DIR, 'index.html'))
+    
+    def handle_one_request(self):
+        super().handle_one_request()
+        # Give the worker back when other connections are queued behind this idle keep-alive one
+        if getattr(self.server, 'saturated', lambda: False)():
+            self.close_connection = True
+    
+    def read_body(self):
+        """Request body, always consumed so a keep-alive connection stays in sync.
+        None after an error response has been sent (and the connection marked for closing)."""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or content_length > MAX_BODY_BYTES:
+            # The body can't be skipped safely - answer and drop the connection
+            self.close_connection = True
+            self.send_json({"error": "bad or oversized Content-Length"}, 413 if content_length > 0 else 400)
+            return None
+        return self.rfile.read(content_length)
     
     def do_POST(self):
         parsed = urlparse(self.path)
         path = parsed.path
         
+        body = self.read_body()
+        if body is None:
+            return
         if path == '/api/visits':
-            self.handle_create_visit()
+            self.handle_create_visit(body)
         elif path == '/api/whatsapp':
-            self.handle_whatsapp_webhook()
+            self.handle_whatsapp_webhook(body)
         else:
             self.send_error(404)
     
     def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(body)
     
     def handle_get_visits(self):
         """Get all visits with coordinates for map"""
@@ -182,18 +249,17 @@ class APIHandler(BaseHTTPRequestHandler):
             "by_zip": by_zip
         })
     
-    def handle_create_visit(self):
+    def handle_create_visit(self, body):
         """Create new visit from API"""
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length)
-        
         try:
             data = json.loads(body)
         except:
             self.send_json({"error": "Invalid JSON"}, 400)
             return
         
-        sync = GHLComcastSync()
+        from ghl_sync import GHLComcastSync  # write path only
+        
+        sync = GHLComcastSync(DB_PATH)
         visit_id = sync.add_visit(
             business_name=data.get('business_name', ''),
             zip_code=data.get('zip_code', ''),
@@ -212,32 +278,97 @@ class APIHandler(BaseHTTPRequestHandler):
         
         self.send_json({"id": visit_id, "status": "created"}, 201)
     
-    def handle_whatsapp_webhook(self):
+    def handle_whatsapp_webhook(self, body):
         """Handle incoming WhatsApp messages"""
-        content_length = int(self.headers.get('Content-Length', 0))
-        body = self.rfile.read(content_length)
-        
         try:
             data = json.loads(body)
             message = data.get('message', '')
             
-            # TODO: Parse message using NLP
-            # For now, just log it
+            from ghl_sync import GHLComcastSync  # write path only
+            from message_parser import parse_message
+            
+            parsed = parse_message(message)
+            visit_id = GHLComcastSync(DB_PATH).add_visit(**parsed.to_visit_kwargs('whatsapp')) if parsed.is_visit else None
+            
+            # Every raw message stays in the log; ones without a business or zip wait there for review
             conn = get_db()
             cursor = conn.cursor()
             cursor.execute("""
-                INSERT INTO sync_log (action, table_name, status, message)
-                VALUES (?, ?, ?, ?)
-            """, ('whatsapp_webhook', 'incoming', 'received', message[:500]))
+                INSERT INTO sync_log (action, table_name, record_id, status, message)
+                VALUES (?, ?, ?, ?, ?)
+            """, ('whatsapp_webhook', 'incoming', visit_id, 'parsed' if visit_id else 'unparsed', message[:500]))
             conn.commit()
             
-            self.send_json({"status": "received"})
+            if visit_id:
+                self.send_json({"status": "received", "visitId": visit_id})
+                return
+            
+            self.send_json({"status": "received", "missing": parsed.missing})
         except Exception as e:
             self.send_json({"error": str(e)}, 500)
 
-def run_server(port=8081):
-    server = HTTPServer(('127.0.0.1', port), APIHandler)
-    print(f"Comcast CRM API running on http://127.0.0.1:{port}")
+class LegacyAPIHandler(APIHandler):
+    """Original behaviour: HTTP/1.0, one connection per request"""
+    protocol_version = 'HTTP/1.0'
+    timeout = None
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each connection to a bounded thread pool.
+    A keep-alive connection holds its worker until it closes or idles out, or
+    until another connection is waiting for a worker. At most `backlog`
+    connections wait; beyond that new ones get an immediate 503."""
+    
+    OVERLOADED = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n"
+                  b"Retry-After: 1\r\nConnection: close\r\nContent-Length: 25\r\n\r\n"
+                  b'{"error": "server busy"}\n')
+    
+    def __init__(self, server_address, handler_class, workers=16, backlog=None):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+        self._slots = threading.BoundedSemaphore(workers + (workers if backlog is None else backlog))
+        self._lock = threading.Lock()
+        self._connections = 0
+    
+    def saturated(self):
+        """True while connections are queued for a worker"""
+        return self._connections > self.workers
+    
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            try:
+                request.sendall(self.OVERLOADED)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        with self._lock:
+            self._connections += 1
+        self.pool.submit(self._process, request, client_address)
+    
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._lock:
+                self._connections -= 1
+            self._slots.release()
+    
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+def run_server(port=8081, workers=16, single_threaded=False, backlog=None):
+    if single_threaded:
+        server = HTTPServer(('127.0.0.1', port), LegacyAPIHandler)
+        mode = "single-threaded, HTTP/1.0"
+    else:
+        server = PooledHTTPServer(('127.0.0.1', port), APIHandler, workers=workers, backlog=backlog)
+        mode = f"{workers} worker threads, HTTP/1.1 keep-alive"
+    print(f"Comcast CRM API running on http://127.0.0.1:{port} ({mode})")
     print(f"  GET  /api/visits       - List all visits")
     print(f"  GET  /api/stats        - Territory stats")
     print(f"  POST /api/visits       - Create visit")
@@ -245,5 +376,13 @@ def run_server(port=8081):
     server.serve_forever()
 
 if __name__ == "__main__":
-    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
-    run_server(port)
+    arg_parser = argparse.ArgumentParser(description="Comcast CRM API (stdlib server)")
+    arg_parser.add_argument("port", nargs="?", type=int, default=8081)
+    arg_parser.add_argument("--workers", type=int, default=int(os.getenv("COMCAST_API_WORKERS", "16")),
+                            help="worker threads (each keep-alive connection holds one)")
+    arg_parser.add_argument("--backlog", type=int, default=None,
+                            help="connections allowed to wait for a worker before 503s (default: --workers)")
+    arg_parser.add_argument("--single-threaded", action="store_true",
+                            help="original one-request-at-a-time HTTP/1.0 server")
+    args = arg_parser.parse_args()
+    run_server(args.port, args.workers, args.single_threaded, args.backlog)
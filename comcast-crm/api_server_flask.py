@@ -4,38 +4,249 @@ Comcast CRM API Server - Flask version for Railway
 Serves map data and accepts WhatsApp webhook updates
 """
 
+import gc
+import io
 import json
 import os
 import sys
 import csv
-import io
+import functools
+import threading
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, Response, send_file
 from flask_cors import CORS
 import sqlite3
 
-# Add parent dir to path
-sys.path.insert(0, '/Users/xfinch/.openclaw/workspace/comcast-crm')
-from ghl_sync import GHLComcastSync
+from assets import AssetCache
+from config import BASE_DIR, DB_PATH, MAP_DIR
+import change_tracking
+import db_schema
+import group_commit
+import idempotency
+import log_retention
+import ingest_queue
+from ingest_queue import IngestQueue, IngestWorkers, default_queue_path
+from completeness_cube import CubeCache, parse_dims
+from contact_keys import lookup_visits
+from geo_index import nearest_visits
+import people_index
+from people_index import search_people, PERSON_TYPES
+from read_replica import ReadReplica
+from report_jobs import ReportJobs, default_artifact_dir
+from visit_rollups import timeseries, DIMENSIONS, GRANULARITIES
+from visit_search import search_visits
 
 app = Flask(__name__)
 CORS(app)
 
-DB_PATH = "/Users/xfinch/.openclaw/workspace/comcast-crm/comcast.db"
+# Optional in-memory read replica per worker (COMCAST_READ_REPLICA=1)
+READ_REPLICA = os.getenv("COMCAST_READ_REPLICA", "") in ("1", "true", "yes")
+REPLICA_MIN_REFRESH = float(os.getenv("COMCAST_REPLICA_MIN_REFRESH", "1"))
+REPLICA_MAX_AGE = float(os.getenv("COMCAST_REPLICA_MAX_AGE", "300"))
+
+# How long a POST's response is replayed for retries with the same Idempotency-Key
+IDEMPOTENCY_TTL = float(os.getenv("COMCAST_IDEMPOTENCY_TTL", str(idempotency.DEFAULT_TTL_SECONDS)))
+# After this long an unfinished request's key is taken over by a retry; keep it under the worker timeout
+IDEMPOTENCY_LEASE = float(os.getenv("COMCAST_IDEMPOTENCY_LEASE", str(idempotency.DEFAULT_LEASE_SECONDS)))
+IDEMPOTENCY_PURGE_EVERY = 500
+
+# Webhook ingest queue (defaults to ingest_queue.db next to DB_PATH) and drain threads per worker
+INGEST_DB_PATH = os.getenv("COMCAST_INGEST_DB", "")
+INGEST_WORKERS = int(os.getenv("COMCAST_INGEST_WORKERS", "2"))
+
+# Monthly sync_log archive partitions (defaults to sync_log_archive/ next to DB_PATH)
+LOG_ARCHIVE_DIR = os.getenv("COMCAST_LOG_ARCHIVE_DIR", "") or log_retention.default_archive_dir(DB_PATH)
+
+# Report artifacts (defaults to report_artifacts/ next to DB_PATH) and build threads per worker
+REPORT_DIR = os.getenv("COMCAST_REPORT_DIR", "") or default_artifact_dir(DB_PATH)
+REPORT_WORKERS = int(os.getenv("COMCAST_REPORT_WORKERS", "1"))
+# How long /api/reports/contacts waits for a build before answering 202 with the job to poll
+REPORT_WAIT_SECONDS = float(os.getenv("COMCAST_REPORT_WAIT", "5"))
+
+# Per-route wall/SQL/JSON timing (COMCAST_PROFILE=1) and /debug/profile (needs COMCAST_DEBUG_TOKEN)
+PROFILE = os.getenv("COMCAST_PROFILE", "") in ("1", "true", "yes")
+DEBUG_TOKEN = os.getenv("COMCAST_DEBUG_TOKEN", "")
+MAX_SAMPLE_SECONDS = 30.0
+
+_connection_factory = sqlite3.Connection
+if PROFILE:
+    import profiling
+    _connection_factory = profiling.ProfiledConnection
+    app.json = profiling.ProfiledJSONProvider(app)
+    _route_stats = profiling.RouteStats()
+    _request_profiler = profiling.RequestProfiler()
+
+    @app.before_request
+    def _profile_begin():
+        profiling.begin_request()
+        request.environ['comcast.cprofile'] = _request_profiler.start()
+
+    @app.after_request
+    def _profile_end(response):
+        profile = request.environ.pop('comcast.cprofile', None)
+        if profile is not None:
+            _request_profiler.finish(profile)
+        timings = profiling.end_request()
+        if timings is not None and request.endpoint != 'debug_profile':
+            route = f"{request.method} {request.url_rule.rule}" if request.url_rule else "(unmatched)"
+            wall = _route_stats.record(route, timings, response.status_code)
+            response.headers['Server-Timing'] = profiling.server_timing(timings, wall)
+        return response
+
+_schema_ready = False
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
+    global _schema_ready
+    conn = sqlite3.connect(DB_PATH, factory=_connection_factory)
     conn.row_factory = sqlite3.Row
+    if not _schema_ready:
+        # Derived tables/indexes added after the original schema
+        db_schema.ensure_schema(conn)
+        _schema_ready = True
     return conn
 
+_replica = None
+
+def get_read_db():
+    """Connection for read-only endpoints: the worker's in-memory replica if enabled, else disk.
+    The replica connection is shared - callers must not close it."""
+    global _replica
+    if not READ_REPLICA:
+        return get_db()
+    if _replica is None:
+        get_db()  # derived schema exists before the first copy
+        _replica = ReadReplica(DB_PATH, min_refresh_seconds=REPLICA_MIN_REFRESH,
+                               max_age_seconds=REPLICA_MAX_AGE, factory=_connection_factory)
+    return _replica.connection()
+
+def ghl_sync_service():
+    """Write-side service. ghl_sync (and requests on the first GHL push) load on first use,
+    so workers that only serve reads never pay for them."""
+    from ghl_sync import GHLComcastSync
+    return GHLComcastSync(DB_PATH)
+
+def warm_worker_state():
+    """Called once in the gunicorn master (preload_app, see gunicorn.conf.py).
+    Builds shared state before fork, so every worker starts with it in
+    copy-on-write pages instead of rebuilding it."""
+    global _schema_ready
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        db_schema.ensure_schema(conn)
+        _schema_ready = True
+    finally:
+        conn.close()  # no SQLite handle may cross fork()
+    import ghl_sync, route_planner  # noqa: F401 - import cost paid once, shared by workers
+    from message_parser import parse_message
+    parse_message('')  # builds the shared parser and its compiled patterns
+    assets.page('reports', render_reports_page)
+    assets.page('di-calculator', render_di_calculator)
+    # Keep the GC from touching (and so un-sharing) everything allocated so far
+    gc.freeze()
+
+_claims_since_purge = 0
+
+def idempotent(view):
+    """Replay the stored response for retried POSTs.
+    Key: Idempotency-Key header, else a hash of the JSON payload."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        global _claims_since_purge
+        payload = request.get_json(silent=True)
+        if payload is None:
+            payload = request.get_data(as_text=True)
+        request_hash = idempotency.payload_hash(payload)
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if len(key) > idempotency.MAX_KEY_LENGTH:
+            return jsonify({"error": f"Idempotency-Key longer than {idempotency.MAX_KEY_LENGTH} chars"}), 400
+        key = key or f"auto:{request_hash}"
+        endpoint = request.endpoint
+        
+        conn = get_db()
+        try:
+            outcome, status_code, body = idempotency.claim(conn, endpoint, key, request_hash,
+                                                           IDEMPOTENCY_TTL, IDEMPOTENCY_LEASE)
+            if outcome == idempotency.REPLAY:
+                response = app.response_class(body, status=status_code, mimetype='application/json')
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            if outcome == idempotency.IN_PROGRESS:
+                return jsonify({"error": "request with this Idempotency-Key is still in progress"}), 409
+            if outcome == idempotency.MISMATCH:
+                return jsonify({"error": "Idempotency-Key was already used with a different payload"}), 422
+            
+            completed = False
+            try:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code < 500:
+                    idempotency.complete(conn, endpoint, key, response.status_code, response.get_data(as_text=True))
+                    completed = True
+            finally:
+                # Errors, 5xx and worker aborts (SystemExit) all free the key for a retry
+                if not completed:
+                    idempotency.release(conn, endpoint, key)
+            
+            _claims_since_purge += 1
+            if _claims_since_purge >= IDEMPOTENCY_PURGE_EVERY:
+                _claims_since_purge = 0
+                idempotency.purge_expired(conn)
+            return response
+        finally:
+            conn.close()
+    return wrapper
+
+@app.route('/debug/profile')
+def debug_profile():
+    """Profiling for this worker. Needs COMCAST_DEBUG_TOKEN (X-Debug-Token header or ?token=).
+    Default: per-route stats (COMCAST_PROFILE=1). ?sample=SECONDS: stack sampling of all
+    threads (&format=collapsed for flamegraph input). ?cprofile=N: profile the next N
+    requests; ?cprofile=report shows the result. ?reset=1 clears the route stats."""
+    import hmac
+    supplied = request.headers.get('X-Debug-Token') or request.args.get('token', '')
+    if not DEBUG_TOKEN or not hmac.compare_digest(supplied.encode(), DEBUG_TOKEN.encode()):
+        return jsonify({"error": "not found"}), 404
+
+    import profiling
+    if request.args.get('sample'):
+        seconds = min(float(request.args['sample']), MAX_SAMPLE_SECONDS)
+        result = profiling.sample_stacks(seconds, float(request.args.get('interval', 5)) / 1000)
+        if request.args.get('format') == 'collapsed':
+            lines = [f"{stack} {count}" for stack, count in sorted(result['collapsed'].items())]
+            return Response('\n'.join(lines) + '\n', mimetype='text/plain')
+        del result['collapsed']
+        return jsonify(result)
+
+    if not PROFILE:
+        return jsonify({"error": "per-request profiling is off (set COMCAST_PROFILE=1)"}), 409
+    cprofile = request.args.get('cprofile')
+    if cprofile == 'report':
+        return Response(_request_profiler.report(int(request.args.get('limit', 40)),
+                                                 request.args.get('sort', 'cumulative')),
+                        mimetype='text/plain')
+    if cprofile:
+        _request_profiler.arm(int(cprofile))
+        return jsonify({"armed": int(cprofile)})
+    if request.args.get('reset'):
+        _route_stats.reset()
+    return jsonify({"pid": os.getpid(), "routes": _route_stats.snapshot()})
+
 @app.route('/health')
 def health():
-    return jsonify({"status": "ok", "service": "comcast-crm-api"})
+    status = {"status": "ok", "service": "comcast-crm-api"}
+    if _replica is not None:
+        status["replica"] = _replica.stats()
+    if _ingest is not None:
+        status["ingest"] = _ingest.stats()
+    status["assets"] = assets.stats()
+    writers = group_commit.writer_stats()
+    if writers is not None:
+        status["groupCommit"] = writers
+    return jsonify(status)
 
 @app.route('/api/visits')
 def get_visits():
     """Get all visits with coordinates for map"""
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT id, business_name, contact_name, phone, email, 
@@ -83,7 +294,7 @@ def get_by_zip():
     if not zip_code:
         return jsonify({"error": "zip required"}), 400
     
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT * FROM business_visits 
@@ -94,10 +305,168 @@ def get_by_zip():
     visits = [dict(row) for row in cursor.fetchall()]
     return jsonify({"zip": zip_code, "visits": visits, "count": len(visits)})
 
+def _int_arg(name, default, maximum, minimum=1, params=None):
+    """?name= (or a JSON body field) as an int clamped to [minimum, maximum]; raises ValueError when it isn't an integer"""
+    value = str((request.args if params is None else params).get(name) or '').strip()
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+    return max(minimum, min(number, maximum))
+
+def _float_arg(name, default, minimum, maximum, params=None, exclusive_min=False):
+    """?name= (or a JSON body field) as a finite float in range; raises ValueError otherwise (no clamping)"""
+    value = (request.args if params is None else params).get(name)
+    if value is None or str(value).strip() == '':
+        if default is None:
+            raise ValueError(f"{name} required")
+        return default
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+    too_low = number <= minimum if exclusive_min else number < minimum
+    if too_low or not number <= maximum:    # `not <=` also rejects nan
+        low = '(' if exclusive_min else '['
+        raise ValueError(f"{name} must be in {low}{minimum:g}, {maximum:g}]")
+    return number
+
+@app.route('/api/visits/search')
+def visits_search():
+    """Full-text search over business name, contact, notes, address and city"""
+    query = request.args.get('q', '')
+    if not query.strip():
+        return jsonify({"error": "q required"}), 400
+    
+    try:
+        limit = _int_arg('limit', 25, 200)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    conn = get_read_db()
+    visits = search_visits(
+        conn, query,
+        zip_code=request.args.get('zip') or None,
+        status=request.args.get('status') or None,
+        limit=limit
+    )
+    return jsonify({"query": query, "visits": visits, "count": len(visits)})
+
+MAX_NEARBY_KM = 500.0                      # far beyond any drivable territory
+
+@app.route('/api/visits/nearby')
+def visits_nearby():
+    """Closest open prospects / follow-ups to a point (R*Tree + haversine)"""
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat and lng required"}), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):  # also rejects nan/inf
+        return jsonify({"error": "lat must be in -90..90 and lng in -180..180"}), 400
+    
+    try:
+        k = _int_arg('k', 10, 200)
+        exclude_id = _int_arg('exclude', None, sys.maxsize, -sys.maxsize)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        max_km = float(request.args.get('max_km') or 80)
+    except ValueError:
+        max_km = float('nan')
+    if not 0 < max_km <= MAX_NEARBY_KM:
+        return jsonify({"error": f"max_km must be in (0, {MAX_NEARBY_KM:g}]"}), 400
+    statuses = [s for s in request.args.get('status', '').split(',') if s.strip()]
+    
+    conn = get_read_db()
+    visits = nearest_visits(
+        conn, lat, lng, k=k,
+        statuses=statuses or None,
+        exclude_id=exclude_id,
+        max_km=max_km
+    )
+    return jsonify({"lat": lat, "lng": lng, "visits": visits, "count": len(visits)})
+
+MAX_ROUTE_MINUTES = 24 * 60.0             # a plan covers at most one day
+MAX_ROUTE_SPEED_KMH = 200.0
+
+@app.route('/api/routes/plan', methods=['GET', 'POST'])
+def routes_plan():
+    """Plan an ordered day of stops from a start point within a time budget"""
+    params = request.get_json(silent=True)
+    if not isinstance(params, dict):
+        params = request.args
+    try:
+        lat = _float_arg('lat', None, -90, 90, params)
+        lng = _float_arg('lng', None, -180, 180, params)
+        budget = _float_arg('budget', 240.0, 0, MAX_ROUTE_MINUTES, params)
+        service_minutes = _float_arg('service_minutes', 15.0, 0, MAX_ROUTE_MINUTES, params)
+        speed_kmh = _float_arg('speed_kmh', 40.0, 0, MAX_ROUTE_SPEED_KMH, params, exclusive_min=True)
+        max_candidates = _int_arg('max_candidates', 500, 1000, params=params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    statuses = params.get('status') or []
+    if isinstance(statuses, str):
+        statuses = [s for s in statuses.split(',') if s.strip()]
+    
+    from route_planner import plan_route, RouteOptions  # numpy loads on the first route request
+    
+    options = RouteOptions(
+        budget_minutes=budget,
+        service_minutes=service_minutes,
+        speed_kmh=speed_kmh,
+        return_to_start=str(params.get('return', '')).lower() in ('1', 'true', 'yes'),
+        max_candidates=max_candidates
+    )
+    
+    conn = get_read_db()
+    plan = plan_route(conn, lat, lng, options, statuses=statuses or None)
+    return jsonify(plan)
+
+@app.route('/api/visits/lookup')
+def visits_lookup():
+    """Find visits by phone or email (normalized, indexed) - for dedupe checks"""
+    phone = request.args.get('phone', '')
+    email = request.args.get('email', '')
+    if not phone.strip() and not email.strip():
+        return jsonify({"error": "phone or email required"}), 400
+    
+    conn = get_read_db()
+    visits = lookup_visits(conn, phone=phone or None, email=email or None)
+    return jsonify({"phone": phone, "email": email, "visits": visits, "count": len(visits)})
+
+@app.route('/api/people/search')
+def people_search():
+    """Find gatekeepers / decision makers / other contacts by name"""
+    query = request.args.get('q') or request.args.get('name', '')
+    if not query.strip():
+        return jsonify({"error": "q required"}), 400
+    
+    role = request.args.get('role') or None
+    if role and role not in PERSON_TYPES:
+        return jsonify({"error": f"role must be one of {', '.join(PERSON_TYPES)}"}), 400
+    
+    phonetic = request.args.get('phonetic', '1') not in ('0', 'false')
+    try:
+        limit = _int_arg('limit', 50, 500)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    conn = get_read_db()
+    if people_index.stale_count(conn):
+        # contact_name edited since indexing: re-parse on the primary before answering
+        group_commit.writer_for(DB_PATH).run(people_index.refresh_stale)
+        conn = get_read_db()
+    people = search_people(conn, query, person_type=role, phonetic=phonetic, limit=limit)
+    return jsonify({"query": query, "people": people, "count": len(people)})
+
 @app.route('/api/stats')
 def get_stats():
     """Get territory stats"""
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
     # Total visits
@@ -126,22 +495,33 @@ def get_stats():
         "by_zip": by_zip
     })
 
-@app.route('/api/visits', methods=['POST'])
-def create_visit():
-    """Create new visit from API"""
-    data = request.get_json()
+@app.route('/api/stats/timeseries')
+def get_stats_timeseries():
+    """Visits per day/week by zip and status, served from the rollup tables"""
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
     
-    # Support both camelCase (frontend) and snake_case (legacy)
-    business_name = data.get('businessName') or data.get('business_name', '')
-    zip_code = data.get('zip') or data.get('zip_code', '')
-    contact_name = data.get('contactName') or data.get('contact_name', '')
-    account_id_8498 = data.get('accountId8498') or data.get('account_id_8498', '')
-    
-    sync = GHLComcastSync()
-    visit_id = sync.add_visit(
-        business_name=business_name,
-        zip_code=zip_code,
-        contact_name=contact_name,
+    by = request.args.get('by')
+    by = [d for d in by.split(',') if d in DIMENSIONS] if by is not None else list(DIMENSIONS)
+    
+    conn = get_read_db()
+    series = timeseries(
+        conn, granularity,
+        date_from=request.args.get('from') or None,
+        date_to=request.args.get('to') or None,
+        by=by,
+        zip_code=request.args.get('zip') or None,
+        status=request.args.get('status') or None
+    )
+    return jsonify({"granularity": granularity, "by": by, "series": series, "count": len(series)})
+
+def _visit_kwargs(data):
+    """Map a posted visit (camelCase frontend or snake_case legacy) to add_visit() arguments"""
+    return dict(
+        business_name=data.get('businessName') or data.get('business_name', ''),
+        zip_code=data.get('zip') or data.get('zip_code', ''),
+        contact_name=data.get('contactName') or data.get('contact_name', ''),
         phone=data.get('phone', ''),
         email=data.get('email', ''),
         address=data.get('address', ''),
@@ -151,42 +531,248 @@ def create_visit():
         lat=data.get('lat'),
         lng=data.get('lng'),
         source=data.get('source', 'api'),
-        account_id_8498=account_id_8498
+        account_id_8498=data.get('accountId8498') or data.get('account_id_8498', '')
     )
+
+@app.route('/api/visits', methods=['POST'])
+@idempotent
+def create_visit():
+    """Create new visit from API"""
+    data = request.get_json()
+    
+    visit_id = ghl_sync_service().add_visit(**_visit_kwargs(data))
     
     return jsonify({"id": str(visit_id), "status": "created"}), 201
 
+MAX_BATCH = 5000
+
+def _validate_visit(kwargs):
+    """Return an error string for a visit that cannot be inserted, else None"""
+    if not str(kwargs['business_name'] or '').strip():
+        return "businessName required"
+    if not str(kwargs['zip_code'] or '').strip():
+        return "zip required"
+    for field in ('lat', 'lng'):
+        value = kwargs[field]
+        if value is not None and value != '':
+            try:
+                kwargs[field] = float(value)
+            except (TypeError, ValueError):
+                return f"{field} must be a number"
+        else:
+            kwargs[field] = None
+    return None
+
+@app.route('/api/visits/batch', methods=['POST'])
+@idempotent
+def create_visits_batch():
+    """Create many visits in one transaction.
+    Body: JSON array, {"visits": [...]}, or NDJSON (one visit per line)."""
+    records = []
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                records.append(e)
+    else:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get('visits')
+        if not isinstance(data, list):
+            return jsonify({"error": "expected a JSON array, {\"visits\": [...]}, or NDJSON"}), 400
+        records = data
+    
+    if len(records) > MAX_BATCH:
+        return jsonify({"error": f"batch limit is {MAX_BATCH} visits"}), 413
+    
+    results = [None] * len(records)
+    valid, positions = [], []
+    for index, record in enumerate(records):
+        if isinstance(record, Exception):
+            results[index] = {"index": index, "status": "error", "error": f"invalid JSON: {record}"}
+            continue
+        if not isinstance(record, dict):
+            results[index] = {"index": index, "status": "error", "error": "visit must be an object"}
+            continue
+        kwargs = _visit_kwargs(record)
+        error = _validate_visit(kwargs)
+        if error:
+            results[index] = {"index": index, "status": "error", "error": error}
+            continue
+        valid.append(kwargs)
+        positions.append(index)
+    
+    sync_ghl = request.args.get('sync', '1') not in ('0', 'false')
+    visit_ids = ghl_sync_service().add_visits(valid, sync=sync_ghl) if valid else []
+    for index, visit_id in zip(positions, visit_ids):
+        results[index] = {"index": index, "id": str(visit_id), "status": "created"}
+    
+    return jsonify({
+        "created": len(visit_ids),
+        "failed": len(records) - len(visit_ids),
+        "results": results
+    }), 201 if visit_ids else 400
+
+def process_ingested(source, payload, message_key):
+    """Ingest worker handler: turn one queued webhook message into rows in comcast.db.
+    The visit, its sync_log entry and the message's receipt commit together, so a
+    message redelivered after a crash before its ack replays instead of adding the visit twice."""
+    message = payload.get('message', '') if isinstance(payload, dict) else str(payload)
+    
+    from message_parser import parse_message
+    import ghl_sync
+    
+    parsed = parse_message(message)
+    service = ghl_sync_service()
+    
+    def write(conn):
+        done = ingest_queue.receipt(conn, message_key)
+        if done is not None:
+            return done, None
+        visit_id = service.insert_visit(conn, **parsed.to_visit_kwargs(source)) if parsed.is_visit else None
+        # Every raw message stays in the log; ones without a business or zip wait there for review
+        cursor = conn.execute("""
+            INSERT INTO sync_log (action, table_name, record_id, status, message)
+            VALUES (?, ?, ?, ?, ?)
+        """, ('whatsapp_webhook', 'incoming', visit_id, 'parsed' if visit_id else 'unparsed', message[:500]))
+        if visit_id:
+            result = f"visit {visit_id}"
+        else:
+            result = f"unparsed (missing {', '.join(parsed.missing)}): sync_log {cursor.lastrowid}"
+        ingest_queue.record_receipt(conn, message_key, result)
+        return result, visit_id
+    
+    result, visit_id = group_commit.writer_for(DB_PATH).run(write)
+    if visit_id and ghl_sync.GHL_LOCATION_ID:
+        service.sync_to_ghl(visit_id)
+    return result
+
+_ingest = None
+_ingest_workers = None
+_ingest_lock = threading.Lock()
+
+def get_ingest_queue():
+    """This process's ingest queue (opened on first use; see start_ingest_workers)"""
+    global _ingest
+    if _ingest is None:
+        with _ingest_lock:
+            if _ingest is None:
+                _ingest = IngestQueue(INGEST_DB_PATH or default_queue_path(DB_PATH))
+    return _ingest
+
+def start_ingest_workers():
+    """Start this process's drain threads, so messages queued before a restart are
+    processed without waiting for the next webhook. Threads don't survive fork(), so
+    under gunicorn this runs in each worker (post_fork), never in the master."""
+    global _ingest_workers
+    queue = get_ingest_queue()
+    with _ingest_lock:
+        if _ingest_workers is None and INGEST_WORKERS > 0:
+            _ingest_workers = IngestWorkers(queue, process_ingested, threads=INGEST_WORKERS)
+            _ingest_workers.start()
+
 @app.route('/api/whatsapp', methods=['POST'])
 def whatsapp_webhook():
-    """Handle incoming WhatsApp messages"""
-    data = request.get_json()
-    message = data.get('message', '')
+    """Handle incoming WhatsApp messages: queue the raw payload and ack.
+    Retries are deduplicated on Idempotency-Key (or a payload hash) inside the queue."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    key = request.headers.get('Idempotency-Key', '').strip()
+    if len(key) > idempotency.MAX_KEY_LENGTH:
+        return jsonify({"error": f"Idempotency-Key longer than {idempotency.MAX_KEY_LENGTH} chars"}), 400
     
-    # TODO: Parse message using NLP
-    # For now, just log it
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO sync_log (action, table_name, status, message)
-        VALUES (?, ?, ?, ?)
-    """, ('whatsapp_webhook', 'incoming', 'received', message[:500]))
-    conn.commit()
+    queue_id, is_new = get_ingest_queue().enqueue(
+        'whatsapp', data, key or f"auto:{idempotency.payload_hash(data)}")
     
-    return jsonify({"status": "received"})
+    response = jsonify({"status": "received", "queueId": queue_id})
+    if not is_new:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+@app.route('/api/sync-log')
+def sync_log_entries():
+    """Sync/webhook log across hot rows and archive partitions, newest first"""
+    try:
+        limit = _int_arg('limit', 100, 1000)
+        record_id = _int_arg('recordId', None, sys.maxsize, -sys.maxsize)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    conn = get_db()
+    try:
+        entries = log_retention.query_log(
+            conn, LOG_ARCHIVE_DIR,
+            since=request.args.get('since'), until=request.args.get('until'),
+            action=request.args.get('action'), status=request.args.get('status'),
+            record_id=record_id, limit=limit)
+    finally:
+        conn.close()
+    return jsonify({"entries": entries, "count": len(entries)})
+
+@app.route('/api/sync-log/daily')
+def sync_log_daily():
+    """Log entries per day/action/status, including days whose rows are archived"""
+    conn = get_db()
+    try:
+        days = log_retention.daily_counts(conn, request.args.get('since'), request.args.get('until'))
+        retention = log_retention.stats(conn, LOG_ARCHIVE_DIR)
+    finally:
+        conn.close()
+    return jsonify({"days": days, "retention": retention})
+
+@app.route('/api/ingest/stats')
+def ingest_stats():
+    """Ingest queue depth and lag"""
+    return jsonify(get_ingest_queue().stats())
+
+# Pre-rendered pages and their split-out CSS/JS. Assets are linked under /api/assets/
+# so they resolve through the Tailscale /api proxy too (it strips to /assets/).
+assets = AssetCache()
+
+def asset_response(asset):
+    """Serve a cached asset: 304 on a matching ETag, gzip when the client takes it"""
+    headers = {'ETag': asset.etag, 'Cache-Control': asset.cache_control, 'Vary': 'Accept-Encoding'}
+    if request.if_none_match.contains_weak(asset.etag.strip('"')):
+        return Response(status=304, headers=headers)
+    body = asset.body
+    if asset.gzipped is not None and 'gzip' in request.accept_encodings:
+        body = asset.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype=asset.mimetype, headers=headers)
+
+def file_page_response(path):
+    try:
+        return asset_response(assets.file_page(path))
+    except FileNotFoundError:
+        return jsonify({"error": "not found"}), 404
+
+@app.route('/api/assets/<name>')
+@app.route('/assets/<name>')
+def serve_asset(name):
+    """Content-addressed CSS/JS split out of the pages (immutable)"""
+    asset = assets.static(name)
+    if asset is None:
+        return jsonify({"error": "unknown asset"}), 404
+    return asset_response(asset)
 
 @app.route('/comcast/review')
 def serve_review():
     """Serve review queue HTML"""
-    return send_from_directory('.', 'review.html')
+    return file_page_response(os.path.join(BASE_DIR, 'review.html'))
 
-@app.route('/api/reports/contacts')
-def report_contacts():
-    """Generate CSV report of contacts filtered by email/phone availability"""
-    
-    # Get filter parameters
-    filter_type = request.args.get('filter', 'all')  # all, email_only, phone_only, both, missing_both
+REPORT_FILTERS = ('all', 'email_only', 'phone_only', 'both', 'missing_both')
+
+def build_contacts_csv(conn, params, output):
+    """Report job builder: contacts CSV filtered by email/phone availability; returns the row count.
+    params may also hold 'cursor' (rows with change_seq > cursor) or 'since' (updated_at >= since)
+    for delta exports - see change_tracking.py."""
+    filter_type = params.get('filter', 'all')  # all, email_only, phone_only, both, missing_both
+    after_seq = params.get('cursor')
+    since = params.get('since')
     
-    conn = get_db()
     cursor = conn.cursor()
     
     # Base query with new structured contact fields
@@ -211,49 +797,40 @@ def report_contacts():
             gatekeeper_last_name,
             decision_maker_first_name,
             decision_maker_last_name,
-            other_contacts
+            other_contacts,
+            mail_first_name,
+            mail_last_name
         FROM business_visits
         WHERE 1=1
     """
     
     # Apply filters
     params = []
+    # phone_e164 / email_norm are NULL when blank and indexed (see contact_keys.py)
     if filter_type == 'email_only':
-        base_query += " AND (email IS NOT NULL AND email != '') AND (phone IS NULL OR phone = '')"
+        base_query += " AND email_norm IS NOT NULL AND phone_e164 IS NULL"
     elif filter_type == 'phone_only':
-        base_query += " AND (phone IS NOT NULL AND phone != '') AND (email IS NULL OR email = '')"
+        base_query += " AND phone_e164 IS NOT NULL AND email_norm IS NULL"
     elif filter_type == 'both':
-        base_query += " AND (email IS NOT NULL AND email != '') AND (phone IS NOT NULL AND phone != '')"
+        base_query += " AND email_norm IS NOT NULL AND phone_e164 IS NOT NULL"
     elif filter_type == 'missing_both':
-        base_query += " AND (email IS NULL OR email = '') AND (phone IS NULL OR phone = '')"
+        base_query += " AND email_norm IS NULL AND phone_e164 IS NULL"
     # 'all' = no filter
     
-    base_query += " ORDER BY visit_date DESC"
+    # Deltas come back in change order, so a consumer can stop anywhere and resume
+    if after_seq is not None:
+        base_query += " AND change_seq > ? ORDER BY change_seq"
+        params.append(after_seq)
+    elif since:
+        base_query += " AND updated_at >= ? ORDER BY updated_at"
+        params.append(since)
+    else:
+        base_query += " ORDER BY visit_date DESC"
     
     cursor.execute(base_query, params)
     rows = cursor.fetchall()
     
-    # Helper function to parse name for mail merge (first name includes Dr., last name separate)
-    def parse_name_for_mail_merge(full_name):
-        """Parse 'John Smith' or 'Dr. John Smith' into (first_name, last_name)"""
-        if not full_name:
-            return '', ''
-        parts = full_name.strip().split()
-        if len(parts) == 0:
-            return '', ''
-        if len(parts) == 1:
-            return parts[0], ''
-        # Check for Dr. prefix - keep it in first name
-        if parts[0].lower() in ['dr.', 'dr']:
-            if len(parts) >= 3:
-                return f"{parts[0]} {parts[1]}", parts[2]
-            else:
-                return f"{parts[0]} {parts[1]}", ''
-        # Standard: last part is last name, rest is first name
-        return ' '.join(parts[:-1]), parts[-1]
-    
     # Generate CSV
-    output = io.StringIO()
     writer = csv.writer(output)
     
     # Write headers - MAIL MERGE FORMAT with separate first/last names
@@ -269,19 +846,12 @@ def report_contacts():
     
     # Write data
     for row in rows:
-        # Parse contact_name into first/last for mail merge
-        first_name, last_name = parse_name_for_mail_merge(row['contact_name'])
-        
-        # Use structured fields if available, otherwise fall back to parsed contact_name
-        dm_first = row['decision_maker_first_name'] or first_name
-        dm_last = row['decision_maker_last_name'] or last_name
-        
         writer.writerow([
             row['id'],
             row['business_name'] or '',
             row['contact_name'] or '',
-            dm_first,  # First Name (for mail merge)
-            dm_last,   # Last Name (for mail merge)
+            row['mail_first_name'] or '',  # First Name (for mail merge, see mail_merge_names.py)
+            row['mail_last_name'] or '',   # Last Name (for mail merge)
             row['gatekeeper_first_name'] or '',
             row['gatekeeper_last_name'] or '',
             row['decision_maker_first_name'] or '',
@@ -300,39 +870,167 @@ def report_contacts():
             row['source'] or '',
             row['created_at'] or ''
         ])
-    
-    # Prepare response
-    output.seek(0)
+    return len(rows)
+
+_report_jobs = None
+_report_jobs_lock = threading.Lock()
+
+def get_report_jobs():
+    """This process's report job manager; its build thread starts with the first queued job"""
+    global _report_jobs
+    if _report_jobs is None:
+        with _report_jobs_lock:
+            if _report_jobs is None:
+                get_db().close()  # report_jobs/data_version tables exist
+                _report_jobs = ReportJobs(DB_PATH, REPORT_DIR, {'contacts': build_contacts_csv},
+                                          threads=REPORT_WORKERS)
+    return _report_jobs
+
+def _job_response(job, status=200):
+    if job['status'] == 'done':
+        job['downloadUrl'] = f"/api/reports/jobs/{job['jobId']}/download"
+    return jsonify(job), status
+
+def _delta_args():
+    """(cursor, since) from ?cursor=N / ?since=YYYY-MM-DD[ HH:MM:SS]; raises ValueError when malformed"""
+    cursor = request.args.get('cursor')
+    since = request.args.get('since')
+    if cursor is not None:
+        cursor = int(cursor)
+        if cursor < 0:
+            raise ValueError("cursor must be >= 0")
+    if since:
+        since = since.replace('T', ' ').rstrip('Z')
+        datetime.strptime(since[:10], '%Y-%m-%d')
+    return cursor, since or None
+
+def contacts_delta_csv(filter_type, cursor, since):
+    """Changed rows only, built inline (deltas are small and never reused). X-Next-Cursor is the
+    change sequence of the same snapshot, so passing it back next time misses nothing."""
+    conn = get_db()
+    try:
+        conn.execute("BEGIN")  # one read snapshot for the rows and the cursor
+        next_cursor = change_tracking.current_seq(conn)
+        output = io.StringIO()
+        rows = build_contacts_csv(conn, {'filter': filter_type, 'cursor': cursor, 'since': since}, output)
+        conn.rollback()
+    finally:
+        conn.close()
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"comcast_contacts_{filter_type}_{timestamp}.csv"
-    
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename={filename}',
-            'Content-Type': 'text/csv; charset=utf-8'
-        }
-    )
+    response = Response(output.getvalue(), mimetype='text/csv')
+    response.headers['Content-Disposition'] = \
+        f'attachment; filename=comcast_contacts_{filter_type}_delta_{timestamp}.csv'
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['X-Next-Cursor'] = str(next_cursor)
+    response.headers['X-Row-Count'] = str(rows)
+    return response
+
+@app.route('/api/reports/contacts')
+def report_contacts():
+    """Contacts CSV. Served from the cached artifact for the current data version when there
+    is one; otherwise built by the report worker while this request waits up to
+    COMCAST_REPORT_WAIT seconds, then 202 with the job to poll (?async=1 returns the job
+    straight away - see /api/reports/jobs). ?cursor=N or ?since=DATE returns only the rows
+    changed since then; deletions are listed by /api/reports/contacts/changes."""
+    filter_type = request.args.get('filter', 'all')
+    if filter_type not in REPORT_FILTERS:
+        filter_type = 'all'
+    try:
+        cursor, since = _delta_args()
+    except ValueError as e:
+        return jsonify({"error": f"bad cursor/since: {e}"}), 400
+    if cursor is not None or since:
+        return contacts_delta_csv(filter_type, cursor, since)
+    jobs = get_report_jobs()
+    job = jobs.submit('contacts', {'filter': filter_type})
+    if request.args.get('async') in ('1', 'true'):
+        return _job_response(job, 200 if job['status'] == 'done' else 202)
+    job = jobs.wait(job, timeout=REPORT_WAIT_SECONDS)
+    if job['status'] == 'failed':
+        return jsonify({"error": job['error'], "jobId": job['jobId']}), 500
+    if job['status'] != 'done':
+        # Don't hold a sync worker for a long build; the client polls the job instead
+        job['pollUrl'] = f"/api/reports/jobs/{job['jobId']}"
+        return _job_response(job, 202)
+    return report_download(job['jobId'])
+
+@app.route('/api/reports/contacts/changes')
+def report_contact_changes():
+    """Changed visits and deletion tombstones after ?cursor=N, in change order, ?limit= per page.
+    Keep requesting with nextCursor while hasMore is true."""
+    try:
+        cursor, _ = _delta_args()
+        limit = min(max(int(request.args.get('limit', 1000)), 1), 5000)
+    except ValueError as e:
+        return jsonify({"error": f"bad cursor/limit: {e}"}), 400
+    conn = get_db()
+    try:
+        return jsonify(change_tracking.changes(conn, cursor or 0, limit))
+    finally:
+        conn.close()
+
+@app.route('/api/reports/jobs', methods=['POST'])
+def report_job_submit():
+    """Queue a report build (or find the finished one): {"report": "contacts", "filter": "both"}"""
+    data = request.get_json(silent=True) or {}
+    report = data.get('report', 'contacts')
+    filter_type = data.get('filter', 'all')
+    if report != 'contacts':
+        return jsonify({"error": "report must be 'contacts'"}), 400
+    if filter_type not in REPORT_FILTERS:
+        return jsonify({"error": f"filter must be one of {', '.join(REPORT_FILTERS)}"}), 400
+    job = get_report_jobs().submit(report, {'filter': filter_type})
+    return _job_response(job, 200 if job['status'] == 'done' else 202)
+
+@app.route('/api/reports/jobs/<int:job_id>')
+def report_job_status(job_id):
+    job = get_report_jobs().get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    return _job_response(job)
+
+@app.route('/api/reports/jobs/<int:job_id>/download')
+def report_download(job_id):
+    """The finished artifact; cacheable, since a job's file never changes"""
+    jobs = get_report_jobs()
+    job = jobs.get(job_id)
+    if job is None or job['status'] != 'done':
+        return jsonify({"error": "report not ready", "status": job['status'] if job else None}), 404
+    try:
+        response = send_file(jobs.path(job), mimetype='text/csv', conditional=True, max_age=3600)
+    except FileNotFoundError:
+        return _job_response(jobs.submit(job['report'], job['params']), 202)
+    timestamp = datetime.fromtimestamp(job['createdAt']).strftime('%Y%m%d_%H%M%S')
+    filename = f"comcast_{job['report']}_{job['params'].get('filter', 'all')}_{timestamp}.csv"
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    return response
 
 @app.route('/api/reports/stats')
 def report_stats():
     """Get quick stats on contact data completeness"""
-    conn = get_db()
+    conn = get_read_db()
     cursor = conn.cursor()
     
     cursor.execute("SELECT COUNT(*) as total FROM business_visits")
     total = cursor.fetchone()['total']
     
+    # Each count is answered from an index on the normalized columns
+    cursor.execute("SELECT COUNT(*) FROM business_visits WHERE email_norm IS NOT NULL")
+    with_email = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM business_visits WHERE phone_e164 IS NOT NULL")
+    with_phone = cursor.fetchone()[0]
     cursor.execute("""
-        SELECT 
-            SUM(CASE WHEN email IS NOT NULL AND email != '' THEN 1 ELSE 0 END) as with_email,
-            SUM(CASE WHEN phone IS NOT NULL AND phone != '' THEN 1 ELSE 0 END) as with_phone,
-            SUM(CASE WHEN (email IS NOT NULL AND email != '') AND (phone IS NOT NULL AND phone != '') THEN 1 ELSE 0 END) as with_both,
-            SUM(CASE WHEN (email IS NULL OR email = '') AND (phone IS NULL OR phone = '') THEN 1 ELSE 0 END) as with_neither
-        FROM business_visits
+        SELECT COUNT(*) FROM business_visits
+        WHERE email_norm IS NOT NULL AND phone_e164 IS NOT NULL
     """)
-    row = cursor.fetchone()
+    with_both = cursor.fetchone()[0]
+    row = {
+        'with_email': with_email,
+        'with_phone': with_phone,
+        'with_both': with_both,
+        'with_neither': total - with_email - with_phone + with_both
+    }
     
     return jsonify({
         "total_contacts": total,
@@ -343,9 +1041,28 @@ def report_stats():
         "filters_available": ["all", "email_only", "phone_only", "both", "missing_both"]
     })
 
+_cube_cache = CubeCache()
+
+@app.route('/api/reports/cube')
+def report_cube():
+    """Email/phone completeness for every combination of ?dims= (zip, status, source, week;
+    null = all values). One scan per data version; ?zip=, ?status=, ... keep matching cells only."""
+    try:
+        dims = parse_dims(request.args.get('dims', 'zip'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    version, cells, cached = _cube_cache.cube(get_read_db(), dims)
+    filters = {dim: request.args[dim] for dim in dims if dim in request.args}
+    if filters:
+        cells = [cell for cell in cells if all(cell[dim] == value for dim, value in filters.items())]
+    return jsonify({"dims": dims, "dataVersion": version, "cached": cached, "cells": cells, "count": len(cells)})
+
 @app.route('/reports')
 def serve_reports_page():
     """Serve reports web interface"""
+    return asset_response(assets.page('reports', render_reports_page))
+
+def render_reports_page():
     return """<!DOCTYPE html>
 <html>
 <head>
@@ -371,6 +1088,14 @@ def serve_reports_page():
         .btn-danger:hover { background: #c82333; }
         .filter-section { margin: 20px 0; }
         .filter-section h3 { margin-bottom: 12px; color: #555; }
+        .job-status { color: #666; min-height: 1.2em; }
+        .cube-table { width: 100%; border-collapse: collapse; font-size: 14px; }
+        .cube-table th, .cube-table td { padding: 6px 8px; text-align: right; border-bottom: 1px solid #eee; }
+        .cube-table th:first-child, .cube-table td:first-child { text-align: left; }
+        .cube-table tr.drill { cursor: pointer; }
+        .cube-table tr.drill:hover { background: #f0f6ff; }
+        .cube-table tr.all { font-weight: bold; }
+        .crumbs { color: #666; margin: 8px 0; }
     </style>
 </head>
 <body>
@@ -402,18 +1127,34 @@ def serve_reports_page():
         </div>
     </div>
     
+    <div class="card">
+        <h2>Completeness Breakdown</h2>
+        <div>
+            <a href="#" data-dim="zip" class="btn btn-secondary">By ZIP</a>
+            <a href="#" data-dim="status" class="btn btn-secondary">By Status</a>
+            <a href="#" data-dim="source" class="btn btn-secondary">By Source</a>
+            <a href="#" data-dim="week" class="btn btn-secondary">By Week</a>
+        </div>
+        <p class="crumbs" id="cube-crumbs"></p>
+        <table class="cube-table">
+            <thead><tr><th id="cube-dim">-</th><th>Total</th><th>Both</th><th>Email Only</th><th>Phone Only</th><th>Missing Both</th></tr></thead>
+            <tbody id="cube-body"></tbody>
+        </table>
+    </div>
+    
     <div class="card">
         <h2>Download CSV Reports</h2>
         <p>Export contacts with structured fields (Gatekeeper, Decision Maker, etc.)</p>
         
         <div class="filter-section">
             <h3>By Contact Info</h3>
-            <a href="/api/reports/contacts?filter=both" class="btn btn-success">📧📞 Has Both</a>
-            <a href="/api/reports/contacts?filter=email_only" class="btn">📧 Email Only</a>
-            <a href="/api/reports/contacts?filter=phone_only" class="btn btn-secondary">📞 Phone Only</a>
-            <a href="/api/reports/contacts?filter=missing_both" class="btn btn-warning">⚠️ Missing Both</a>
-            <a href="/api/reports/contacts?filter=all" class="btn btn-danger">📋 All Contacts</a>
+            <a href="/api/reports/contacts?filter=both" data-filter="both" class="btn btn-success">📧📞 Has Both</a>
+            <a href="/api/reports/contacts?filter=email_only" data-filter="email_only" class="btn">📧 Email Only</a>
+            <a href="/api/reports/contacts?filter=phone_only" data-filter="phone_only" class="btn btn-secondary">📞 Phone Only</a>
+            <a href="/api/reports/contacts?filter=missing_both" data-filter="missing_both" class="btn btn-warning">⚠️ Missing Both</a>
+            <a href="/api/reports/contacts?filter=all" data-filter="all" class="btn btn-danger">📋 All Contacts</a>
         </div>
+        <p class="job-status" id="job-status"></p>
     </div>
     
     <div class="card">
@@ -434,6 +1175,86 @@ def serve_reports_page():
                 document.getElementById('missing-both').textContent = data.with_neither;
             })
             .catch(err => console.error('Failed to load stats:', err));
+        
+        // Exports are built by a background job: queue it, poll, then download the file
+        const jobStatus = document.getElementById('job-status');
+        
+        function pollJob(job, label) {
+            if (job.status === 'done') {
+                jobStatus.textContent = `${label}: ${job.rows} contacts ready`;
+                window.location = job.downloadUrl;
+                return;
+            }
+            if (job.status === 'failed') {
+                jobStatus.textContent = `${label} failed: ${job.error}`;
+                return;
+            }
+            jobStatus.textContent = `Building ${label}...`;
+            setTimeout(() => fetch(`/api/reports/jobs/${job.jobId}`)
+                .then(r => r.json())
+                .then(next => pollJob(next, label))
+                .catch(err => { jobStatus.textContent = `${label}: ${err}`; }), 500);
+        }
+        
+        // Completeness cube: clicking a row filters on it and breaks down by the next dimension
+        const CUBE_DIMS = ['zip', 'status', 'source', 'week'];
+        let cubeFilters = {};
+        
+        function loadCube(dim) {
+            const params = new URLSearchParams({dims: [...Object.keys(cubeFilters), dim].join(',')});
+            Object.entries(cubeFilters).forEach(([key, value]) => params.set(key, value));
+            fetch(`/api/reports/cube?${params}`)
+                .then(r => r.json())
+                .then(data => {
+                    const body = document.getElementById('cube-body');
+                    document.getElementById('cube-dim').textContent = dim;
+                    document.getElementById('cube-crumbs').textContent =
+                        Object.entries(cubeFilters).map(([key, value]) => `${key}: ${value || '(none)'}`).join(' > ');
+                    body.innerHTML = '';
+                    const next = CUBE_DIMS.find(d => d !== dim && !(d in cubeFilters));
+                    data.cells.forEach(cell => {
+                        const row = document.createElement('tr');
+                        const label = cell[dim] === null ? 'All' : (cell[dim] || '(none)');
+                        [label, cell.total, cell.both, cell.emailOnly, cell.phoneOnly, cell.neither].forEach(value => {
+                            const td = document.createElement('td');
+                            td.textContent = value;
+                            row.appendChild(td);
+                        });
+                        if (cell[dim] === null) {
+                            row.className = 'all';
+                        } else if (next) {
+                            row.className = 'drill';
+                            row.addEventListener('click', () => { cubeFilters[dim] = cell[dim]; loadCube(next); });
+                        }
+                        body.appendChild(row);
+                    });
+                })
+                .catch(err => console.error('Failed to load breakdown:', err));
+        }
+        
+        document.querySelectorAll('a[data-dim]').forEach(link => {
+            link.addEventListener('click', event => {
+                event.preventDefault();
+                cubeFilters = {};
+                loadCube(link.dataset.dim);
+            });
+        });
+        loadCube('zip');
+        
+        document.querySelectorAll('a[data-filter]').forEach(link => {
+            link.addEventListener('click', event => {
+                event.preventDefault();
+                const label = link.textContent.trim();
+                fetch('/api/reports/jobs', {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({report: 'contacts', filter: link.dataset.filter})
+                })
+                    .then(r => r.json())
+                    .then(job => job.error ? (jobStatus.textContent = job.error) : pollJob(job, label))
+                    .catch(() => { window.location = link.href; });
+            });
+        });
     </script>
 </body>
 </html>"""
@@ -446,8 +1267,7 @@ def serve_root():
 @app.route('/map')
 def serve_map():
     """Serve main map HTML at /map"""
-    parent_dir = os.path.dirname(os.path.abspath(__file__))
-    return send_from_directory(os.path.join(parent_dir, '..', 'comcast'), 'index.html')
+    return file_page_response(os.path.join(MAP_DIR, 'index.html'))
 
 # API routes for stripped paths (Tailscale /api proxy strips to root)
 @app.route('/reports/stats')
@@ -460,9 +1280,32 @@ def report_contacts_stripped():
     """Generate CSV report (for Tailscale /api proxy stripping)"""
     return report_contacts()
 
+@app.route('/reports/contacts/changes')
+def report_contact_changes_stripped():
+    return report_contact_changes()
+
+@app.route('/reports/cube')
+def report_cube_stripped():
+    return report_cube()
+
+@app.route('/reports/jobs', methods=['POST'])
+def report_job_submit_stripped():
+    return report_job_submit()
+
+@app.route('/reports/jobs/<int:job_id>')
+def report_job_status_stripped(job_id):
+    return report_job_status(job_id)
+
+@app.route('/reports/jobs/<int:job_id>/download')
+def report_download_stripped(job_id):
+    return report_download(job_id)
+
 @app.route('/di-calculator')
 def serve_di_calculator():
     """Serve DI Calculator HTML"""
+    return asset_response(assets.page('di-calculator', render_di_calculator))
+
+def render_di_calculator():
     return """<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -742,4 +1585,5 @@ def serve_di_calculator():
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8081))
+    start_ingest_workers()
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
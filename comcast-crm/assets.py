@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Assets - pre-rendered HTML pages with content-hash ETags
+Each page is rendered once per process. Its inline <style> and <script>
+blocks are moved out into content-addressed /api/assets/<hash>.css|js files,
+which are safe to cache forever. The HTML left over is small and carries
+a short max-age, so a repeat page load on a phone revalidates a few KB at
+most; the CSS/JS comes straight from the browser cache. File-backed pages
+(map, review queue) are re-rendered when the file's mtime or size changes.
+Static assets are refcounted by the renders that link them. Each page keeps
+its current and previous render's assets, so HTML a browser cached just
+before a re-render still loads; anything older is dropped, so editing a
+file-backed page doesn't grow the cache forever.
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Optional, Tuple
+
+PAGE_CACHE_CONTROL = f"public, max-age={int(os.getenv('COMCAST_PAGE_MAX_AGE', '300'))}"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Only attribute-less blocks: <script src=...>, type="module" etc. stay where they are
+_INLINE_BLOCK = re.compile(r'<(script|style)>(.*?)</\1>', re.S | re.I)
+_BLOCK_TYPES = {
+    'script': ('js', 'application/javascript', '<script src="{url}"></script>'),
+    'style': ('css', 'text/css', '<link rel="stylesheet" href="{url}">'),
+}
+GZIP_MIN_BYTES = 1024
+
+
+@dataclass
+class Asset:
+    body: bytes
+    gzipped: Optional[bytes]               # None when compression doesn't pay
+    etag: str                              # quoted content hash
+    mimetype: str
+    cache_control: str
+
+
+def make_asset(body: bytes, mimetype: str, cache_control: str) -> Asset:
+    digest = hashlib.sha256(body).hexdigest()[:20]
+    gzipped = gzip.compress(body, 6) if len(body) >= GZIP_MIN_BYTES else None
+    if gzipped is not None and len(gzipped) >= len(body):
+        gzipped = None
+    return Asset(body, gzipped, f'"{digest}"', mimetype, cache_control)
+
+
+class AssetCache:
+    def __init__(self, prefix: str = '/api/assets/'):
+        self.prefix = prefix
+        self._pages: Dict[str, Tuple[object, Asset]] = {}
+        self._static: Dict[str, Asset] = {}
+        self._refs: Dict[str, int] = {}    # static name -> page renders (current or previous) linking it
+        self._page_assets: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {}  # key -> (current, previous)
+        self._lock = threading.Lock()
+        self.renders = 0
+
+    def _split(self, html: str) -> Tuple[str, FrozenSet[str]]:
+        """Move inline blocks into immutable static assets and link them -> (html, asset names)"""
+        names = set()
+
+        def extract(match):
+            ext, mimetype, tag = _BLOCK_TYPES[match.group(1).lower()]
+            asset = make_asset(match.group(2).encode('utf-8'), mimetype, IMMUTABLE_CACHE_CONTROL)
+            name = f"{asset.etag.strip(chr(34))}.{ext}"
+            self._static.setdefault(name, asset)
+            names.add(name)
+            return tag.format(url=self.prefix + name)
+        return _INLINE_BLOCK.sub(extract, html), frozenset(names)
+
+    def _retain(self, key: str, names: FrozenSet[str]):
+        """Make names the page's current assets; release those two renders old"""
+        current, previous = self._page_assets.get(key, (frozenset(), frozenset()))
+        for name in names:
+            self._refs[name] = self._refs.get(name, 0) + 1
+        for name in previous:
+            self._refs[name] -= 1
+            if not self._refs[name]:
+                del self._refs[name]
+                del self._static[name]
+        self._page_assets[key] = (names, current)
+
+    def _render(self, key: str, version, render: Callable[[], str]) -> Asset:
+        with self._lock:
+            cached = self._pages.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            html, names = self._split(render())
+            page = make_asset(html.encode('utf-8'), 'text/html', PAGE_CACHE_CONTROL)
+            self._retain(key, names)
+            self._pages[key] = (version, page)
+            self.renders += 1
+            return page
+
+    def page(self, key: str, render: Callable[[], str]) -> Asset:
+        """A page whose HTML only changes with the code (rendered once per process)"""
+        cached = self._pages.get(key)
+        if cached is not None:
+            return cached[1]
+        return self._render(key, None, render)
+
+    def file_page(self, path: str) -> Asset:
+        """A page backed by an HTML file; raises FileNotFoundError"""
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._pages.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        def read():
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        return self._render(path, version, read)
+
+    def static(self, name: str) -> Optional[Asset]:
+        return self._static.get(name)
+
+    def stats(self) -> Dict:
+        return {
+            'pages': len(self._pages),
+            'staticAssets': len(self._static),
+            'renders': self.renders,
+            'bytes': sum(len(a.body) for _, a in self._pages.values()) + sum(len(a.body) for a in self._static.values()),
+        }
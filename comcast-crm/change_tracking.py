@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Change Tracking - updated_at, change sequence numbers and tombstones for delta exports
+Triggers stamp every inserted or updated visit with the current time and
+the next value of a change sequence. Deleted visits leave a tombstone
+carrying their own sequence number. A downstream tool (mail merge, GHL
+re-import) stores the cursor from its last pull and then asks for
+`change_seq > cursor`. Because SQLite commits writers one at a time,
+the sequence also follows commit order, and a cursor never skips a row
+the way a same-second updated_at comparison can. updated_at is still
+kept accurate and indexed for human `since=` filters.
+"""
+
+import sqlite3
+import sys
+from typing import Dict
+
+_STAMP = """
+    UPDATE change_seq SET seq = seq + 1 WHERE id = 1;
+    UPDATE business_visits
+    SET change_seq = (SELECT seq FROM change_seq WHERE id = 1),
+        updated_at = {updated_at}
+    WHERE id = NEW.id;"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS change_seq (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    seq INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO change_seq (id, seq) VALUES (1, 0);
+
+CREATE TABLE IF NOT EXISTS business_visit_tombstones (
+    visit_id INTEGER PRIMARY KEY,
+    change_seq INTEGER NOT NULL,
+    ghl_contact_id TEXT,                   -- so GHL-side tools can delete their copy
+    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_tombstones_seq ON business_visit_tombstones(change_seq);
+CREATE INDEX IF NOT EXISTS idx_change_seq ON business_visits(change_seq);
+CREATE INDEX IF NOT EXISTS idx_updated_at ON business_visits(updated_at);
+
+-- An insert keeps an explicitly supplied updated_at (imports)
+CREATE TRIGGER IF NOT EXISTS trg_change_insert
+AFTER INSERT ON business_visits
+BEGIN{_STAMP.format(updated_at='COALESCE(NEW.updated_at, CURRENT_TIMESTAMP)')}
+    DELETE FROM business_visit_tombstones WHERE visit_id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_change_delete
+AFTER DELETE ON business_visits
+BEGIN
+    UPDATE change_seq SET seq = seq + 1 WHERE id = 1;
+    INSERT OR REPLACE INTO business_visit_tombstones (visit_id, change_seq, ghl_contact_id)
+    VALUES (OLD.id, (SELECT seq FROM change_seq WHERE id = 1), OLD.ghl_contact_id);
+END;
+"""
+
+# Written only by triggers (this module's stamp, contact_keys' normalized keys).
+# Updating them is not a change, so the contact_keys self-update after an
+# insert doesn't stamp the row a second time.
+DERIVED_COLUMNS = ('id', 'change_seq', 'updated_at', 'phone_e164', 'email_norm')
+
+# Created by ensure_schema with every other column listed. An UPDATE that sets
+# updated_at itself keeps that value.
+_UPDATE_TRIGGER = """CREATE TRIGGER trg_change_update
+AFTER UPDATE OF {columns} ON business_visits
+BEGIN""" + _STAMP.format(
+    updated_at='CASE WHEN NEW.updated_at IS OLD.updated_at THEN CURRENT_TIMESTAMP ELSE NEW.updated_at END') + """
+END"""
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """
+    Add change_seq (numbering existing rows in id order) plus the tables, indexes and triggers.
+    Runs after every other module, so the update trigger covers the columns they add;
+    it is recreated whenever the column set has changed.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(business_visits)")]
+    if 'change_seq' not in columns:
+        with conn:
+            conn.execute("ALTER TABLE business_visits ADD COLUMN change_seq INTEGER")
+            conn.execute("UPDATE business_visits SET change_seq = id")
+    conn.executescript(SCHEMA)
+    update_trigger = _UPDATE_TRIGGER.format(
+        columns=', '.join(column for column in columns if column not in DERIVED_COLUMNS))
+    existing = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_change_update'").fetchone()
+    if not existing or existing[0] != update_trigger:
+        with conn:
+            conn.execute("DROP TRIGGER IF EXISTS trg_change_update")
+            conn.execute(update_trigger)
+    with conn:
+        # Existing rows took sequence numbers 1..max(id)
+        conn.execute("""
+            UPDATE change_seq SET seq = (SELECT COALESCE(MAX(change_seq), 0) FROM business_visits)
+            WHERE id = 1 AND seq < (SELECT COALESCE(MAX(change_seq), 0) FROM business_visits)
+        """)
+
+
+def current_seq(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT seq FROM change_seq WHERE id = 1").fetchone()[0]
+
+
+def changes(conn: sqlite3.Connection, cursor: int = 0, limit: int = 1000) -> Dict:
+    """
+    Visits changed and deleted after `cursor`, in commit order.
+
+    Returns:
+        {'visits': [row dicts], 'deleted': [{'id', 'ghlContactId', 'deletedAt'}],
+         'nextCursor': n, 'hasMore': bool} - pass nextCursor back to continue
+    """
+    visits = conn.execute("""
+        SELECT * FROM business_visits WHERE change_seq > ? ORDER BY change_seq LIMIT ?
+    """, (cursor, limit + 1)).fetchall()
+    tombstones = conn.execute("""
+        SELECT visit_id, change_seq, ghl_contact_id, deleted_at FROM business_visit_tombstones
+        WHERE change_seq > ? ORDER BY change_seq LIMIT ?
+    """, (cursor, limit + 1)).fetchall()
+
+    merged = sorted([(row['change_seq'], 'visit', row) for row in visits] +
+                    [(row[1], 'deleted', row) for row in tombstones], key=lambda item: item[0])
+    page = merged[:limit]
+    result: Dict = {'visits': [], 'deleted': []}
+    for _, kind, row in page:
+        if kind == 'visit':
+            result['visits'].append(dict(row))
+        else:
+            result['deleted'].append({'id': row[0], 'ghlContactId': row[2], 'deletedAt': row[3]})
+    result['nextCursor'] = page[-1][0] if page else cursor
+    result['hasMore'] = len(merged) > limit
+    return result
+
+
+def purge_tombstones(conn: sqlite3.Connection, older_than_days: float = 90) -> int:
+    """Drop tombstones old enough that every consumer has synced past them"""
+    with conn:
+        return conn.execute("""
+            DELETE FROM business_visit_tombstones WHERE deleted_at < datetime('now', ?)
+        """, (f"-{older_than_days} days",)).rowcount
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    ensure_schema(conn)
+    if len(sys.argv) > 1 and sys.argv[1] == "purge":
+        print(f"Purged {purge_tombstones(conn)} tombstones")
+    else:
+        since = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+        delta = changes(conn, since, limit=20)
+        print(f"change_seq: {current_seq(conn)}")
+        for visit in delta['visits']:
+            print(f"  {visit['change_seq']:>6}  visit {visit['id']}  {visit['updated_at']}  {visit['business_name']}")
+        for tombstone in delta['deleted']:
+            print(f"  deleted {tombstone['id']}  {tombstone['deletedAt']}")
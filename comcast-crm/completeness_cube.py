@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Completeness Cube - email/phone completeness for every combination of zip, status, source and week
+One GROUP BY scan of business_visits gives base cells at the finest grain
+(all four dimensions plus the has-email / has-phone flags). Every cube a
+request asks for is then summed from those cells in memory. That includes
+the rolled-up totals for each subset of the requested dimensions, as
+GROUP BY CUBE would give. The base cells are kept per process until the
+data version moves (see report_jobs.py), so drilling down on the reports
+page costs no further database passes.
+"""
+
+import sqlite3
+import sys
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from report_jobs import data_version
+from visit_rollups import bucket_sql
+
+# dimension -> SQL expression; weeks start Monday, as in the visit rollups
+DIMENSIONS = {
+    'zip': "COALESCE(zip_code, '')",
+    'status': "COALESCE(visit_status, '')",
+    'source': "COALESCE(source, '')",
+    # '' for visits with no usable date, so NULL only ever means "all weeks"
+    'week': bucket_sql('week'),
+}
+
+BASE_CELLS_SQL = f"""
+    SELECT {', '.join(DIMENSIONS.values())},
+           email_norm IS NOT NULL, phone_e164 IS NOT NULL, COUNT(*)
+    FROM business_visits
+    GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+# Base cell: (zip, status, source, week, has_email, has_phone, visits)
+Cell = Tuple[str, str, str, str, int, int, int]
+
+
+def base_cells(conn: sqlite3.Connection) -> List[Cell]:
+    """The one scan: visit counts at the finest grain"""
+    return [tuple(row) for row in conn.execute(BASE_CELLS_SQL).fetchall()]
+
+
+def parse_dims(value: Optional[str]) -> List[str]:
+    """'zip,week' -> ['zip', 'week'] (order kept, duplicates dropped); raises ValueError on unknown names"""
+    dims = []
+    for dim in (value or '').split(','):
+        dim = dim.strip()
+        if not dim or dim in dims:
+            continue
+        if dim not in DIMENSIONS:
+            raise ValueError(f"unknown dimension {dim!r}; choose from {', '.join(DIMENSIONS)}")
+        dims.append(dim)
+    return dims
+
+
+def build_cube(cells: List[Cell], dims: Sequence[str]) -> List[Dict]:
+    """
+    Sum base cells into every combination of the requested dimensions.
+
+    Returns:
+        [{<dim>: value, or None for "all", 'total', 'both', 'emailOnly', 'phoneOnly', 'neither'}, ...]
+        with rolled-up (None) values ahead of concrete ones, so the grand total comes first
+    """
+    positions = [list(DIMENSIONS).index(dim) for dim in dims]
+    projected: Dict[tuple, List[int]] = {}
+    for cell in cells:
+        key = tuple(cell[p] for p in positions)
+        counts = projected.setdefault(key, [0, 0, 0, 0])  # both, email only, phone only, neither
+        counts[(0 if cell[5] else 1) if cell[4] else (2 if cell[5] else 3)] += cell[6]
+
+    # Roll up one dimension at a time; each pass sums the (already smaller) output of the last
+    cube = projected
+    for i in range(len(dims)):
+        for key, counts in list(cube.items()):
+            totals = cube.setdefault(key[:i] + (None,) + key[i + 1:], [0, 0, 0, 0])
+            totals[0] += counts[0]
+            totals[1] += counts[1]
+            totals[2] += counts[2]
+            totals[3] += counts[3]
+
+    result = []
+    for key in sorted(cube, key=lambda k: [(value is not None, value or '') for value in k]):
+        both, email_only, phone_only, neither = cube[key]
+        entry = dict(zip(dims, key))
+        entry.update(total=both + email_only + phone_only + neither, both=both,
+                     emailOnly=email_only, phoneOnly=phone_only, neither=neither)
+        result.append(entry)
+    return result
+
+
+class CubeCache:
+    """Base cells of the latest data version plus the cubes built from them, shared by this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._cells: List[Cell] = []
+        self._cubes: Dict[tuple, List[Dict]] = {}
+        self.scans = 0
+
+    def cube(self, conn: sqlite3.Connection, dims: Sequence[str]) -> Tuple[int, List[Dict], bool]:
+        """(data version, cube cells, whether the base cells came from cache)"""
+        version = data_version(conn)
+        # One scan per data version even when several requests arrive together
+        with self._lock:
+            cached = self._version == version
+            if not cached:
+                # Read after the version, so the cells are never older than their label
+                self._cells = base_cells(conn)
+                self._version = version
+                self._cubes = {}
+                self.scans += 1
+            key = tuple(dims)
+            if key not in self._cubes:
+                self._cubes[key] = build_cube(self._cells, dims)
+            return version, self._cubes[key], cached
+
+    def stats(self) -> Dict:
+        return {'dataVersion': self._version, 'baseCells': len(self._cells),
+                'cubes': len(self._cubes), 'scans': self.scans}
+
+
+if __name__ == "__main__":
+    import db_schema
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    db_schema.ensure_schema(conn)
+    dims = parse_dims(sys.argv[1] if len(sys.argv) > 1 else 'zip')
+    cells = base_cells(conn)
+    print(f"{len(cells)} base cells at data version {data_version(conn)}")
+    for entry in build_cube(cells, dims)[:40]:
+        labels = ' '.join(f"{dim}={entry[dim] if entry[dim] is not None else '*'}" for dim in dims)
+        print(f"  {labels:40} total={entry['total']:<6} both={entry['both']:<6} "
+              f"email_only={entry['emailOnly']:<6} phone_only={entry['phoneOnly']:<6} neither={entry['neither']}")
@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""
+Config - file locations shared by the servers, the sync service and the CLIs
+Everything defaults to paths relative to this directory, so the same tree
+runs on a laptop and on Railway. Environment variables override them.
+"""
+
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# SQLite database
+DB_PATH = os.getenv("COMCAST_DB_PATH", os.path.join(BASE_DIR, "comcast.db"))
+
+# Map front end (../comcast/index.html)
+MAP_DIR = os.getenv("COMCAST_MAP_DIR", os.path.join(os.path.dirname(BASE_DIR), "comcast"))
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Contact Keys - normalized phone/email columns for indexed lookups
+phone_e164 and email_norm are maintained by triggers (plain SQL, so the
+Node scripts and the sqlite3 CLI keep them right too) and indexed, so
+dedupe lookups and completeness filters no longer scan the table.
+"""
+
+import re
+import sqlite3
+import sys
+from typing import Dict, List, Optional
+
+
+def _phone_sql(col: str) -> str:
+    """
+    SQL expression normalizing a phone column:
+      10 digits            -> +1XXXXXXXXXX
+      11 digits starting 1 -> +1XXXXXXXXXX
+      '+' prefixed         -> +<digits>
+      other digit strings  -> <digits>   (kept, so "has phone" stays true)
+      text with letters    -> trimmed original
+      empty / NULL         -> NULL
+    """
+    digits = col
+    for ch in (' ', '-', '(', ')', '.', '+', '/'):
+        digits = f"REPLACE({digits}, '{ch}', '')"
+    return f"""(CASE
+        WHEN {col} IS NULL OR TRIM({col}) = '' THEN NULL
+        WHEN {digits} = '' THEN NULL
+        WHEN {digits} GLOB '*[^0-9]*' THEN TRIM({col})
+        WHEN LENGTH({digits}) = 10 THEN '+1' || {digits}
+        WHEN LENGTH({digits}) = 11 AND SUBSTR({digits}, 1, 1) = '1' THEN '+' || {digits}
+        WHEN TRIM({col}) LIKE '+%' THEN '+' || {digits}
+        ELSE {digits}
+    END)"""
+
+
+def _email_sql(col: str) -> str:
+    """SQL expression normalizing an email column: trimmed, lowercased, NULL when empty"""
+    return f"NULLIF(LOWER(TRIM({col})), '')"
+
+
+SCHEMA = f"""
+CREATE INDEX IF NOT EXISTS idx_phone_e164 ON business_visits(phone_e164);
+-- email first, phone second: also covers the "has both / neither" completeness counts
+CREATE INDEX IF NOT EXISTS idx_email_norm ON business_visits(email_norm, phone_e164);
+
+CREATE TRIGGER IF NOT EXISTS trg_contact_keys_insert
+AFTER INSERT ON business_visits
+BEGIN
+    UPDATE business_visits
+    SET phone_e164 = {_phone_sql('NEW.phone')},
+        email_norm = {_email_sql('NEW.email')}
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_contact_keys_update
+AFTER UPDATE OF phone, email ON business_visits
+BEGIN
+    UPDATE business_visits
+    SET phone_e164 = {_phone_sql('NEW.phone')},
+        email_norm = {_email_sql('NEW.email')}
+    WHERE id = NEW.id;
+END;
+"""
+
+_PHONE_STRIP = re.compile(r'[ \-().+/]')
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Python twin of the trigger expression - use it to build lookup keys"""
+    if phone is None or not phone.strip():
+        return None
+    digits = _PHONE_STRIP.sub('', phone)
+    if not digits:
+        return None
+    if not digits.isdigit():
+        return phone.strip()
+    if len(digits) == 10:
+        return '+1' + digits
+    if len(digits) == 11 and digits[0] == '1':
+        return '+' + digits
+    if phone.strip().startswith('+'):
+        return '+' + digits
+    return digits
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    if email is None:
+        return None
+    return email.strip().lower() or None
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Add the normalized columns (backfilling existing rows), indexes and triggers if missing"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(business_visits)")}
+    with conn:
+        if 'phone_e164' not in columns:
+            conn.execute("ALTER TABLE business_visits ADD COLUMN phone_e164 TEXT")
+        if 'email_norm' not in columns:
+            conn.execute("ALTER TABLE business_visits ADD COLUMN email_norm TEXT")
+        if 'phone_e164' not in columns or 'email_norm' not in columns:
+            backfill(conn)
+    conn.executescript(SCHEMA)
+
+
+def backfill(conn: sqlite3.Connection):
+    """Recompute both normalized columns for every row (caller commits)"""
+    conn.execute(f"""
+        UPDATE business_visits
+        SET phone_e164 = {_phone_sql('phone')},
+            email_norm = {_email_sql('email')}
+    """)
+
+
+def lookup_visits(conn: sqlite3.Connection,
+                  phone: Optional[str] = None,
+                  email: Optional[str] = None) -> List[Dict]:
+    """
+    Visits whose normalized phone or email matches (index equality lookups).
+
+    Args:
+        conn: Open connection
+        phone: Phone in any common format ("(253) 555-0100", "+1 253 555 0100")
+        email: Email in any case
+
+    Returns:
+        Matching visits, newest first, each tagged with what matched
+    """
+    found = {}
+    probes = []
+    phone_key = normalize_phone(phone)
+    email_key = normalize_email(email)
+    if phone_key:
+        probes.append(('phone', "phone_e164 = ?", phone_key))
+    if email_key:
+        probes.append(('email', "email_norm = ?", email_key))
+
+    for matched, where, key in probes:
+        cursor = conn.execute(f"""
+            SELECT id, business_name, contact_name, phone, email, address, city,
+                   zip_code, visit_status, visit_date, ghl_contact_id
+            FROM business_visits
+            WHERE {where}
+        """, (key,))
+        for row in cursor.fetchall():
+            visit = found.get(row[0])
+            if visit:
+                visit['matched'].append(matched)
+                continue
+            found[row[0]] = {
+                '_id': str(row[0]),
+                'businessName': row[1],
+                'contactName': row[2],
+                'phone': row[3],
+                'email': row[4],
+                'address': row[5],
+                'city': row[6],
+                'zip': row[7],
+                'status': row[8],
+                'visitDate': row[9],
+                'ghlContactId': row[10],
+                'matched': [matched],
+            }
+
+    return sorted(found.values(), key=lambda v: v['visitDate'] or '', reverse=True)
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+        with conn:
+            backfill(conn)
+        print("Normalized phone/email columns recomputed")
+    elif len(sys.argv) > 1 and sys.argv[1] == "dupes":
+        for key, count in conn.execute("""
+            SELECT phone_e164, COUNT(*) FROM business_visits
+            WHERE phone_e164 IS NOT NULL GROUP BY phone_e164 HAVING COUNT(*) > 1
+        """):
+            print(f"phone {key}: {count} visits")
+        for key, count in conn.execute("""
+            SELECT email_norm, COUNT(*) FROM business_visits
+            WHERE email_norm IS NOT NULL GROUP BY email_norm HAVING COUNT(*) > 1
+        """):
+            print(f"email {key}: {count} visits")
+    else:
+        print("Usage: python3 contact_keys.py [backfill|dupes]")
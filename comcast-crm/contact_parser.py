@@ -39,6 +39,16 @@ class ParsedContact:
             'others': [o.to_dict() for o in self.others],
             'role_notes': self.role_notes
         }
+    
+    @property
+    def primary(self) -> Optional[ParsedPerson]:
+        """Person a mail merge or GHL contact is addressed to: decision maker, else first other, else gatekeeper"""
+        return self.decision_maker or (self.others[0] if self.others else None) or self.gatekeeper
+    
+    def primary_name(self) -> Tuple[str, str]:
+        """(first_name, last_name) of the primary person, ('', '') when nobody was parsed"""
+        person = self.primary
+        return (person.first_name, person.last_name) if person else ('', '')
 
 
 class ContactParser:
@@ -82,8 +92,9 @@ class ContactParser:
         """
         if not name:
             return ''
-        # Capitalize each word
-        return ' '.join(word.capitalize() for word in name.split())
+        # Capitalize all-lower/all-upper words; mixed case ("McDonald") was typed on purpose
+        return ' '.join(word.capitalize() if word.islower() or word.isupper() else word
+                        for word in name.split())
     
     def parse_name(self, name_str: str) -> Tuple[str, str]:
         """
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Derived schema - tables, columns, indexes and triggers added on top of schema.sql
+Each feature module owns its DDL; this runs them all against a connection
+so existing databases pick up new objects without a manual migration.
+"""
+
+import sqlite3
+
+import change_tracking
+import contact_keys
+import geo_index
+import geocoder
+import idempotency
+import ingest_queue
+import log_retention
+import mail_merge_names
+import people_index
+import report_jobs
+import visit_rollups
+import visit_search
+
+# Indexes on the core tables that shipped after schema.sql
+CORE_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_visit_date ON business_visits(visit_date);
+CREATE INDEX IF NOT EXISTS idx_zip_date ON business_visits(zip_code, visit_date);
+CREATE INDEX IF NOT EXISTS idx_map_date ON business_visits(visit_date)
+    WHERE lat IS NOT NULL AND lng IS NOT NULL;
+"""
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create any missing derived objects (idempotent; backfills new tables/columns)"""
+    conn.executescript(CORE_INDEXES)
+    contact_keys.ensure_schema(conn)
+    geo_index.ensure_schema(conn)
+    geocoder.ensure_schema(conn)
+    idempotency.ensure_schema(conn)
+    ingest_queue.ensure_schema(conn)
+    log_retention.ensure_schema(conn)
+    mail_merge_names.ensure_schema(conn)
+    people_index.ensure_schema(conn)
+    report_jobs.ensure_schema(conn)
+    visit_search.ensure_schema(conn)
+    visit_rollups.ensure_schema(conn)
+    # Last, so the backfills above don't stamp every existing row as changed
+    change_tracking.ensure_schema(conn)
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    print(f"Derived schema up to date: {DB_PATH}")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Geo Index - R*Tree spatial index over visit coordinates
+Nearest-neighbour queries expand a bounding box over the R*Tree until it
+holds k candidates inside the search radius, then re-rank by exact
+haversine distance against the stored lat/lng.
+"""
+
+import math
+import sqlite3
+import sys
+from typing import Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS visits_rtree USING rtree(
+    id,                                    -- business_visits.id
+    min_lat, max_lat,
+    min_lng, max_lng
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_rtree_insert
+AFTER INSERT ON business_visits
+WHEN NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL
+BEGIN
+    INSERT INTO visits_rtree VALUES (NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rtree_update
+AFTER UPDATE OF lat, lng ON business_visits
+BEGIN
+    DELETE FROM visits_rtree WHERE id = OLD.id;
+    INSERT INTO visits_rtree
+    SELECT NEW.id, NEW.lat, NEW.lat, NEW.lng, NEW.lng
+    WHERE NEW.lat IS NOT NULL AND NEW.lng IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_rtree_delete
+AFTER DELETE ON business_visits
+BEGIN
+    DELETE FROM visits_rtree WHERE id = OLD.id;
+END;
+"""
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = 111.32
+KM_PER_MILE = 1.609344
+
+# Statuses that are done with - skipped unless the caller asks for them
+CLOSED_STATUSES = ('customer', 'existing_customer', 'not-interested', 'not-a-prospect', 'partner')
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the R*Tree and sync triggers; a newly created index is loaded from business_visits"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visits_rtree'"
+    ).fetchone()
+    conn.executescript(SCHEMA)
+    if not exists:
+        rebuild(conn)
+
+
+def rebuild(conn: sqlite3.Connection):
+    """Reload the R*Tree from every visit that has coordinates"""
+    with conn:
+        conn.execute("DELETE FROM visits_rtree")
+        conn.execute("""
+            INSERT INTO visits_rtree
+            SELECT id, lat, lat, lng, lng FROM business_visits
+            WHERE lat IS NOT NULL AND lng IS NOT NULL
+        """)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in km"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple:
+    """(min_lat, max_lat, min_lng, max_lng) enclosing a circle of radius_km"""
+    dlat = radius_km / KM_PER_DEG_LAT
+    # Widen longitude span toward the poles; clamp cos to avoid division by ~0
+    dlng = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def nearest_visits(conn: sqlite3.Connection, lat: float, lng: float,
+                   k: int = 10,
+                   statuses: Optional[Iterable[str]] = None,
+                   exclude_id: Optional[int] = None,
+                   max_km: float = 80.0,
+                   start_km: float = 0.5) -> List[Dict]:
+    """
+    k nearest visits to a point.
+
+    Args:
+        conn: Open connection
+        lat, lng: Search origin
+        k: Number of results
+        statuses: Only these visit_status values; None means anything not in CLOSED_STATUSES
+        exclude_id: Visit to leave out (e.g. the one just finished)
+        max_km: Give up expanding past this radius
+        start_km: Initial search radius
+
+    Returns:
+        Up to k visits ordered by exact distance, each with distanceKm / distanceMi
+    """
+    statuses = list(statuses) if statuses else None
+    if statuses:
+        status_clause = f" AND v.visit_status IN ({', '.join('?' * len(statuses))})"
+        status_params = statuses
+    else:
+        status_clause = f" AND COALESCE(v.visit_status, '') NOT IN ({', '.join('?' * len(CLOSED_STATUSES))})"
+        status_params = list(CLOSED_STATUSES)
+    if exclude_id is not None:
+        status_clause += " AND v.id != ?"
+        status_params = status_params + [exclude_id]
+
+    sql = f"""
+        SELECT v.id, v.business_name, v.contact_name, v.phone, v.address, v.city,
+               v.zip_code, v.lat, v.lng, v.visit_status, v.visit_date
+        FROM visits_rtree r
+        JOIN business_visits v ON v.id = r.id
+        WHERE r.max_lat >= ? AND r.min_lat <= ?
+          AND r.max_lng >= ? AND r.min_lng <= ?
+          {status_clause}
+    """
+
+    radius_km = min(start_km, max_km)
+    while True:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        rows = conn.execute(sql, [min_lat, max_lat, min_lng, max_lng] + status_params).fetchall()
+
+        # Only hits inside the circle are guaranteed to beat anything outside the box
+        ranked = []
+        for row in rows:
+            distance = haversine_km(lat, lng, row[7], row[8])
+            if distance <= radius_km:
+                ranked.append((distance, row))
+
+        if len(ranked) >= k or radius_km >= max_km:
+            break
+        # Grow toward the radius that should hold k hits at the density seen so far
+        density = max(len(ranked), 1) / (radius_km * radius_km)
+        radius_km = min(max_km, max(radius_km * 2, math.sqrt(k / density) * 1.2))
+
+    ranked.sort(key=lambda item: item[0])
+    return [{
+        '_id': str(row[0]),
+        'businessName': row[1],
+        'contactName': row[2],
+        'phone': row[3],
+        'address': row[4],
+        'city': row[5],
+        'zip': row[6],
+        'lat': row[7],
+        'lng': row[8],
+        'status': row[9],
+        'visitDate': row[10],
+        'distanceKm': round(distance, 3),
+        'distanceMi': round(distance / KM_PER_MILE, 3),
+    } for distance, row in ranked[:k]]
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        conn.executescript(SCHEMA)
+        rebuild(conn)
+        print("R*Tree rebuilt")
+    elif len(sys.argv) > 3 and sys.argv[1] == "nearby":
+        ensure_schema(conn)
+        for visit in nearest_visits(conn, float(sys.argv[2]), float(sys.argv[3])):
+            print(f"{visit['distanceMi']:6.2f} mi  {visit['businessName']} [{visit['status']}]")
+    else:
+        print("Usage: python3 geo_index.py [rebuild|nearby <lat> <lng>]")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Geocoder - batch fill of missing lat/lng with a persistent address cache
+
+Pipeline:
+  1. pull every visit without coordinates
+  2. normalize addresses and group visits sharing one
+  3. answer what we can from geocode_cache (one indexed IN lookup per batch)
+  4. send each remaining unique address to the backend once, caching hits and misses
+  5. write coordinates back with one executemany per batch
+
+Backends are pluggable: Nominatim (rate-limited, online) or a ZIP-centroid
+stand-in that works offline from VERIFIED_ZIP_CODES.js and the visits that
+already have coordinates.
+"""
+
+import os
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    address_key TEXT PRIMARY KEY,          -- normalize_address() output
+    lat REAL,                              -- NULL when the backend found nothing
+    lng REAL,
+    provider TEXT,                         -- nominatim, zip-centroid, ...
+    precision TEXT,                        -- address, zip
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+"""
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ZIP_CENTROIDS_JS = os.path.join(SCRIPT_DIR, '..', 'VERIFIED_ZIP_CODES.js')
+
+BATCH_SIZE = 500
+
+_STREET_WORDS = {
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'boulevard': 'blvd',
+    'drive': 'dr', 'lane': 'ln', 'court': 'ct', 'place': 'pl', 'highway': 'hwy',
+    'parkway': 'pkwy', 'terrace': 'ter', 'circle': 'cir', 'way': 'way',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northwest': 'nw', 'northeast': 'ne', 'southwest': 'sw', 'southeast': 'se',
+}
+_UNIT = re.compile(r'\b(suite|ste|apt|unit|bldg|building)\b\.?\s*[\w-]+|#\s*[\w-]+')
+_NON_ALNUM = re.compile(r'[^0-9a-z ]+')
+
+
+@dataclass
+class NormalizedAddress:
+    street: str
+    city: str
+    state: str
+    zip_code: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.street}|{self.city}|{self.state}|{self.zip_code}"
+
+    @property
+    def query(self) -> str:
+        """Free-form query string for online geocoders"""
+        street = f"{self.street}, " if self.street else ''
+        return f"{street}{self.city}, {self.state} {self.zip_code}".strip(' ,')
+
+
+def normalize_address(address: Optional[str], city: Optional[str],
+                      state: Optional[str], zip_code: Optional[str]) -> NormalizedAddress:
+    """
+    Canonical form used as the cache key: lowercase, unit numbers dropped,
+    street suffixes/directions abbreviated, and any ", City, WA 98xxx" tail
+    on the street line ignored in favour of the separate columns.
+    """
+    street = (address or '').split(',')[0].casefold()
+    street = _UNIT.sub(' ', street)
+    street = _NON_ALNUM.sub(' ', street)
+    street = ' '.join(_STREET_WORDS.get(word, word) for word in street.split())
+    city_key = ' '.join(_NON_ALNUM.sub(' ', (city or '').casefold()).split())
+    state_key = (state or 'WA').strip().upper()
+    zip_key = (zip_code or '').strip()[:5]
+    return NormalizedAddress(street, city_key, state_key, zip_key)
+
+
+class ZipCentroidGeocoder:
+    """Offline stand-in: every address resolves to its ZIP's centroid"""
+    name = 'zip-centroid'
+    precision = 'zip'
+
+    def __init__(self, conn: Optional[sqlite3.Connection] = None, js_path: str = ZIP_CENTROIDS_JS):
+        self.centroids: Dict[str, Tuple[float, float]] = {}
+        # Mean of already-geocoded visits, then verified centroids on top
+        if conn is not None:
+            for zip_code, lat, lng in conn.execute("""
+                SELECT zip_code, AVG(lat), AVG(lng) FROM business_visits
+                WHERE lat IS NOT NULL AND lng IS NOT NULL
+                GROUP BY zip_code
+            """):
+                self.centroids[(zip_code or '')[:5]] = (lat, lng)
+        if os.path.exists(js_path):
+            with open(js_path) as f:
+                text = f.read()
+            for zip_code, lat, lng in re.findall(
+                    r"zip:\s*'(\d{5})'.*?lat:\s*(-?[\d.]+),\s*lng:\s*(-?[\d.]+)", text, re.S):
+                self.centroids[zip_code] = (float(lat), float(lng))
+
+    def geocode(self, address: NormalizedAddress) -> Optional[Tuple[float, float]]:
+        return self.centroids.get(address.zip_code)
+
+
+class NominatimGeocoder:
+    """OpenStreetMap Nominatim - at most one request per second, per their usage policy"""
+    name = 'nominatim'
+    precision = 'address'
+    URL = 'https://nominatim.openstreetmap.org/search'
+
+    def __init__(self, min_interval: float = 1.1):
+        import requests
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'DaequanAI-ComcastCRM/1.0'
+        self.min_interval = min_interval
+        self._last_call = 0.0
+
+    def geocode(self, address: NormalizedAddress) -> Optional[Tuple[float, float]]:
+        wait = self._last_call + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_call = time.monotonic()
+        response = self.session.get(self.URL, params={'format': 'json', 'q': address.query, 'limit': 1},
+                                    timeout=30)
+        response.raise_for_status()
+        results = response.json()
+        if not results:
+            return None
+        return float(results[0]['lat']), float(results[0]['lon'])
+
+
+BACKENDS = {
+    'zip': ZipCentroidGeocoder,
+    'nominatim': NominatimGeocoder,
+}
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    conn.executescript(SCHEMA)
+
+
+def _cached(conn: sqlite3.Connection, keys: List[str], precisions: Tuple[str, ...]) -> Dict[str, tuple]:
+    """address_key -> (lat, lng) for cache rows at an acceptable precision (lat may be None = known miss)"""
+    found = {}
+    marks = ', '.join('?' * len(precisions))
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        rows = conn.execute(f"""
+            SELECT address_key, lat, lng FROM geocode_cache
+            WHERE address_key IN ({', '.join('?' * len(batch))})
+              AND precision IN ({marks})
+        """, batch + list(precisions))
+        for key, lat, lng in rows:
+            found[key] = (lat, lng)
+    return found
+
+
+def geocode_missing(conn: sqlite3.Connection, geocoder, limit: Optional[int] = None,
+                    retry_misses: bool = False) -> Dict:
+    """
+    Fill lat/lng for every visit that lacks them.
+
+    Args:
+        conn: Open connection
+        geocoder: Backend with .name, .precision and .geocode(NormalizedAddress)
+        limit: Max unique addresses to send to the backend this run
+        retry_misses: Ask the backend again for addresses cached as not found
+
+    Returns:
+        Counters for the run (visits, unique addresses, cache hits, lookups, ...)
+    """
+    ensure_schema(conn)
+    started = time.perf_counter()
+
+    groups: Dict[str, List[int]] = {}
+    addresses: Dict[str, NormalizedAddress] = {}
+    for visit_id, address, city, state, zip_code in conn.execute("""
+        SELECT id, address, city, state, zip_code FROM business_visits
+        WHERE lat IS NULL OR lng IS NULL
+    """).fetchall():
+        normalized = normalize_address(address, city, state, zip_code)
+        if not normalized.street and not normalized.zip_code:
+            continue
+        groups.setdefault(normalized.key, []).append(visit_id)
+        addresses[normalized.key] = normalized
+
+    # A zip-level backend may reuse address-level answers, not the other way round
+    precisions = ('address',) if geocoder.precision == 'address' else ('address', 'zip')
+    cache = _cached(conn, list(groups), precisions)
+    if retry_misses:
+        cache = {k: v for k, v in cache.items() if v[0] is not None}
+
+    stats = {'visits': sum(len(ids) for ids in groups.values()), 'addresses': len(groups),
+             'cacheHits': len(cache), 'lookups': 0, 'notFound': 0, 'errors': 0, 'updated': 0}
+
+    pending = [key for key in groups if key not in cache]
+    if limit is not None:
+        pending = pending[:limit]
+
+    for start in range(0, len(pending), BATCH_SIZE):
+        new_rows = []
+        for key in pending[start:start + BATCH_SIZE]:
+            try:
+                point = geocoder.geocode(addresses[key])
+            except Exception as e:
+                stats['errors'] += 1
+                print(f"  {addresses[key].query}: {str(e)[:120]}")
+                continue
+            stats['lookups'] += 1
+            if point is None:
+                stats['notFound'] += 1
+            cache[key] = point or (None, None)
+            new_rows.append((key, cache[key][0], cache[key][1], geocoder.name, geocoder.precision))
+        # Cache progress survives an interrupted run
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO geocode_cache (address_key, lat, lng, provider, precision)
+                VALUES (?, ?, ?, ?, ?)
+            """, new_rows)
+
+    updates = [(lat, lng, visit_id)
+               for key, (lat, lng) in cache.items() if lat is not None
+               for visit_id in groups[key]]
+    with conn:
+        conn.executemany("UPDATE business_visits SET lat = ?, lng = ? WHERE id = ?", updates)
+    stats['updated'] = len(updates)
+    stats['elapsedMs'] = round((time.perf_counter() - started) * 1000, 1)
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+    from config import DB_PATH
+
+    arg_parser = argparse.ArgumentParser(description="Fill missing visit coordinates")
+    arg_parser.add_argument("--backend", choices=sorted(BACKENDS), default='zip')
+    arg_parser.add_argument("--limit", type=int, default=None, help="max backend lookups this run")
+    arg_parser.add_argument("--retry-misses", action="store_true")
+    arg_parser.add_argument("--db", default=DB_PATH)
+    args = arg_parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    backend = ZipCentroidGeocoder(conn) if args.backend == 'zip' else BACKENDS[args.backend]()
+    result = geocode_missing(conn, backend, limit=args.limit, retry_misses=args.retry_misses)
+    print(f"Visits missing coordinates: {result['visits']} ({result['addresses']} unique addresses)")
+    print(f"  Cache hits: {result['cacheHits']}")
+    print(f"  Backend lookups ({backend.name}): {result['lookups']} ({result['notFound']} not found, "
+          f"{result['errors']} errors)")
+    print(f"  Visits updated: {result['updated']} in {result['elapsedMs']} ms")
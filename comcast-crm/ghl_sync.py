@@ -7,41 +7,50 @@ Handles bidirectional sync between local SQLite and GHL
 import sqlite3
 import json
 import os
+import queue
 import sys
-import requests
+import threading
 from datetime import datetime
 from typing import Optional, Dict, List
 
-# Add parent dir to path for contact_parser
-sys.path.insert(0, '/Users/xfinch/.openclaw/workspace/comcast-crm')
+from config import DB_PATH
 from contact_parser import ContactParser
+import db_schema
+import group_commit
+import people_index
 
 # Config
-DB_PATH = "/Users/xfinch/.openclaw/workspace/comcast-crm/comcast.db"
 GHL_LOCATION_ID = os.getenv("GHL_COMCAST_LOCATION_ID", "nPubo6INanVq94ovAQNW")  # Comcast - Xavier sub-account
 GHL_API_KEY = os.getenv("GHL_COMCAST_TOKEN", os.getenv("GHL_TTL_TOKEN", ""))  # Use Comcast location token
 
+_schema_checked = False
+
 class GHLComcastSync:
-    def __init__(self):
-        self.conn = sqlite3.connect(DB_PATH)
+    def __init__(self, db_path: Optional[str] = None):
+        global _schema_checked
+        self.db_path = db_path or DB_PATH
+        self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
         self.contact_parser = ContactParser()
+        if not _schema_checked:
+            db_schema.ensure_schema(self.conn)
+            _schema_checked = True
         
-    def add_visit(self, 
-                  business_name: str,
-                  zip_code: str,
-                  contact_name: str = "",
-                  phone: str = "",
-                  email: str = "",
-                  address: str = "",
-                  city: str = "",
-                  notes: str = "",
-                  status: str = "interested",
-                  lat: float = None,
-                  lng: float = None,
-                  source: str = "whatsapp",
-                  account_id_8498: str = "") -> int:
-        """Add a new business visit to local DB with parsed contact fields"""
+    def _visit_row(self,
+                   business_name: str,
+                   zip_code: str,
+                   contact_name: str = "",
+                   phone: str = "",
+                   email: str = "",
+                   address: str = "",
+                   city: str = "",
+                   notes: str = "",
+                   status: str = "interested",
+                   lat: float = None,
+                   lng: float = None,
+                   source: str = "whatsapp",
+                   account_id_8498: str = "") -> tuple:
+        """Parse contact_name and build the INSERT parameters for one visit"""
         
         # Parse contact_name into structured fields
         parsed = self.contact_parser.parse(contact_name)
@@ -57,33 +66,96 @@ class GHLComcastSync:
         # Prepare other_contacts as JSON
         other_contacts_json = json.dumps([o.to_dict() for o in parsed.others]) if parsed.others else None
         
-        cursor = self.conn.cursor()
+        # Primary contact for mail merge / GHL, computed once here (see mail_merge_names.py)
+        mail_first, mail_last = parsed.primary_name()
+        
+        params = (business_name, contact_name, phone, email, address, city, zip_code,
+                  enhanced_notes, status, lat, lng, source, account_id_8498,
+                  parsed.gatekeeper.first_name if parsed.gatekeeper else None,
+                  parsed.gatekeeper.last_name if parsed.gatekeeper else None,
+                  parsed.decision_maker.first_name if parsed.decision_maker else None,
+                  parsed.decision_maker.last_name if parsed.decision_maker else None,
+                  other_contacts_json, mail_first or None, mail_last or None)
+        return params, parsed
+    
+    def _insert_visit(self, cursor, params: tuple, parsed) -> int:
+        """Write one prepared visit plus its people index rows (no commit)"""
         cursor.execute("""
             INSERT INTO business_visits 
             (business_name, contact_name, phone, email, address, city, zip_code, 
              notes, visit_status, lat, lng, source, account_id_8498,
              gatekeeper_first_name, gatekeeper_last_name,
              decision_maker_first_name, decision_maker_last_name,
-             other_contacts)
+             other_contacts, mail_first_name, mail_last_name)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
-                    ?, ?, ?, ?, ?)
-        """, (business_name, contact_name, phone, email, address, city, zip_code,
-              enhanced_notes, status, lat, lng, source, account_id_8498,
-              parsed.gatekeeper.first_name if parsed.gatekeeper else None,
-              parsed.gatekeeper.last_name if parsed.gatekeeper else None,
-              parsed.decision_maker.first_name if parsed.decision_maker else None,
-              parsed.decision_maker.last_name if parsed.decision_maker else None,
-              other_contacts_json))
-        
-        self.conn.commit()
+                    ?, ?, ?, ?, ?, ?, ?)
+        """, params)
         visit_id = cursor.lastrowid
         
+        # Index parsed people in the same transaction
+        people_index.index_visit_people(cursor.connection, visit_id, parsed)
+        return visit_id
+    
+    def _write(self, operation):
+        """Run operation(conn) through the process's group-commit writer; returns once committed"""
+        return group_commit.writer_for(self.db_path).run(operation)
+    
+    def add_visit(self, 
+                  business_name: str,
+                  zip_code: str,
+                  contact_name: str = "",
+                  phone: str = "",
+                  email: str = "",
+                  address: str = "",
+                  city: str = "",
+                  notes: str = "",
+                  status: str = "interested",
+                  lat: float = None,
+                  lng: float = None,
+                  source: str = "whatsapp",
+                  account_id_8498: str = "") -> int:
+        """Add a new business visit to local DB with parsed contact fields"""
+        
+        params, parsed = self._visit_row(
+            business_name, zip_code, contact_name, phone, email, address, city,
+            notes, status, lat, lng, source, account_id_8498)
+        
+        visit_id = self._write(lambda conn: self._insert_visit(conn.cursor(), params, parsed))
+        
         # Try to sync to GHL immediately
         if GHL_LOCATION_ID:
             self.sync_to_ghl(visit_id)
         
         return visit_id
     
+    def insert_visit(self, conn: sqlite3.Connection, **visit) -> int:
+        """add_visit() inside the caller's transaction: no commit and no GHL push"""
+        params, parsed = self._visit_row(**visit)
+        return self._insert_visit(conn.cursor(), params, parsed)
+    
+    def add_visits(self, visits: List[Dict], sync: bool = True) -> List[int]:
+        """
+        Add many visits in a single transaction.
+        
+        Args:
+            visits: add_visit() keyword arguments, one dict per visit
+            sync: Queue the new visits for background GHL sync
+            
+        Returns:
+            New visit IDs, in input order
+        """
+        rows = [self._visit_row(**visit) for visit in visits]
+        
+        def insert_all(conn):
+            cursor = conn.cursor()
+            return [self._insert_visit(cursor, params, parsed) for params, parsed in rows]
+        visit_ids = self._write(insert_all)
+        
+        if sync and GHL_LOCATION_ID and visit_ids:
+            queue_ghl_sync(visit_ids, self.db_path)
+        
+        return visit_ids
+    
     def sync_to_ghl(self, visit_id: int) -> bool:
         """Sync a local visit to GHL"""
         
@@ -110,8 +182,8 @@ class GHLComcastSync:
             custom_fields.append({"key": "account_id_8498", "value": visit['account_id_8498']})
         
         contact_data = {
-            "firstName": visit['contact_name'].split()[0] if visit['contact_name'] else visit['business_name'][:20],
-            "lastName": " ".join(visit['contact_name'].split()[1:]) if visit['contact_name'] and len(visit['contact_name'].split()) > 1 else "",
+            "firstName": visit['mail_first_name'] or visit['business_name'][:20],
+            "lastName": visit['mail_last_name'] or "",
             "email": visit['email'] or f"{visit['id']}@placeholder.com",
             "phone": visit['phone'],
             "address1": visit['address'],
@@ -122,6 +194,8 @@ class GHLComcastSync:
             "tags": ["comcast-prospect", f"zip-{visit['zip_code']}", visit['visit_status']]
         }
         
+        import requests  # loaded on the first GHL push, not at import
+        
         try:
             if visit['ghl_contact_id']:
                 # Update existing
@@ -152,42 +226,43 @@ class GHLComcastSync:
                 result = response.json()
                 ghl_id = result.get('contact', {}).get('id') or result.get('id')
                 
-                # Update local record
-                cursor.execute("""
-                    UPDATE business_visits 
-                    SET ghl_contact_id = ?, synced_to_ghl = 1, last_sync_error = NULL
-                    WHERE id = ?
-                """, (ghl_id, visit_id))
-                
-                # Log success
-                cursor.execute("""
-                    INSERT INTO sync_log (action, table_name, record_id, ghl_contact_id, status, message)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, ('create' if not visit['ghl_contact_id'] else 'update', 
-                      'business_visits', visit_id, ghl_id, 'success', ''))
+                def record_success(conn):
+                    # Update local record
+                    conn.execute("""
+                        UPDATE business_visits 
+                        SET ghl_contact_id = ?, synced_to_ghl = 1, last_sync_error = NULL
+                        WHERE id = ?
+                    """, (ghl_id, visit_id))
+                    
+                    # Log success
+                    conn.execute("""
+                        INSERT INTO sync_log (action, table_name, record_id, ghl_contact_id, status, message)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, ('create' if not visit['ghl_contact_id'] else 'update', 
+                          'business_visits', visit_id, ghl_id, 'success', ''))
                 
-                self.conn.commit()
+                self._write(record_success)
                 return True
             else:
                 error_msg = f"HTTP {response.status_code}: {response.text[:200]}"
-                cursor.execute("""
-                    UPDATE business_visits SET last_sync_error = ? WHERE id = ?
-                """, (error_msg, visit_id))
                 
-                cursor.execute("""
-                    INSERT INTO sync_log (action, table_name, record_id, status, message)
-                    VALUES (?, ?, ?, ?, ?)
-                """, ('create', 'business_visits', visit_id, 'error', error_msg))
+                def record_error(conn):
+                    conn.execute("""
+                        UPDATE business_visits SET last_sync_error = ? WHERE id = ?
+                    """, (error_msg, visit_id))
+                    
+                    conn.execute("""
+                        INSERT INTO sync_log (action, table_name, record_id, status, message)
+                        VALUES (?, ?, ?, ?, ?)
+                    """, ('create', 'business_visits', visit_id, 'error', error_msg))
                 
-                self.conn.commit()
+                self._write(record_error)
                 return False
                 
         except Exception as e:
             error_msg = str(e)[:200]
-            cursor.execute("""
-                UPDATE business_visits SET last_sync_error = ? WHERE id = ?
-            """, (error_msg, visit_id))
-            self.conn.commit()
+            self._write(lambda conn: conn.execute(
+                "UPDATE business_visits SET last_sync_error = ? WHERE id = ?", (error_msg, visit_id)))
             return False
     
     def get_visits_by_zip(self, zip_code: str) -> List[Dict]:
@@ -236,6 +311,31 @@ class GHLComcastSync:
         
         return results
 
+_sync_queue = None
+_sync_queue_lock = threading.Lock()
+
+def queue_ghl_sync(visit_ids: List[int], db_path: Optional[str] = None):
+    """Hand visits in db_path to this process's background GHL sync thread (started on first use)"""
+    global _sync_queue
+    with _sync_queue_lock:
+        if _sync_queue is None:
+            _sync_queue = queue.Queue()
+            threading.Thread(target=_sync_worker, args=(_sync_queue,), daemon=True,
+                             name="ghl-sync").start()
+    _sync_queue.put((db_path or DB_PATH, list(visit_ids)))
+
+def _sync_worker(pending: "queue.Queue"):
+    syncs = {}                              # one GHLComcastSync per database the callers used
+    while True:
+        db_path, visit_ids = pending.get()
+        for visit_id in visit_ids:
+            try:
+                if db_path not in syncs:
+                    syncs[db_path] = GHLComcastSync(db_path)
+                syncs[db_path].sync_to_ghl(visit_id)
+            except Exception as e:          # keep the thread alive for later syncs
+                print(f"[ghl-sync] visit {visit_id} in {db_path}: {type(e).__name__}: {e}")
+
 if __name__ == "__main__":
     import sys
     
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Group Commit - one writer thread per database, many writes per transaction
+Request threads submit write operations, each a function of the writer's
+connection, and block until their result is durable. The writer takes
+the first pending operation, waits up to COMCAST_GROUP_COMMIT_MS for
+more to arrive, and then runs them all in one transaction, so a burst
+of concurrent POSTs costs one fsync, not one each. The wait only applies
+while writes are actually contending (the previous group held more than
+one operation); a lone write commits straight away. Each operation runs
+under its own savepoint: a failing operation is rolled back alone and
+raises in its caller, while the rest still commit.
+
+Under contention commits stay at one per window plus one commit time,
+however many threads are writing.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+GROUP_COMMIT_MS = float(os.getenv("COMCAST_GROUP_COMMIT_MS", "2"))
+MAX_GROUP = 500                            # operations per transaction
+WRITE_TIMEOUT = 60.0
+
+_writers: Dict[str, "GroupCommitWriter"] = {}
+_writers_lock = threading.Lock()
+
+
+class GroupCommitWriter:
+    def __init__(self, db_path: str, window_ms: float = GROUP_COMMIT_MS, max_group: int = MAX_GROUP):
+        self.db_path = db_path
+        self.window = window_ms / 1000
+        self.max_group = max_group
+        self._pending: "queue.Queue[Tuple[Callable, Future]]" = queue.Queue()
+        self.commits = 0
+        self.operations = 0
+        self.largest_group = 0
+        self._last_group = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="group-commit")
+        self._thread.start()
+
+    def submit(self, operation: Callable[[sqlite3.Connection], object]) -> Future:
+        """Queue operation(conn); the future resolves once its transaction has committed.
+        Operations must not commit or roll back themselves."""
+        future = Future()
+        self._pending.put((operation, future))
+        return future
+
+    def run(self, operation: Callable[[sqlite3.Connection], object], timeout: float = WRITE_TIMEOUT):
+        """submit() and wait: returns operation's result or raises its exception"""
+        return self.submit(operation).result(timeout)
+
+    def _collect(self) -> List[Tuple[Callable, Future]]:
+        group = [self._pending.get()]
+        deadline = time.monotonic() + (self.window if self._last_group > 1 else 0.0)
+        while len(group) < self.max_group:
+            remaining = deadline - time.monotonic()
+            try:
+                group.append(self._pending.get(timeout=remaining) if remaining > 0
+                             else self._pending.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        while True:
+            group = self._collect()
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for operation, future in group:
+                    conn.execute("SAVEPOINT op")
+                    try:
+                        results.append((future, operation(conn), None))
+                        conn.execute("RELEASE op")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO op")
+                        conn.execute("RELEASE op")
+                        results.append((future, None, e))
+                conn.execute("COMMIT")
+            except Exception as e:
+                # BEGIN or COMMIT failed (disk full, lock timeout): nothing in the group was written
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                for _, future in group:
+                    future.set_exception(e)
+                continue
+            self.commits += 1
+            self.operations += len(group)
+            self.largest_group = max(self.largest_group, len(group))
+            self._last_group = len(group)
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    def stats(self) -> Dict:
+        return {
+            'commits': self.commits,
+            'operations': self.operations,
+            'meanGroup': round(self.operations / self.commits, 2) if self.commits else 0.0,
+            'largestGroup': self.largest_group,
+            'pending': self._pending.qsize(),
+            'windowMs': self.window * 1000,
+        }
+
+
+def writer_for(db_path: str) -> GroupCommitWriter:
+    """This process's writer for db_path, started on first use (and again after a fork)"""
+    key = f"{os.getpid()}:{os.path.abspath(db_path)}"
+    writer = _writers.get(key)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(key)
+            if writer is None:
+                writer = _writers[key] = GroupCommitWriter(db_path)
+    return writer
+
+
+def writer_stats() -> Optional[Dict]:
+    """Stats of this process's writers by database path, or None before the first write"""
+    prefix = f"{os.getpid()}:"
+    writers = {key[len(prefix):]: w.stats() for key, w in _writers.items() if key.startswith(prefix)}
+    return writers or None
@@ -0,0 +1,19 @@
+"""
+Gunicorn settings for the Railway deployment (see Procfile)
+The app is imported once in the master, which then warms shared state;
+workers fork from it with that state already in copy-on-write pages.
+"""
+
+preload_app = True
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded import, before any worker forks
+    import api_server_flask
+    api_server_flask.warm_worker_state()
+
+
+def post_fork(server, worker):
+    # Ingest drain threads per worker: threads started in the master would not survive the fork
+    import api_server_flask
+    api_server_flask.start_ingest_workers()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Idempotency Keys - replay protection for POST endpoints
+The first request with a key claims it. Once that request finishes, its
+response is stored, and any retry with the same key inside the TTL gets
+that stored response back with no new writes or GHL calls. Clients send
+an Idempotency-Key header. Without one, the key is derived from a hash of
+the payload.
+"""
+
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from typing import Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    endpoint TEXT NOT NULL,
+    idem_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,            -- payload hash; a reused key with another payload is rejected
+    status_code INTEGER,                   -- NULL while the first request is still running
+    response TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    claimed_at REAL,                       -- start of the running request's lease
+    PRIMARY KEY (endpoint, idem_key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at);
+"""
+
+DEFAULT_TTL_SECONDS = 24 * 3600
+# A claim still running after this long belongs to a dead worker (gunicorn kills workers at 30s)
+DEFAULT_LEASE_SECONDS = 25
+MAX_KEY_LENGTH = 255
+
+# Outcomes of claim()
+CLAIMED = 'claimed'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    conn.executescript(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(idempotency_keys)")}
+    if 'claimed_at' not in columns:
+        with conn:
+            conn.execute("ALTER TABLE idempotency_keys ADD COLUMN claimed_at REAL")
+
+
+def payload_hash(payload) -> str:
+    """Stable hash of a JSON-able payload (key order and whitespace don't matter)"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def claim(conn: sqlite3.Connection, endpoint: str, key: str, request_hash: str,
+          ttl_seconds: float = DEFAULT_TTL_SECONDS,
+          lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Tuple[str, Optional[int], Optional[str]]:
+    """
+    Claim a key for this request, or find out what earlier requests did with it.
+    An unfinished claim older than lease_seconds is taken over (its worker crashed or was killed).
+
+    Returns:
+        (CLAIMED, None, None) - caller runs the request, then complete() or release()
+        (REPLAY, status_code, response) - stored response of the original request
+        (IN_PROGRESS, None, None) - the original request hasn't finished yet
+        (MISMATCH, None, None) - the key was used for a different payload
+    """
+    now = time.time()
+    with conn:
+        # An expired key, or an abandoned claim, is free to reuse
+        conn.execute("""
+            DELETE FROM idempotency_keys
+            WHERE endpoint = ? AND idem_key = ?
+              AND (expires_at <= ? OR (status_code IS NULL AND COALESCE(claimed_at, created_at) <= ?))
+        """, (endpoint, key, now, now - lease_seconds))
+        claimed = conn.execute("""
+            INSERT OR IGNORE INTO idempotency_keys
+            (endpoint, idem_key, request_hash, created_at, expires_at, claimed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (endpoint, key, request_hash, now, now + ttl_seconds, now)).rowcount
+    if claimed:
+        return CLAIMED, None, None
+
+    row = conn.execute("""
+        SELECT request_hash, status_code, response FROM idempotency_keys
+        WHERE endpoint = ? AND idem_key = ?
+    """, (endpoint, key)).fetchone()
+    if row is None:
+        # Purged between the two statements - treat it as a fresh claim
+        return claim(conn, endpoint, key, request_hash, ttl_seconds, lease_seconds)
+    stored_hash, status_code, response = row
+    if stored_hash != request_hash:
+        return MISMATCH, None, None
+    if status_code is None:
+        return IN_PROGRESS, None, None
+    return REPLAY, status_code, response
+
+
+def complete(conn: sqlite3.Connection, endpoint: str, key: str, status_code: int, response: str):
+    """Store the response of a claimed request for replays"""
+    with conn:
+        conn.execute("""
+            UPDATE idempotency_keys SET status_code = ?, response = ?
+            WHERE endpoint = ? AND idem_key = ?
+        """, (status_code, response, endpoint, key))
+
+
+def release(conn: sqlite3.Connection, endpoint: str, key: str):
+    """Drop a claim whose request failed, so a retry runs it again"""
+    with conn:
+        conn.execute("DELETE FROM idempotency_keys WHERE endpoint = ? AND idem_key = ? AND status_code IS NULL",
+                     (endpoint, key))
+
+
+def purge_expired(conn: sqlite3.Connection) -> int:
+    """Delete expired keys (range scan on idx_idempotency_expires)"""
+    with conn:
+        return conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    if len(sys.argv) > 1 and sys.argv[1] == "purge":
+        print(f"Purged {purge_expired(conn)} expired idempotency keys")
+    else:
+        live, pending = conn.execute("""
+            SELECT COUNT(*), COUNT(*) - COUNT(status_code) FROM idempotency_keys WHERE expires_at > ?
+        """, (time.time(),)).fetchone()
+        print(f"Live idempotency keys: {live} ({pending} in progress)")
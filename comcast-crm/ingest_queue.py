@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Ingest Queue - durable inbox for webhook messages, drained by worker threads
+The webhook only appends the raw payload to the queue and acks. Workers
+then claim batches, run the handler against comcast.db, and ack or retry.
+
+The queue lives in its own SQLite file in WAL mode with synchronous=NORMAL,
+so an enqueue never waits on an fsync of comcast.db. Committed messages
+survive a process crash. Claims carry a lease: if a worker dies, its
+messages are picked up again once the lease runs out.
+
+A worker can still die between the handler's commit to comcast.db and
+the ack here. The message is then handled a second time. Handlers that
+must not repeat themselves record a receipt keyed by the message key
+(see record_receipt) in the same comcast.db transaction as their write,
+and return the stored result when the key is already there.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_queue (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,                  -- whatsapp, ...
+    dedupe_key TEXT,                       -- Idempotency-Key header or payload hash
+    payload TEXT NOT NULL,                 -- raw JSON as received
+    received_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    lease_until REAL,
+    processed_at REAL,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending, done, failed
+    result TEXT,                           -- handler result or last error
+    UNIQUE (source, dedupe_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingest_pending ON ingest_queue(received_at)
+    WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_ingest_processed ON ingest_queue(processed_at)
+    WHERE status != 'pending';
+"""
+
+# In the main database (db_schema), not the queue file: receipts commit with the handler's writes
+RECEIPTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_receipts (
+    message_key TEXT PRIMARY KEY,          -- IngestQueue.claim(): queue id plus received_at
+    result TEXT,
+    processed_at REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_ingest_receipts_processed ON ingest_receipts(processed_at);
+"""
+
+MAX_ATTEMPTS = 5
+LEASE_SECONDS = 60.0
+RETENTION_SECONDS = 24 * 3600              # doubles as the dedupe window
+RECEIPT_RETENTION_SECONDS = 7 * 24 * 3600  # far past the last retry of any message
+
+
+class IngestQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; enqueue reuses it so the ack path has no connect cost"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA busy_timeout = 30000")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, source: str, payload, dedupe_key: Optional[str] = None) -> Tuple[int, bool]:
+        """
+        Append one message.
+
+        Returns:
+            (queue id, True) for a new message, or (original id, False) when the
+            dedupe key was already seen inside the retention window
+        """
+        conn = self._conn()
+        cursor = conn.execute("""
+            INSERT OR IGNORE INTO ingest_queue (source, dedupe_key, payload, received_at)
+            VALUES (?, ?, ?, ?)
+        """, (source, dedupe_key, json.dumps(payload), time.time()))
+        if cursor.rowcount:
+            self._wakeup.set()
+            return cursor.lastrowid, True
+        row = conn.execute("SELECT id FROM ingest_queue WHERE source = ? AND dedupe_key = ?",
+                           (source, dedupe_key)).fetchone()
+        return row[0], False
+
+    def claim(self, worker: str, limit: int = 20,
+              lease_seconds: float = LEASE_SECONDS) -> List[Tuple[int, str, dict, int, str]]:
+        """
+        Lease up to `limit` pending messages, oldest first.
+
+        Returns:
+            [(id, source, payload, attempts, message key)]. The key stays unique
+            after purged ids are reused, so handlers can record receipts by it.
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT id, source, payload, attempts, received_at FROM ingest_queue
+                WHERE status = 'pending' AND (lease_until IS NULL OR lease_until < ?)
+                ORDER BY received_at
+                LIMIT ?
+            """, (now, limit)).fetchall()
+            conn.executemany("""
+                UPDATE ingest_queue SET claimed_by = ?, lease_until = ?, attempts = attempts + 1
+                WHERE id = ?
+            """, [(worker, now + lease_seconds, row[0]) for row in rows])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [(msg_id, source, json.loads(payload), attempts + 1, f"{msg_id}:{received_at!r}")
+                for msg_id, source, payload, attempts, received_at in rows]
+
+    def ack(self, msg_id: int, result: str = ''):
+        self._conn().execute("""
+            UPDATE ingest_queue SET status = 'done', processed_at = ?, lease_until = NULL, result = ?
+            WHERE id = ?
+        """, (time.time(), result[:500], msg_id))
+
+    def fail(self, msg_id: int, error: str, attempts: int, max_attempts: int = MAX_ATTEMPTS):
+        """Release for retry with backoff, or park as failed after max_attempts"""
+        now = time.time()
+        if attempts >= max_attempts:
+            self._conn().execute("""
+                UPDATE ingest_queue SET status = 'failed', processed_at = ?, lease_until = NULL, result = ?
+                WHERE id = ?
+            """, (now, error[:500], msg_id))
+        else:
+            self._conn().execute("UPDATE ingest_queue SET lease_until = ?, result = ? WHERE id = ?",
+                                 (now + 2 ** attempts, error[:500], msg_id))
+
+    def purge(self, retention_seconds: float = RETENTION_SECONDS) -> int:
+        """Drop processed messages older than the retention window"""
+        return self._conn().execute("""
+            DELETE FROM ingest_queue WHERE status != 'pending' AND processed_at < ?
+        """, (time.time() - retention_seconds,)).rowcount
+
+    def stats(self) -> Dict:
+        """Queue depth and lag: how long the oldest pending message has waited, and recent queue->done latency"""
+        now = time.time()
+        conn = self._conn()
+        depth, in_flight, oldest = conn.execute("""
+            SELECT COUNT(*), COUNT(CASE WHEN lease_until > ? THEN 1 END), MIN(received_at)
+            FROM ingest_queue WHERE status = 'pending'
+        """, (now,)).fetchone()
+        done, failed, avg_lag, max_lag = conn.execute("""
+            SELECT COUNT(CASE WHEN status = 'done' THEN 1 END),
+                   COUNT(CASE WHEN status = 'failed' THEN 1 END),
+                   AVG(processed_at - received_at), MAX(processed_at - received_at)
+            FROM ingest_queue WHERE status != 'pending' AND processed_at >= ?
+        """, (now - 300,)).fetchone()
+        return {
+            'depth': depth,
+            'inFlight': in_flight,
+            'oldestPendingSeconds': round(now - oldest, 3) if oldest else 0.0,
+            'last5m': {
+                'done': done,
+                'failed': failed,
+                'avgLagSeconds': round(avg_lag or 0.0, 3),
+                'maxLagSeconds': round(max_lag or 0.0, 3),
+            },
+        }
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Receipts table in the main database (the queue file creates its own SCHEMA)"""
+    conn.executescript(RECEIPTS_SCHEMA)
+
+
+def receipt(conn: sqlite3.Connection, message_key: str) -> Optional[str]:
+    """Stored result of a message already handled, else None"""
+    row = conn.execute("SELECT result FROM ingest_receipts WHERE message_key = ?", (message_key,)).fetchone()
+    return row[0] if row else None
+
+
+def record_receipt(conn: sqlite3.Connection, message_key: str, result: str):
+    """Mark a message handled. Caller commits, so the receipt lands with the handler's writes."""
+    now = time.time()
+    conn.execute("INSERT OR REPLACE INTO ingest_receipts (message_key, result, processed_at) VALUES (?, ?, ?)",
+                 (message_key, result[:500], now))
+    conn.execute("DELETE FROM ingest_receipts WHERE processed_at < ?", (now - RECEIPT_RETENTION_SECONDS,))
+
+
+class IngestWorkers:
+    """Daemon threads draining an IngestQueue through handler(source, payload, message_key) -> result string"""
+
+    def __init__(self, queue: IngestQueue, handler: Callable[[str, dict, str], str],
+                 threads: int = 2, batch_size: int = 20, poll_seconds: float = 1.0):
+        self.queue = queue
+        self.handler = handler
+        self.threads = threads
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    def start(self):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for n in range(self.threads):
+            worker = threading.Thread(target=self._run, args=(f"{prefix}:{n}",), daemon=True,
+                                      name=f"ingest-{n}")
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self.queue._wakeup.set()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def drain(self, worker: str = 'drain') -> int:
+        """Process everything currently claimable in the calling thread; returns messages handled"""
+        handled = 0
+        while not self._stop.is_set():
+            batch = self.queue.claim(worker, self.batch_size)
+            if not batch:
+                break
+            for msg_id, source, payload, attempts, message_key in batch:
+                try:
+                    self.queue.ack(msg_id, self.handler(source, payload, message_key) or '')
+                except Exception as e:
+                    self.queue.fail(msg_id, f"{type(e).__name__}: {e}", attempts)
+                handled += 1
+        return handled
+
+    def _run(self, name: str):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                if not self.drain(name):
+                    self.queue._wakeup.wait(self.poll_seconds)
+                    self.queue._wakeup.clear()
+                if time.monotonic() - last_purge > 3600:
+                    last_purge = time.monotonic()
+                    self.queue.purge()
+            except sqlite3.Error as e:
+                print(f"[ingest] {name}: {e}")
+                time.sleep(self.poll_seconds)
+
+
+def default_queue_path(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'ingest_queue.db')
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    queue = IngestQueue(sys.argv[2] if len(sys.argv) > 2 else default_queue_path(DB_PATH))
+    if len(sys.argv) > 1 and sys.argv[1] == "purge":
+        print(f"Purged {queue.purge()} processed messages")
+    else:
+        print(json.dumps(queue.stats(), indent=2))
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Load Test - replay mixed field-app traffic against the API servers
+Each client thread holds one keep-alive connection and sends requests from
+a weighted mix:
+  - map polls (/api/visits)
+  - stats
+  - zip lookups
+  - CSV exports
+  - visit POSTs built by synth_data.fake_visit
+Routes the stdlib server lacks are dropped from its mix. Results after the
+warmup period are reported per route: throughput, errors and latency
+percentiles.
+
+Servers are spawned on a throwaway copy of --db with GHL sync off, one
+after the other. Use --url to hit a server that is already running.
+
+  python3 load_test.py [--server flask|stdlib|both] [--db synthetic.db]
+                       [--duration 20] [--clients 16]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import synth_data
+from config import BASE_DIR, DB_PATH
+
+# (name, method, path, weight, servers that serve it)
+TRAFFIC_MIX = [
+    ('map poll', 'GET', '/api/visits', 45, ('flask', 'stdlib')),
+    ('stats', 'GET', '/api/stats', 20, ('flask', 'stdlib')),
+    ('by zip', 'GET', '/api/visits/by-zip?zip={zip}', 15, ('flask', 'stdlib')),
+    ('csv export', 'GET', '/api/reports/contacts?filter=both', 5, ('flask',)),
+    ('create visit', 'POST', '/api/visits', 15, ('flask', 'stdlib')),
+]
+
+SERVER_COMMANDS = {
+    'flask': [sys.executable, 'api_server_flask.py'],
+    'stdlib': [sys.executable, 'api_server.py', '{port}'],
+}
+
+
+def _gunicorn_command() -> Optional[List[str]]:
+    """Production Flask setup (Procfile) when gunicorn is installed"""
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return None
+    return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api_server_flask:app',
+            '--bind', '127.0.0.1:{port}']
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+class LoadRun:
+    def __init__(self, base_url: str, mix, duration: float, warmup: float, clients: int, seed: int = 1):
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.mix = mix
+        self.duration = duration
+        self.warmup = warmup
+        self.clients = clients
+        self.seed = seed
+        self.zips = synth_data.load_zips()
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def _request(self, conn: http.client.HTTPConnection, rng: random.Random, method: str, path: str):
+        path = path.format(zip=rng.choice(self.zips)['zip'])
+        headers, body = {}, None
+        if method == 'POST':
+            body = json.dumps(synth_data.fake_visit(rng, self.zips))
+            headers = {'Content-Type': 'application/json', 'Idempotency-Key': uuid.uuid4().hex}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    def _client(self, n: int, started: float):
+        rng = random.Random(self.seed * 1000 + n)
+        weights = [entry[3] for entry in self.mix]
+        measure_from, stop_at = started + self.warmup, started + self.warmup + self.duration
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        latencies, errors = defaultdict(list), defaultdict(int)
+        while True:
+            name, method, path, _, _ = rng.choices(self.mix, weights=weights)[0]
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            try:
+                status = self._request(conn, rng, method, path)
+            except (OSError, http.client.HTTPException):
+                status = None
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            if sent < measure_from:
+                continue
+            if status is None or status >= 400:
+                errors[name] += 1
+            else:
+                latencies[name].append(time.perf_counter() - sent)
+        conn.close()
+        with self._lock:
+            for name, values in latencies.items():
+                self.latencies[name].extend(values)
+            for name, count in errors.items():
+                self.errors[name] += count
+
+    def run(self) -> Dict:
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self._client, args=(n, started), daemon=True)
+                   for n in range(self.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report()
+
+    def report(self) -> Dict:
+        routes = {}
+        everything = []
+        for name, _, _, _, _ in self.mix:
+            values = sorted(self.latencies.get(name, []))
+            everything.extend(values)
+            routes[name] = self._summary(values, self.errors.get(name, 0))
+        return {'clients': self.clients, 'seconds': self.duration, 'routes': routes,
+                'total': self._summary(sorted(everything), sum(self.errors.values()))}
+
+    def _summary(self, values: List[float], errors: int) -> Dict:
+        return {
+            'requests': len(values),
+            'errors': errors,
+            'rps': round(len(values) / self.duration, 1),
+            'p50Ms': round(percentile(values, 50) * 1000, 2),
+            'p90Ms': round(percentile(values, 90) * 1000, 2),
+            'p99Ms': round(percentile(values, 99) * 1000, 2),
+            'maxMs': round(values[-1] * 1000, 2) if values else 0.0,
+            'meanMs': round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        }
+
+
+def print_report(title: str, report: Dict):
+    print(f"\n{title}  ({report['clients']} clients, {report['seconds']:.0f}s)")
+    print(f"  {'route':<14}{'req/s':>9}{'errors':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, row in list(report['routes'].items()) + [('TOTAL', report['total'])]:
+        print(f"  {name:<14}{row['rps']:>9.1f}{row['errors']:>8}{row['p50Ms']:>9.1f}"
+              f"{row['p90Ms']:>9.1f}{row['p99Ms']:>9.1f}{row['maxMs']:>9.1f}")
+
+
+def spawn(command: List[str], env: Dict, timeout: float = 60.0):
+    """Start a server on a free port; returns (process, base_url) once /health answers"""
+    port = _free_port()
+    command = [part.replace('{port}', str(port)) for part in command]
+    proc = subprocess.Popen(command, cwd=BASE_DIR, env=dict(env, PORT=str(port)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}: {' '.join(command)}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise TimeoutError(f"no /health answer within {timeout}s")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Mixed-traffic load test for the API servers")
+    arg_parser.add_argument("--server", choices=['flask', 'stdlib', 'both'], default='both')
+    arg_parser.add_argument("--db", default=DB_PATH, help="copied per server; see synth_data.py for a big one")
+    arg_parser.add_argument("--url", help="test an already-running server instead (mix for --server)")
+    arg_parser.add_argument("--duration", type=float, default=20.0, help="measured seconds per server")
+    arg_parser.add_argument("--warmup", type=float, default=2.0)
+    arg_parser.add_argument("--clients", type=int, default=16, help="concurrent keep-alive connections")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = arg_parser.parse_args()
+
+    servers = ['flask', 'stdlib'] if args.server == 'both' else [args.server]
+    results = {}
+    for server in servers:
+        mix = [entry for entry in TRAFFIC_MIX if server in entry[4]]
+        if args.url:
+            results[server] = LoadRun(args.url, mix, args.duration, args.warmup, args.clients, args.seed).run()
+            break
+        workdir = tempfile.mkdtemp(prefix='load-test-')
+        try:
+            db_copy = os.path.join(workdir, 'comcast.db')
+            shutil.copy(args.db, db_copy)
+            env = dict(os.environ, COMCAST_DB_PATH=db_copy, COMCAST_INGEST_DB=os.path.join(workdir, 'ingest.db'),
+                       GHL_COMCAST_LOCATION_ID='')
+            command = SERVER_COMMANDS[server]
+            if server == 'flask':
+                command = _gunicorn_command() or command
+            proc, base_url = spawn(command, env)
+            try:
+                label = f"{server} ({'gunicorn' if 'gunicorn' in command else ' '.join(command[1:2])})"
+                results[label] = LoadRun(base_url, mix, args.duration, args.warmup, args.clients, args.seed).run()
+            finally:
+                proc.terminate()
+                proc.wait()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for title, report in results.items():
+            print_report(title, report)
+
+
+if __name__ == "__main__":
+    main()
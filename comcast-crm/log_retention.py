@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Log Retention - keep sync_log small: archive, summarize, reclaim space
+Rows older than the hot window leave comcast.db and go into monthly
+partition files under sync_log_archive/ (YYYY-MM.db). Long messages in
+those files are zlib-compressed. Before each row leaves, it is counted
+into sync_log_daily, so per-day counts per action and status stay
+available forever, even once an old partition file has been deleted.
+Freed pages go back to the filesystem with incremental vacuum, once
+the database has been switched to auto_vacuum=INCREMENTAL (a one-time
+full VACUUM, see `setup-vacuum`).
+
+query_log() reads the hot table first and then partitions newest to
+oldest, stopping once the limit is reached, so recent diagnostics never
+open an archive file.
+
+  python3 log_retention.py run [--hot-days 30] [--keep-months 24]
+  python3 log_retention.py stats | setup-vacuum
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_sync_log_created ON sync_log(created_at);
+
+CREATE TABLE IF NOT EXISTS sync_log_daily (
+    day TEXT NOT NULL,                     -- YYYY-MM-DD of created_at
+    action TEXT NOT NULL,
+    status TEXT NOT NULL,
+    entries INTEGER NOT NULL,
+    PRIMARY KEY (day, action, status)
+) WITHOUT ROWID;
+"""
+
+PARTITION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_log_archive (
+    id INTEGER PRIMARY KEY,                -- sync_log.id, so re-archiving is a no-op
+    action TEXT,
+    table_name TEXT,
+    record_id INTEGER,
+    ghl_contact_id TEXT,
+    status TEXT,
+    message,                               -- TEXT, or zlib-compressed BLOB for long messages
+    created_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_archive_created ON sync_log_archive(created_at);
+CREATE INDEX IF NOT EXISTS idx_archive_record ON sync_log_archive(record_id);
+"""
+
+HOT_DAYS = 30
+BATCH = 5000
+COMPRESS_MIN_BYTES = 64
+_COLUMNS = "id, action, table_name, record_id, ghl_contact_id, status, message, created_at"
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    conn.executescript(SCHEMA)
+
+
+def default_archive_dir(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'sync_log_archive')
+
+
+def _partitions(archive_dir: str) -> List[str]:
+    """Partition months present on disk, oldest first"""
+    return sorted(os.path.basename(path)[:-3] for path in glob.glob(os.path.join(archive_dir, '????-??.db')))
+
+
+def _open_partition(archive_dir: str, month: str) -> sqlite3.Connection:
+    part = sqlite3.connect(os.path.join(archive_dir, f"{month}.db"))
+    part.executescript(PARTITION_SCHEMA)
+    return part
+
+
+def _pack(message):
+    if isinstance(message, str) and len(message) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(message.encode('utf-8'), 9)
+        if len(packed) < len(message):
+            return packed
+    return message
+
+
+def _unpack(message):
+    return zlib.decompress(message).decode('utf-8') if isinstance(message, bytes) else message
+
+
+def archive(conn: sqlite3.Connection, archive_dir: str, hot_days: float = HOT_DAYS,
+            batch: int = BATCH) -> Dict:
+    """
+    Move sync_log rows older than hot_days into monthly partitions.
+
+    Each batch is written to its partitions first and deleted from sync_log
+    afterwards, so a crash in between leaves duplicates (skipped on the next
+    run), never a gap.
+
+    Returns:
+        {'archived': n, 'partitions': [months touched]}
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    cutoff = (datetime.utcnow() - timedelta(days=hot_days)).strftime('%Y-%m-%d %H:%M:%S')
+    archived, touched = 0, set()
+    while True:
+        rows = conn.execute(f"""
+            SELECT {_COLUMNS} FROM sync_log
+            WHERE created_at < ?
+            ORDER BY created_at
+            LIMIT ?
+        """, (cutoff, batch)).fetchall()
+        if not rows:
+            break
+
+        by_month: Dict[str, list] = {}
+        for row in rows:
+            created_at = row[7] or '1970-01-01'
+            by_month.setdefault(created_at[:7], []).append(row[:6] + (_pack(row[6]), row[7]))
+        for month, month_rows in by_month.items():
+            part = _open_partition(archive_dir, month)
+            try:
+                with part:
+                    part.executemany(f"INSERT OR IGNORE INTO sync_log_archive ({_COLUMNS}) "
+                                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", month_rows)
+            finally:
+                part.close()
+            touched.add(month)
+
+        with conn:
+            conn.executemany("""
+                INSERT INTO sync_log_daily (day, action, status, entries) VALUES (?, ?, ?, 1)
+                ON CONFLICT (day, action, status) DO UPDATE SET entries = entries + 1
+            """, [((row[7] or '1970-01-01')[:10], row[1] or '', row[5] or '') for row in rows])
+            conn.executemany("DELETE FROM sync_log WHERE id = ?", [(row[0],) for row in rows])
+        archived += len(rows)
+    return {'archived': archived, 'partitions': sorted(touched)}
+
+
+def prune_archive(archive_dir: str, keep_months: int) -> List[str]:
+    """Delete partition files older than keep_months (their daily counts stay)"""
+    now = datetime.utcnow()
+    first_month = now.year * 12 + now.month - 1 - (keep_months - 1)
+    oldest_kept = f"{first_month // 12:04d}-{first_month % 12 + 1:02d}"
+    removed = []
+    for month in _partitions(archive_dir):
+        if month < oldest_kept:
+            os.remove(os.path.join(archive_dir, f"{month}.db"))
+            removed.append(month)
+    return removed
+
+
+def incremental_vacuum(conn: sqlite3.Connection, max_pages: Optional[int] = None) -> Dict:
+    """Return free pages to the filesystem (no-op unless auto_vacuum is INCREMENTAL)"""
+    mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    if mode == 2:
+        # executescript steps the pragma to completion; execute() frees a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages or 0)});")
+    free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return {'autoVacuum': ('none', 'full', 'incremental')[mode],
+            'freedPages': free_before - free_after, 'freePages': free_after}
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection):
+    """One-time switch to auto_vacuum=INCREMENTAL; rewrites the whole file with VACUUM"""
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+
+
+def run(conn: sqlite3.Connection, archive_dir: str, hot_days: float = HOT_DAYS,
+        keep_months: Optional[int] = None) -> Dict:
+    """Archive, prune old partitions, then reclaim space"""
+    result = archive(conn, archive_dir, hot_days)
+    result['pruned'] = prune_archive(archive_dir, keep_months) if keep_months else []
+    result['vacuum'] = incremental_vacuum(conn)
+    return result
+
+
+def query_log(conn: sqlite3.Connection, archive_dir: str,
+              since: Optional[str] = None, until: Optional[str] = None,
+              action: Optional[str] = None, status: Optional[str] = None,
+              record_id: Optional[int] = None, limit: int = 100) -> List[Dict]:
+    """
+    Log entries across the hot table and the archive, newest first.
+
+    Args:
+        since, until: Inclusive bounds on created_at ('YYYY-MM-DD' or full timestamps)
+        action, status, record_id: Optional exact filters
+
+    Returns:
+        [{'id', 'action', 'tableName', 'recordId', 'ghlContactId', 'status',
+          'message', 'createdAt', 'archived'}, ...]
+    """
+    where, params = [], []
+    if since:
+        where.append("created_at >= ?")
+        params.append(since)
+    if until:
+        # A bare date includes the whole day
+        where.append("created_at < date(?, '+1 day')" if len(until) == 10 else "created_at <= ?")
+        params.append(until)
+    for column, value in (('action', action), ('status', status), ('record_id', record_id)):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    clause = f"WHERE {' AND '.join(where)}" if where else ''
+
+    def fetch(source, table, remaining, archived):
+        rows = source.execute(f"SELECT {_COLUMNS} FROM {table} {clause} ORDER BY created_at DESC, id DESC LIMIT ?",
+                              params + [remaining]).fetchall()
+        return [{'id': row[0], 'action': row[1], 'tableName': row[2], 'recordId': row[3],
+                 'ghlContactId': row[4], 'status': row[5], 'message': _unpack(row[6]),
+                 'createdAt': row[7], 'archived': archived} for row in rows]
+
+    entries = fetch(conn, 'sync_log', limit, False)
+    for month in reversed(_partitions(archive_dir)):
+        if len(entries) >= limit:
+            break
+        if (since and month < since[:7]) or (until and month > until[:7]):
+            continue
+        part = sqlite3.connect(f"file:{os.path.join(archive_dir, month + '.db')}?mode=ro", uri=True)
+        try:
+            entries += fetch(part, 'sync_log_archive', limit - len(entries), True)
+        finally:
+            part.close()
+    return entries
+
+
+def daily_counts(conn: sqlite3.Connection, since: Optional[str] = None,
+                 until: Optional[str] = None) -> List[Dict]:
+    """Entries per day, action and status: archived days from sync_log_daily, hot days counted live"""
+    params = [since or '0000-00-00', until or '9999-99-99']
+    rows = conn.execute("""
+        SELECT day, action, status, SUM(entries) FROM (
+            SELECT day, action, status, entries FROM sync_log_daily
+            WHERE day BETWEEN ?1 AND ?2
+            UNION ALL
+            SELECT substr(created_at, 1, 10), COALESCE(action, ''), COALESCE(status, ''), 1 FROM sync_log
+            WHERE created_at >= ?1 AND created_at < date(?2, '+1 day')
+        )
+        GROUP BY day, action, status
+        ORDER BY day, action, status
+    """, params).fetchall()
+    return [{'day': day, 'action': action, 'status': status, 'entries': entries}
+            for day, action, status, entries in rows]
+
+
+def stats(conn: sqlite3.Connection, archive_dir: str) -> Dict:
+    hot, oldest = conn.execute("SELECT COUNT(*), MIN(created_at) FROM sync_log").fetchone()
+    partitions = _partitions(archive_dir)
+    return {
+        'hotRows': hot,
+        'oldestHot': oldest,
+        'partitions': len(partitions),
+        'archiveBytes': sum(os.path.getsize(os.path.join(archive_dir, f"{m}.db")) for m in partitions),
+        'oldestPartition': partitions[0] if partitions else None,
+        'summaryDays': conn.execute("SELECT COUNT(DISTINCT day) FROM sync_log_daily").fetchone()[0],
+        'autoVacuum': ('none', 'full', 'incremental')[conn.execute("PRAGMA auto_vacuum").fetchone()[0]],
+        'freePages': conn.execute("PRAGMA freelist_count").fetchone()[0],
+    }
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    arg_parser = argparse.ArgumentParser(description="sync_log retention")
+    arg_parser.add_argument("command", choices=['run', 'stats', 'setup-vacuum'], nargs='?', default='stats')
+    arg_parser.add_argument("--hot-days", type=float, default=HOT_DAYS, help="keep this many days in comcast.db")
+    arg_parser.add_argument("--keep-months", type=int, help="delete archive partitions older than this")
+    arg_parser.add_argument("--archive-dir", default=os.getenv("COMCAST_LOG_ARCHIVE_DIR") or default_archive_dir(DB_PATH))
+    args = arg_parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    if args.command == 'run':
+        print(json.dumps(run(conn, args.archive_dir, args.hot_days, args.keep_months), indent=2))
+    elif args.command == 'setup-vacuum':
+        enable_incremental_vacuum(conn)
+        print("auto_vacuum = INCREMENTAL")
+    else:
+        print(json.dumps(stats(conn, args.archive_dir), indent=2))
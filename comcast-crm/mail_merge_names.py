@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Mail Merge Names - the primary contact's first/last name, stored per visit
+ghl_sync computes mail_first_name / mail_last_name with ContactParser at
+insert time. The contacts CSV and the GHL push then read the stored
+columns instead of re-splitting contact_name per row on every export, and
+every consumer gets the same answer. The primary contact is the decision
+maker, else the first other person, else the gatekeeper (see
+ParsedContact.primary).
+
+Adding the columns backfills existing visits. A stored decision maker
+takes precedence there, because that is what exports showed before
+(its missing last name is taken from contact_name when the first names
+agree).
+
+  python3 mail_merge_names.py [--rebuild]    (re-derive every row)
+"""
+
+import argparse
+import sqlite3
+from typing import Optional
+
+from contact_parser import ContactParser
+
+SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_mail_name ON business_visits(mail_last_name, mail_first_name);
+"""
+
+BATCH = 1000
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Add the name columns (backfilling existing visits) and their index"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(business_visits)")}
+    if 'mail_first_name' not in columns:
+        with conn:
+            conn.execute("ALTER TABLE business_visits ADD COLUMN mail_first_name TEXT")
+            conn.execute("ALTER TABLE business_visits ADD COLUMN mail_last_name TEXT")
+        backfill(conn)
+    conn.executescript(SCHEMA)
+
+
+def backfill(conn: sqlite3.Connection, parser: Optional[ContactParser] = None) -> int:
+    """Derive mail names for every visit in id-ordered batches; returns rows updated"""
+    parser = parser or ContactParser()
+    updated, last_id = 0, 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, contact_name, decision_maker_first_name, decision_maker_last_name
+            FROM business_visits WHERE id > ? ORDER BY id LIMIT ?
+        """, (last_id, BATCH)).fetchall()
+        if not rows:
+            return updated
+        names = []
+        for visit_id, contact_name, dm_first, dm_last in rows:
+            first, last = parser.parse(contact_name or '').primary_name()
+            if dm_first:
+                # Older rows may carry a decision maker whose last name was never filled in
+                if not dm_last and first.casefold() == dm_first.casefold():
+                    dm_last = last
+                first, last = dm_first, dm_last or ''
+            names.append((first or None, last or None, visit_id))
+        with conn:
+            conn.executemany("UPDATE business_visits SET mail_first_name = ?, mail_last_name = ? WHERE id = ?",
+                             names)
+        updated += len(names)
+        last_id = rows[-1][0]
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    arg_parser = argparse.ArgumentParser(description="Mail-merge name columns")
+    arg_parser.add_argument("--rebuild", action="store_true", help="re-derive names for every visit")
+    args = arg_parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    if args.rebuild:
+        print(f"Rebuilt mail names for {backfill(conn)} visits")
+    missing = conn.execute("""
+        SELECT COUNT(*) FROM business_visits
+        WHERE mail_first_name IS NULL AND contact_name IS NOT NULL AND contact_name != ''
+    """).fetchone()[0]
+    print(f"Visits with a contact name but no mail name: {missing}")
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Message Parser - turns free-text WhatsApp field updates into visit fields
+Deterministic and offline: a fixed set of precompiled patterns, applied in order.
+  1. "Label: value" lines (Business:, Zip:, Contact:, ...), which always win
+  2. email, 8498 account IDs and phones; each match is blanked out so later
+     digit patterns can't match inside it
+  3. street address, city and WA zip
+  4. people: "Name (role)", "owner Maria", "spoke with Maria, the owner".
+     Roles come from ContactParser's role sets, and the combined string goes
+     through ContactParser.parse()
+  5. status keywords (most specific first)
+  6. business name: "Visited X" / "Stopped by X" / "at X", else the message's lead phrase
+
+Benchmark against the labelled corpus, the regression set (messages whose
+misses the abbreviation rules were fixed against) and the held-out set
+(messages the patterns were not written against; don't tune on them - when
+one fails, fix it, move it to the regression set and add fresh held-out ones):
+  python3 message_parser.py bench [message_corpus.jsonl message_regression.jsonl message_holdout.jsonl ...]
+"""
+
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Tuple
+
+from contact_parser import ContactParser, ParsedContact
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(SCRIPT_DIR, 'message_corpus.jsonl')
+REGRESSION_PATH = os.path.join(SCRIPT_DIR, 'message_regression.jsonl')
+HOLDOUT_PATH = os.path.join(SCRIPT_DIR, 'message_holdout.jsonl')
+
+# label -> field; longest labels first so "business name" beats "business"
+_LABELS = {
+    'business name': 'business_name', 'business': 'business_name', 'biz': 'business_name',
+    'company': 'business_name', 'store': 'business_name', 'shop': 'business_name',
+    'contact name': 'contact_name', 'contacts': 'contact_name', 'contact': 'contact_name',
+    'spoke with': 'contact_name', 'talked to': 'contact_name',
+    'phone': 'phone', 'cell': 'phone', 'tel': 'phone', 'mobile': 'phone',
+    'email': 'email', 'e-mail': 'email',
+    'zip code': 'zip_code', 'zipcode': 'zip_code', 'zip': 'zip_code',
+    'address': 'address', 'addr': 'address',
+    'city': 'city',
+    'status': 'status',
+    'account id': 'account_id_8498', 'account': 'account_id_8498', 'acct': 'account_id_8498',
+    'notes': 'notes', 'note': 'notes',
+}
+_LABEL_LINE = re.compile(
+    r'^[ \t]*(' + '|'.join(re.escape(k) for k in sorted(_LABELS, key=len, reverse=True)) +
+    r')[ \t]*#?[ \t]*[:=][ \t]*(.*?)[ \t]*$', re.I | re.M)
+
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+_ACCOUNT = re.compile(r'(?<!\d)8498(?:[ -]?\d){12}(?!\d)')
+_PHONE = re.compile(r'(?<![\d-])(?:\+?1[ .-]?)?\(?([2-9]\d{2})\)?[ .-]?(\d{3})[ .-]?(\d{4})(?![\d-])')
+_ZIP = re.compile(r'(?<![\d-])(98\d{3}|99[0-4]\d{2})(?:-\d{4})?(?![\d-])')
+
+_STREET_SUFFIX = (r'(?:St|Street|Ave|Avenue|Rd|Road|Blvd|Boulevard|Way|Dr|Drive|Ln|Lane|Hwy|Highway|'
+                  r'Pl|Place|Ct|Court|Pkwy|Parkway|Loop|Cir|Circle|Ter|Terrace)')
+_DIRECTION = r'(?:N|S|E|W|NE|NW|SE|SW|North|South|East|West|Northeast|Northwest|Southeast|Southwest)'
+_ADDRESS = re.compile(
+    r'(?<![\w#])\d{1,6}[A-Z]?\s+(?:' + _DIRECTION + r'\.?\s+)?'
+    r'(?:[\w.\'][\w.\'-]*\s+){0,3}?' + _STREET_SUFFIX + r'\b\.?'
+    r'(?:\s+' + _DIRECTION + r'\b\.?)?'
+    r'(?:\s*,?\s*(?:#|Suite|Ste\.?|Unit|Apt)\s*[\w-]+)?', re.I)
+# ", Tacoma, WA" / ", University Place 98466" right after an address or business
+_CITY_WORD = r'(?!(?:WA|Washington)\b)[A-Z][A-Za-z.]*'
+_CITY = re.compile(r',\s*(' + _CITY_WORD + r'(?:\s+' + _CITY_WORD + r'){0,2})\s*(?:,\s*|\s+)'
+                   r'(?:(?:WA|Washington)\b|(?=9[89]\d{3}\b))')
+
+# (status, pattern) - first match wins, so negatives and specifics come first
+_STATUS_RULES = [
+    ('not-interested', r"\bnot\s+interested\b|\bno\s+interest\b|\bnot\s+a\s+(?:fit|prospect)\b|"
+                       r"\bdeclined\b|\bdo\s+not\s+(?:contact|call|come\s+back)\b"),
+    ('existing_customer', r"\b(?:existing|current)\s+(?:comcast\s+|xfinity\s+)?customer\b|"
+                          r"\balready\s+(?:an?\s+)?(?:comcast\s+|xfinity\s+)?customer\b|"
+                          r"\balready\s+(?:has|have|on|with|uses?)\s+(?:comcast|xfinity)\b"),
+    ('door_knock', r"\bnobody\s+(?:was\s+)?(?:there|here|home|in)\b|\bno\s+one\s+(?:was\s+)?(?:there|here|in)\b|"
+                   r"\b(?:was|were)\s+closed\b|\bclosed\s+(?:today|for\s+the\s+day)\b|\bno\s+answer\b"),
+    ('followup', r"\bfollow[\s-]?up\b|\bcall\s*back\b|\bcome\s+back\b|\breturn\s+visit\b|"
+                 r"\bcheck\s+back\b|\bcircle\s+back\b|\bstop\s+back\b"),
+    ('interested', r"\binterested\b|\bwants?\s+(?:a\s+)?(?:quote|pricing|proposal|info)\b|\bhot\s+lead\b|"
+                   r"\bsend\s+(?:a\s+|them\s+a\s+|him\s+a\s+|her\s+a\s+)?(?:quote|proposal)\b"),
+]
+_STATUS = [(status, re.compile(pattern, re.I)) for status, pattern in _STATUS_RULES]
+DEFAULT_STATUS = 'initial_contact'
+
+# A period after these is an abbreviation, not the end of a sentence ("Dr. Smith Dental",
+# "Mr. Jalapeño", "St. Joseph Clinic"); a company suffix keeps its period and ends the name
+_TITLE_ABBREVIATIONS = ('Dr', 'St', 'Ste', 'Ave', 'Rd', 'Blvd', 'Mt', 'Ft', 'Mr', 'Mrs', 'Ms', 'Jr', 'Sr', 'Bros')
+_COMPANY_ABBREVIATIONS = ('Inc', 'Co', 'Corp', 'Ltd', 'LLC')
+_NOT_ABBREVIATION = ''.join(r'(?<!\b' + abbr + ')' for abbr in _TITLE_ABBREVIATIONS + _COMPANY_ABBREVIATIONS)
+_AFTER_COMPANY = '|'.join(r'(?<=\b' + abbr + r'\.)' for abbr in _COMPANY_ABBREVIATIONS)
+_ABBREVIATION_TAIL = re.compile(r'\b(?:' + '|'.join(_TITLE_ABBREVIATIONS + _COMPANY_ABBREVIATIONS) + r')\.$')
+
+# Where a business name stops: punctuation, a zip/street number, a preposition, or the next clause
+_BUSINESS_END = (r'(?=\s*(?:[,;:!\n(]|' + _NOT_ABBREVIATION + r'\.(?:\s|$)|\s[-–]\s|\s\d{3,6}\b|$)'
+                 r'|(?:' + _AFTER_COMPANY + r')(?=\s|$)'
+                 r'|\s+(?:at|on|in|off|near|by|today|this|yesterday)\s'
+                 r'|\s+(?i:spoke|talked|met|owner|manager|gk|dm|gm|nobody|no\s+one|closed|they|she|he|not|'
+                 r'interested|follow|wants?|already|asked|receptionist|front\s+desk)\b)')
+_BUSINESS_CUE = re.compile(
+    r'(?i:\b(?:visited|stopped\s+(?:by|at|in(?:\s*to|\s+at)?)|dropped\s+(?:by|in(?:\s*to)?)|walked\s+into|'
+    r'went\s+(?:to|into)|knocked\s+(?:at|on)|canvassed|door\s+knock(?:ed)?(?:\s+at)?))\s+'
+    r'(?:the\s+)?([\w&\'][^\n,;!]*?)' + _BUSINESS_END)
+_CAPITALISED_RUN = r"([A-Z0-9&][\w&'.-]*(?:[ \t]+[A-Z0-9&][\w&'.-]*){0,5}?)"
+_BUSINESS_AT = re.compile(r'\b(?i:at)\s+' + _CAPITALISED_RUN + _BUSINESS_END)
+_BUSINESS_FOR = re.compile(r'\b(?i:for)\s+' + _CAPITALISED_RUN + _BUSINESS_END)
+_LEAD_PREFIX = re.compile(r'^\s*(?i:(?:quick\s+)?update|fyi|visit|new\s+visit)\s*[:-]\s*')
+_LEAD_PHRASE = re.compile(r'^\s*([^\n,;:!()]{2,60}?)' + _BUSINESS_END)
+_NOT_A_NAME = re.compile(
+    r'^(?i:i|we|he|she|they|it|today|just|spoke|talked|met|owner|manager|nobody|no\s+one|follow|call|'
+    r'update|visit|status|contact|phone|email|zip|account|acct|hi|hey|hello|thanks|ok|new)\b')
+
+# Role words recognised in free text, beyond ContactParser's gatekeeper/decision-maker sets
+_EXTRA_ROLES = {'manager', 'gm', 'general manager', 'office manager', 'assistant', 'bookkeeper',
+                'co-owner', 'employee', 'staff', 'bartender', 'stylist', 'artist', 'cashier', 'clerk'}
+_NAME_STOPWORDS = {'to', 'with', 'and', 'the', 'talked', 'spoke', 'met', 'asked', 'for', 'visited',
+                   'also', 'plus', 'her', 'his', 'their', 'a', 'an', 'is', 'was', 'named', 'by', 'at'}
+# "Maria", "Maria Lopez", "Dr. Patel" - one line, no sentence punctuation
+_PERSON = r"((?:Dr\.?[ \t]+)?[A-Z][a-z'-]+(?:[ \t]+[A-Z][a-z'-]+)?)"
+# Anything in parentheses after 1-3 words; accepted when the role is known or the words follow a separator
+_PAREN_PERSON = re.compile(r"((?:[A-Za-z][\w.'-]*[ \t]+){0,2}[A-Za-z][\w.'-]*)[ \t]*\(([^()]{1,40})\)")
+_LIST_SEPARATOR = re.compile(r"(?:^|[,;/&.:\n-]|\band)\s*$")
+# "..., Talia." - a bare name closing a list that started with "Name (role)"
+_LIST_TAIL = re.compile(r",[ \t]*" + _PERSON + r"(?=[ \t]*(?:[.;,\n]|$))")
+_PRONOUN_ROLE = r"\b(?i:she|he)(?:'s|[ \t]+is)[ \t]+the[ \t]+"
+
+
+@dataclass
+class ParsedMessage:
+    """Visit fields pulled out of one message"""
+    business_name: str = ''
+    zip_code: str = ''
+    contact_name: str = ''                 # "Maria (owner), Tom (gk)" - ContactParser input format
+    phone: str = ''
+    email: str = ''
+    address: str = ''
+    city: str = ''
+    status: str = DEFAULT_STATUS
+    account_id_8498: str = ''
+    notes: str = ''
+    contact: Optional[ParsedContact] = None
+    missing: List[str] = field(default_factory=list)
+
+    @property
+    def is_visit(self) -> bool:
+        """Enough to create a visit (add_visit needs a business and a zip)"""
+        return bool(self.business_name and self.zip_code)
+
+    def to_visit_kwargs(self, source: str = 'whatsapp') -> Dict:
+        """Keyword arguments for GHLComcastSync.add_visit()"""
+        return dict(business_name=self.business_name, zip_code=self.zip_code,
+                    contact_name=self.contact_name, phone=self.phone, email=self.email,
+                    address=self.address, city=self.city, notes=self.notes,
+                    status=self.status, source=source, account_id_8498=self.account_id_8498)
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data['contact'] = self.contact.to_dict() if self.contact else None
+        return data
+
+
+class MessageParser:
+    """Rule-based message -> visit extractor. Patterns are compiled once, at construction."""
+
+    def __init__(self, contact_parser: Optional[ContactParser] = None):
+        self.contact_parser = contact_parser or ContactParser()
+        roles = set(self.contact_parser.gatekeeper_roles) | set(self.contact_parser.decision_maker_roles) | _EXTRA_ROLES
+        role_alt = '|'.join(re.escape(r).replace(r'\ ', r'\s+') for r in sorted(roles, key=len, reverse=True))
+        self._role_word = re.compile(r'\b(?:' + role_alt + r')\b', re.I)
+        # "owner Maria" / "owner is Maria Lopez" / "GK: Tom"
+        self._role_person = re.compile(
+            r"\b((?i:" + role_alt + r"))\b[ \t]*(?:(?i:is|was|named|name\s+is)[ \t]+|[:=-][ \t]*)?" + _PERSON)
+        # "spoke with Maria, the owner" / "met Maria"
+        self._verb_person = re.compile(
+            r"\b(?i:spoke\s+(?:with|to)|talked\s+(?:with|to)|met(?:\s+with)?|asked\s+for)\s+" + _PERSON +
+            r"(?:[ \t]*,?[ \t]*(?i:the|who\s+is\s+the|is\s+the)[ \t]+((?i:" + role_alt + r")))?")
+        # "Leilani is the owner"
+        self._person_is_role = re.compile(_PERSON + r"[ \t]+(?:is|was)[ \t]+the[ \t]+((?i:" + role_alt + r"))\b")
+        # "..., she's the office manager" - role for the person just mentioned
+        self._pronoun_role = re.compile(_PRONOUN_ROLE + r"((?i:" + role_alt + r"))\b")
+
+    # -- helpers ---------------------------------------------------------
+
+    @staticmethod
+    def _blank(text: str, span: Tuple[int, int]) -> str:
+        return text[:span[0]] + ' ' * (span[1] - span[0]) + text[span[1]:]
+
+    def _take(self, pattern, labelled_value: str, text: str):
+        """First match in the labelled value, else in the free text (blanked out of it)"""
+        match = pattern.search(labelled_value)
+        if match:
+            return match, text
+        match = pattern.search(text)
+        if match:
+            text = self._blank(text, match.span())
+        return match, text
+
+    @staticmethod
+    def _trim(name: str) -> str:
+        """Strip separators around a business name, keeping a closing "Inc." / "Co." period"""
+        name = name.strip(' -')
+        return name if _ABBREVIATION_TAIL.search(name) else name.strip(' .-')
+
+    @staticmethod
+    def _format_phone(match) -> str:
+        return f"{match.group(1)}-{match.group(2)}-{match.group(3)}"
+
+    def _clean_name(self, raw: str) -> str:
+        words = raw.split()
+        while words and words[0].lower() in _NAME_STOPWORDS:
+            words.pop(0)
+        if len(words) >= 3 and words[-3].lower().rstrip('.') == 'dr':
+            return ' '.join(words[-3:])
+        return ' '.join(words[-2:])
+
+    def status_for(self, text: str) -> Optional[str]:
+        for status, pattern in _STATUS:
+            if pattern.search(text):
+                return status
+        return None
+
+    def _people(self, text: str) -> List[Tuple[str, str]]:
+        """(name, role) pairs in order of appearance, one per first name"""
+        found = []
+        for match in _PAREN_PERSON.finditer(text):
+            role = match.group(2).strip()
+            if not self._role_word.search(role) and not _LIST_SEPARATOR.search(text[:match.start()]):
+                continue
+            found.append((match.start(), self._clean_name(match.group(1)), role.lower()))
+            tail = _LIST_TAIL.match(text, match.end())
+            if tail and not self._role_word.fullmatch(tail.group(1)):
+                found.append((tail.start(1), tail.group(1), ''))
+        for pattern, name_group, role_group in ((self._role_person, 2, 1), (self._verb_person, 1, 2),
+                                                (self._person_is_role, 1, 2)):
+            for match in pattern.finditer(text):
+                role = match.group(role_group)
+                found.append((match.start(name_group), match.group(name_group),
+                              re.sub(r'\s+', ' ', role.lower()) if role else ''))
+
+        people, positions, seen = [], [], {}
+        for position, name, role in sorted(found):
+            if not name or name.lower() in _NAME_STOPWORDS or self._role_word.fullmatch(name):
+                continue
+            key = name.split()[-1].lower() if name.lower().startswith('dr') else name.split()[0].lower()
+            if key in seen:
+                # Keep the more specific reading of the same person
+                index = seen[key]
+                old_name, old_role = people[index]
+                people[index] = (max(old_name, name, key=len), old_role or role)
+                continue
+            seen[key] = len(people)
+            people.append((name, role))
+            positions.append(position)
+
+        for match in self._pronoun_role.finditer(text):
+            for index in range(len(people) - 1, -1, -1):
+                if positions[index] < match.start() and not people[index][1]:
+                    people[index] = (people[index][0], re.sub(r'\s+', ' ', match.group(1).lower()))
+                    break
+        return people
+
+    def _business_name(self, text: str, people: List[Tuple[str, str]]) -> str:
+        for pattern in (_BUSINESS_CUE, _BUSINESS_AT):
+            match = pattern.search(text)
+            if match and match.group(1).strip():
+                return self._trim(match.group(1))
+        lead_text = _LEAD_PREFIX.sub('', text, count=1)
+        match = _LEAD_PHRASE.match(lead_text)
+        if match:
+            lead = self._trim(match.group(1))
+            names = {name.lower() for name, _ in people} | {name.split()[0].lower() for name, _ in people}
+            if (lead and not _NOT_A_NAME.match(lead) and lead.lower() not in names
+                    and not self.status_for(lead) and re.search(r'[A-Za-z]', lead)):
+                return lead
+        match = _BUSINESS_FOR.search(text)
+        return self._trim(match.group(1)) if match else ''
+
+    # -- main entry point --------------------------------------------------
+
+    def parse(self, message: str) -> ParsedMessage:
+        """Extract visit fields from one message"""
+        message = (message or '').strip()
+        result = ParsedMessage(notes=message)
+        labelled: Dict[str, str] = {}
+        text = message
+
+        for match in _LABEL_LINE.finditer(message):
+            name = _LABELS[match.group(1).lower()]
+            if match.group(2) and name not in labelled:
+                labelled[name] = match.group(2)
+            text = self._blank(text, match.span())
+
+        # Structured values: labelled first, then anywhere in the free text
+        email, text = self._take(_EMAIL, labelled.get('email', ''), text)
+        if email:
+            result.email = email.group(0).lower()
+        account, text = self._take(_ACCOUNT, labelled.get('account_id_8498', ''), text)
+        if account:
+            result.account_id_8498 = re.sub(r'\D', '', account.group(0))
+        phone, text = self._take(_PHONE, labelled.get('phone', ''), text)
+        if phone:
+            result.phone = self._format_phone(phone)
+
+        if 'address' in labelled:
+            result.address = labelled['address'].split(',')[0].strip()
+        else:
+            address = _ADDRESS.search(text)
+            if address:
+                result.address = address.group(0).strip(' ,')
+
+        city = _CITY.search(labelled.get('address', '') + ' ' + message) if 'city' not in labelled else None
+        result.city = labelled.get('city', '') or (city.group(1).strip() if city else '')
+
+        zips = _ZIP.findall(labelled.get('zip_code', '')) or _ZIP.findall(labelled.get('address', '')) \
+            or _ZIP.findall(text)
+        if zips:
+            result.zip_code = zips[-1]          # zips close addresses; street numbers come first
+
+        # People
+        if 'contact_name' in labelled:
+            result.contact_name = labelled['contact_name']
+        else:
+            people = self._people(text)
+            result.contact_name = ', '.join(f"{name} ({role})" if role else name for name, role in people)
+        result.contact = self.contact_parser.parse(result.contact_name)
+
+        # Status
+        status = self.status_for(text + '\n' + labelled.get('notes', ''))
+        if 'status' in labelled:
+            status = (self.status_for(labelled['status']) or
+                      re.sub(r'[^a-z0-9]+', '-', labelled['status'].lower()).strip('-'))
+        result.status = status or DEFAULT_STATUS
+
+        # Business
+        if 'business_name' in labelled:
+            result.business_name = labelled['business_name']
+        else:
+            people = [(p.first_name + (' ' + p.last_name if p.last_name else ''), p.role)
+                      for p in filter(None, [result.contact.gatekeeper, result.contact.decision_maker,
+                                             *result.contact.others])]
+            result.business_name = self._business_name(text, people)
+
+        if 'notes' in labelled:
+            result.notes = labelled['notes']
+        result.missing = [name for name in ('business_name', 'zip_code') if not getattr(result, name)]
+        return result
+
+
+_default_parser = None
+
+def parse_message(message: str) -> ParsedMessage:
+    """Parse with a shared default MessageParser"""
+    global _default_parser
+    if _default_parser is None:
+        _default_parser = MessageParser()
+    return _default_parser.parse(message)
+
+
+# -- benchmark -----------------------------------------------------------------
+
+BENCH_FIELDS = ('business_name', 'zip_code', 'contact_name', 'phone', 'email',
+                'address', 'city', 'status', 'account_id_8498')
+
+
+def _field_matches(name: str, got: str, want: str) -> bool:
+    if name in ('business_name', 'contact_name', 'address', 'city'):
+        return ' '.join(got.lower().split()) == ' '.join(want.lower().split())
+    return got == want
+
+
+def benchmark(corpus_path: str = CORPUS_PATH, rounds: int = 200) -> Dict:
+    """Per-field accuracy over the labelled corpus, plus throughput"""
+    with open(corpus_path) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    parser = MessageParser()
+
+    correct = {name: 0 for name in BENCH_FIELDS}
+    totals = {name: 0 for name in BENCH_FIELDS}
+    failures = []
+    for case in corpus:
+        parsed = parser.parse(case['message'])
+        for name in BENCH_FIELDS:
+            want = case['expected'].get(name, DEFAULT_STATUS if name == 'status' else '')
+            got = getattr(parsed, name)
+            totals[name] += 1
+            if _field_matches(name, got, want):
+                correct[name] += 1
+            else:
+                failures.append((case['message'][:60], name, got, want))
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for case in corpus:
+            parser.parse(case['message'])
+    elapsed = time.perf_counter() - started
+
+    exact = sum(1 for case in corpus
+                if all(_field_matches(n, getattr(parser.parse(case['message']), n),
+                                      case['expected'].get(n, DEFAULT_STATUS if n == 'status' else ''))
+                       for n in BENCH_FIELDS))
+    return {
+        'messages': len(corpus),
+        'accuracy': {name: round(correct[name] / totals[name], 3) for name in BENCH_FIELDS},
+        'exactMessages': round(exact / len(corpus), 3),
+        'messagesPerSecond': round(rounds * len(corpus) / elapsed),
+        'failures': failures,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        passed = True
+        for path in sys.argv[2:] or [CORPUS_PATH, REGRESSION_PATH, HOLDOUT_PATH]:
+            report = benchmark(path)
+            print(f"{os.path.basename(path)}: {report['messages']} labelled messages")
+            for name, accuracy in report['accuracy'].items():
+                print(f"  {name:<16} {accuracy:6.1%}")
+            print(f"  all fields right: {report['exactMessages']:.1%} of messages")
+            print(f"Throughput: {report['messagesPerSecond']:,} messages/s")
+            for message, name, got, want in report['failures']:
+                print(f"  MISS {name}: got {got!r}, want {want!r}  <- {message!r}")
+            passed = passed and report['exactMessages'] >= 0.9
+        sys.exit(0 if passed else 1)
+    else:
+        text = ' '.join(sys.argv[1:]) or sys.stdin.read()
+        print(json.dumps(parse_message(text).to_dict(), indent=2))
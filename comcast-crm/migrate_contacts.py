@@ -2,130 +2,312 @@
 """
 Migrate existing contacts to use structured contact fields.
 Safe to re-run - only processes records where new fields are empty.
+
+Rows are read in id-ordered chunks (keyset pagination), parsed across a
+process pool, and written back with executemany. Each chunk commits
+together with a checkpoint row, so an interrupted run resumes from the
+last committed chunk instead of starting over. Rows the checkpoint moves
+past because they failed to parse are recorded in migration_skipped, and
+--retry-skipped runs just those rows again (e.g. after a ContactParser fix).
 """
 
+import argparse
 import sqlite3
 import json
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import DB_PATH
 from contact_parser import ContactParser
+import mail_merge_names
+
+CHECKPOINT_NAME = "contact_fields"
+DEFAULT_CHUNK_SIZE = 500
+
+# Per-process parser, created lazily so pool workers build their own
+_parser = None
+
 
-DB_PATH = "/Users/xfinch/.openclaw/workspace/comcast-crm/comcast.db"
+def _get_parser() -> ContactParser:
+    global _parser
+    if _parser is None:
+        _parser = ContactParser()
+    return _parser
 
-def migrate_contacts(dry_run=True):
+
+def parse_row(row: tuple) -> tuple:
     """
-    Parse existing contact_name fields and populate structured fields.
-    Only updates records where structured fields are currently NULL.
+    Parse one (id, business_name, contact_name, notes) row.
+
+    Runs inside pool workers, so it only takes and returns plain tuples.
+
+    Returns:
+        ('ok', update_params, preview) or ('error', (id, business_name, message), None)
     """
-    parser = ContactParser()
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    # Find records that need migration (have contact_name but no structured fields)
-    cursor.execute("""
+    contact_id, business_name, contact_name, existing_notes = row
+    try:
+        parsed = _get_parser().parse(contact_name)
+
+        # Build enhanced notes
+        enhanced_notes = existing_notes or ""
+        if parsed.role_notes and f"Contact roles: {parsed.role_notes}" not in enhanced_notes:
+            if enhanced_notes:
+                enhanced_notes += f"\n\nContact roles: {parsed.role_notes}"
+            else:
+                enhanced_notes = f"Contact roles: {parsed.role_notes}"
+
+        # Prepare other_contacts JSON
+        other_contacts_json = json.dumps([o.to_dict() for o in parsed.others]) if parsed.others else None
+
+        mail_first, mail_last = parsed.primary_name()
+
+        params = (
+            parsed.gatekeeper.first_name if parsed.gatekeeper else None,
+            parsed.gatekeeper.last_name if parsed.gatekeeper else None,
+            parsed.decision_maker.first_name if parsed.decision_maker else None,
+            parsed.decision_maker.last_name if parsed.decision_maker else None,
+            other_contacts_json,
+            enhanced_notes,
+            mail_first or None,
+            mail_last or None,
+            contact_id
+        )
+        preview = (len(parsed.others), parsed.role_notes)
+        return 'ok', params, preview
+    except Exception as e:
+        return 'error', (contact_id, business_name, str(e)), None
+
+
+def ensure_checkpoint_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_checkpoints (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_skipped (
+            name TEXT NOT NULL,
+            record_id INTEGER NOT NULL,            -- business_visits.id
+            reason TEXT NOT NULL,
+            skipped_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (name, record_id)
+        )
+    """)
+    conn.commit()
+
+
+def load_checkpoint(conn: sqlite3.Connection, name: str = CHECKPOINT_NAME) -> int:
+    try:
+        row = conn.execute(
+            "SELECT last_id FROM migration_checkpoints WHERE name = ?", (name,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return 0  # never applied; dry runs don't create the table
+    return row[0] if row else 0
+
+
+def save_checkpoint(conn: sqlite3.Connection, last_id: int, name: str = CHECKPOINT_NAME):
+    """Record progress. Caller commits, so the checkpoint lands with the chunk's updates."""
+    conn.execute("""
+        INSERT INTO migration_checkpoints (name, last_id, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id,
+                                        updated_at = excluded.updated_at
+    """, (name, last_id))
+
+
+def save_skipped(conn: sqlite3.Connection, skipped: list, migrated_ids: list, name: str = CHECKPOINT_NAME):
+    """Record (id, reason) rows passed over and clear rows that have now migrated. Caller commits."""
+    conn.executemany("""
+        INSERT INTO migration_skipped (name, record_id, reason, skipped_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(name, record_id) DO UPDATE SET reason = excluded.reason,
+                                                   skipped_at = excluded.skipped_at
+    """, [(name, record_id, reason) for record_id, reason in skipped])
+    conn.executemany("DELETE FROM migration_skipped WHERE name = ? AND record_id = ?",
+                     [(name, record_id) for record_id in migrated_ids])
+
+
+def skipped_count(conn: sqlite3.Connection, name: str = CHECKPOINT_NAME) -> int:
+    try:
+        return conn.execute("SELECT COUNT(*) FROM migration_skipped WHERE name = ?", (name,)).fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+
+
+def fetch_chunk(conn: sqlite3.Connection, after_id: int, chunk_size: int,
+                skipped_only: bool = False) -> list:
+    """Next chunk of unmigrated rows with id > after_id (keyset pagination on the primary key).
+    skipped_only limits it to rows recorded in migration_skipped."""
+    skipped_clause = """
+          AND id IN (SELECT record_id FROM migration_skipped WHERE name = ?)""" if skipped_only else ""
+    params = (after_id, CHECKPOINT_NAME, chunk_size) if skipped_only else (after_id, chunk_size)
+    return conn.execute(f"""
         SELECT id, business_name, contact_name, notes
         FROM business_visits
-        WHERE contact_name IS NOT NULL 
+        WHERE id > ?{skipped_clause}
+          AND contact_name IS NOT NULL
           AND contact_name != ''
           AND decision_maker_first_name IS NULL
           AND gatekeeper_first_name IS NULL
         ORDER BY id
-    """)
-    
-    to_migrate = cursor.fetchall()
-    
-    if not to_migrate:
-        print("No contacts need migration. All records already have structured fields.")
+        LIMIT ?
+    """, params).fetchall()
+
+
+def migrate_contacts(dry_run=True, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+                     reset=False, retry_skipped=False, db_path=DB_PATH):
+    """
+    Parse existing contact_name fields and populate structured fields.
+    Only updates records where structured fields are currently NULL.
+
+    Args:
+        dry_run: Preview changes over a read-only connection (no columns, checkpoint or updates)
+        chunk_size: Rows read, parsed and committed per chunk
+        workers: Parser processes; None uses one per CPU, 1 parses in-process
+        reset: Ignore any saved checkpoint and start from the first row
+        retry_skipped: Only re-run rows recorded in migration_skipped (checkpoint untouched)
+        db_path: SQLite database to migrate
+    """
+    if dry_run:
+        # Read-only, so a preview can't add columns or tables either
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(db_path)
+        mail_merge_names.ensure_schema(conn)  # mail name columns, backfilled once
+        ensure_checkpoint_table(conn)
+
+    if reset and not dry_run:
+        conn.execute("DELETE FROM migration_checkpoints WHERE name = ?", (CHECKPOINT_NAME,))
+        conn.commit()
+    if retry_skipped and not skipped_count(conn):
+        print("No skipped rows recorded.")
+        conn.close()
         return
-    
-    print(f"Found {len(to_migrate)} contacts to migrate")
-    print("=" * 80)
-    
+    start_id = 0 if reset or retry_skipped else load_checkpoint(conn)
+    if start_id:
+        print(f"Resuming after checkpoint id {start_id}")
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+
     migrated = 0
-    skipped = 0
+    seen = 0
+    chunks = 0
     errors = []
-    
-    for row in to_migrate:
-        try:
-            contact_id = row['id']
-            business_name = row['business_name']
-            contact_name = row['contact_name']
-            existing_notes = row['notes'] or ""
-            
-            # Parse the contact name
-            parsed = parser.parse(contact_name)
-            
-            # Build enhanced notes
-            enhanced_notes = existing_notes
-            if parsed.role_notes:
-                if enhanced_notes:
-                    enhanced_notes += f"\n\nContact roles: {parsed.role_notes}"
-                else:
-                    enhanced_notes = f"Contact roles: {parsed.role_notes}"
-            
-            # Prepare other_contacts JSON
-            other_contacts_json = json.dumps([o.to_dict() for o in parsed.others]) if parsed.others else None
-            
-            if dry_run:
-                # Preview mode - show what would change
-                print(f"\nID {contact_id}: {business_name}")
-                print(f"  Input: {contact_name}")
-                print(f"  GK: {parsed.gatekeeper.first_name if parsed.gatekeeper else None} {parsed.gatekeeper.last_name if parsed.gatekeeper else ''}")
-                print(f"  DM: {parsed.decision_maker.first_name if parsed.decision_maker else None} {parsed.decision_maker.last_name if parsed.decision_maker else ''}")
-                print(f"  Others: {len(parsed.others)} additional contacts")
-                if parsed.role_notes:
-                    print(f"  Role notes added: {parsed.role_notes[:60]}...")
+    last_id = start_id
+    started = time.perf_counter()
+
+    try:
+        while True:
+            rows = fetch_chunk(conn, last_id, chunk_size, skipped_only=retry_skipped)
+            if not rows:
+                break
+            chunks += 1
+            seen += len(rows)
+
+            if pool is not None:
+                results = list(pool.map(parse_row, rows, chunksize=max(1, len(rows) // 32)))
             else:
-                # Actually update
-                cursor.execute("""
+                results = [parse_row(row) for row in rows]
+
+            updates = []
+            chunk_skipped = []
+            for row, (state, payload, preview) in zip(rows, results):
+                if state == 'error':
+                    errors.append(payload)
+                    chunk_skipped.append((row[0], payload[2][:500]))
+                    continue
+                updates.append(payload)
+                if dry_run:
+                    # Preview mode - show what would change
+                    gk_first, gk_last, dm_first, dm_last = payload[:4]
+                    others, role_notes = preview
+                    print(f"\nID {row[0]}: {row[1]}")
+                    print(f"  Input: {row[2]}")
+                    print(f"  GK: {gk_first} {gk_last or ''}")
+                    print(f"  DM: {dm_first} {dm_last or ''}")
+                    print(f"  Others: {others} additional contacts")
+                    if role_notes:
+                        print(f"  Role notes added: {role_notes[:60]}...")
+
+            last_id = rows[-1][0]
+
+            if not dry_run:
+                # Updates and checkpoint commit together; the write lock is
+                # released between chunks so the API keeps serving writes
+                conn.executemany("""
                     UPDATE business_visits
                     SET gatekeeper_first_name = ?,
                         gatekeeper_last_name = ?,
                         decision_maker_first_name = ?,
                         decision_maker_last_name = ?,
                         other_contacts = ?,
-                        notes = ?
+                        notes = ?,
+                        mail_first_name = ?,
+                        mail_last_name = ?
                     WHERE id = ?
-                """, (
-                    parsed.gatekeeper.first_name if parsed.gatekeeper else None,
-                    parsed.gatekeeper.last_name if parsed.gatekeeper else None,
-                    parsed.decision_maker.first_name if parsed.decision_maker else None,
-                    parsed.decision_maker.last_name if parsed.decision_maker else None,
-                    other_contacts_json,
-                    enhanced_notes,
-                    contact_id
-                ))
-                migrated += 1
-                
-                if migrated % 10 == 0:
-                    print(f"  Migrated {migrated} contacts...")
-                    
-        except Exception as e:
-            errors.append((row['id'], row['business_name'], str(e)))
-            skipped += 1
-    
+                """, updates)
+                save_skipped(conn, chunk_skipped, [params[-1] for params in updates])
+                if not retry_skipped:
+                    save_checkpoint(conn, last_id)
+                conn.commit()
+                migrated += len(updates)
+
+                elapsed = time.perf_counter() - started
+                print(f"  Chunk {chunks}: {migrated} migrated through id {last_id} "
+                      f"({seen / elapsed:,.0f} rows/s)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+
+    if not seen:
+        print("No contacts need migration. All records already have structured fields.")
+        return
+
+    print(f"\n{'=' * 80}")
     if not dry_run:
-        conn.commit()
-        print(f"\n{'=' * 80}")
         print(f"Migration complete:")
         print(f"  Migrated: {migrated}")
-        print(f"  Skipped (errors): {skipped}")
-        
+        print(f"  Skipped (errors): {len(errors)}")
         if errors:
-            print(f"\nErrors:")
-            for contact_id, business_name, error in errors[:10]:
-                print(f"  ID {contact_id} ({business_name}): {error}")
-            if len(errors) > 10:
-                print(f"  ... and {len(errors) - 10} more")
+            print(f"  Skipped ids are in migration_skipped; rerun with --apply --retry-skipped")
     else:
-        print(f"\n{'=' * 80}")
         print(f"DRY RUN - No changes made")
-        print(f"Would migrate {len(to_migrate)} contacts")
+        print(f"Would migrate {seen - len(errors)} contacts")
         print(f"Run with --apply to execute migration")
 
+    print(f"\nThroughput:")
+    print(f"  Rows: {seen} in {chunks} chunks of <= {chunk_size}")
+    print(f"  Elapsed: {elapsed:.2f}s ({seen / elapsed if elapsed else 0:,.0f} rows/s)")
+    print(f"  Workers: {'in-process' if pool is None else (workers or 'cpu count')}")
+
+    if errors:
+        print(f"\nErrors:")
+        for contact_id, business_name, error in errors[:10]:
+            print(f"  ID {contact_id} ({business_name}): {error}")
+        if len(errors) > 10:
+            print(f"  ... and {len(errors) - 10} more")
+
+
 if __name__ == "__main__":
-    dry_run = "--apply" not in sys.argv
-    
+    arg_parser = argparse.ArgumentParser(description="Populate structured contact fields from contact_name")
+    arg_parser.add_argument("--apply", action="store_true", help="write changes (default is a dry run)")
+    arg_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    arg_parser.add_argument("--workers", type=int, default=None,
+                            help="parser processes (default: CPU count, 1 = no pool)")
+    arg_parser.add_argument("--reset", action="store_true", help="ignore the saved checkpoint")
+    arg_parser.add_argument("--retry-skipped", action="store_true",
+                            help="only re-run rows recorded in migration_skipped")
+    arg_parser.add_argument("--db", default=DB_PATH)
+    args = arg_parser.parse_args()
+
+    dry_run = not args.apply
+
     if dry_run:
         print("DRY RUN MODE - Previewing changes (no data modified)")
         print("Run with --apply to execute the migration\n")
@@ -135,5 +317,6 @@ if __name__ == "__main__":
         if confirm != 'yes':
             print("Aborted")
             sys.exit(0)
-    
-    migrate_contacts(dry_run=dry_run)
+
+    migrate_contacts(dry_run=dry_run, chunk_size=args.chunk_size, workers=args.workers,
+                     reset=args.reset, retry_skipped=args.retry_skipped, db_path=args.db)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+People Index - normalized person lookup for business visits
+One row per parsed person (gatekeeper, decision maker, others) with
+casefolded and Soundex keys, so name lookups hit an index instead of a
+LIKE scan over contact_name and the other_contacts JSON. Inserts index
+their people in the same transaction; a later edit to contact_name
+queues the visit for refresh_stale().
+"""
+
+import re
+import sqlite3
+import sys
+import unicodedata
+from typing import Dict, List, Optional
+
+from contact_parser import ContactParser, ParsedContact
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visit_people (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    visit_id INTEGER NOT NULL,             -- business_visits.id
+    person_type TEXT NOT NULL,             -- gatekeeper, decision_maker, other
+    role TEXT,                             -- raw role from parentheses
+    first_name TEXT,
+    last_name TEXT,
+    first_key TEXT,                        -- casefolded, accent-free, no title
+    last_key TEXT,
+    first_phonetic TEXT,                   -- Soundex of first_key
+    last_phonetic TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_people_first ON visit_people(first_key, person_type);
+CREATE INDEX IF NOT EXISTS idx_people_last ON visit_people(last_key, person_type);
+CREATE INDEX IF NOT EXISTS idx_people_first_phonetic ON visit_people(first_phonetic);
+CREATE INDEX IF NOT EXISTS idx_people_last_phonetic ON visit_people(last_phonetic);
+CREATE INDEX IF NOT EXISTS idx_people_visit ON visit_people(visit_id);
+
+-- Visits whose contact_name changed after insert; refresh_stale() re-parses them
+CREATE TABLE IF NOT EXISTS visit_people_stale (
+    visit_id INTEGER PRIMARY KEY
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_people_visit_delete
+AFTER DELETE ON business_visits
+BEGIN
+    DELETE FROM visit_people WHERE visit_id = OLD.id;
+END;
+
+-- SQL can't parse names, so an edited contact_name drops the visit's people and queues it.
+-- business_name is joined from business_visits at search time and never goes stale.
+CREATE TRIGGER IF NOT EXISTS trg_people_visit_update
+AFTER UPDATE OF contact_name ON business_visits
+WHEN NEW.contact_name IS NOT OLD.contact_name
+BEGIN
+    DELETE FROM visit_people WHERE visit_id = NEW.id;
+    INSERT OR IGNORE INTO visit_people_stale (visit_id) VALUES (NEW.id);
+END;
+"""
+
+PERSON_TYPES = ('gatekeeper', 'decision_maker', 'other')
+
+_NON_ALNUM = re.compile(r'[^0-9a-z ]+')
+_TITLES = {'dr', 'mr', 'mrs', 'ms', 'miss'}
+
+_SOUNDEX_CODES = {}
+for _letters, _digit in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'),
+                         ('l', '4'), ('mn', '5'), ('r', '6')):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """
+    Create the people tables, indexes and triggers if missing.
+    A newly created table is backfilled from existing visits; queued stale visits are re-parsed.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visit_people'"
+    ).fetchone()
+    conn.executescript(SCHEMA)
+    if not exists:
+        rebuild(conn)
+    elif stale_count(conn):
+        with conn:
+            refresh_stale(conn)
+
+
+def name_key(name: Optional[str]) -> str:
+    """Casefold, strip accents and punctuation, drop leading titles ("Dr. Sarah" -> "sarah")"""
+    if not name:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    ascii_only = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    words = _NON_ALNUM.sub(' ', ascii_only).split()
+    while words and words[0] in _TITLES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+def soundex(key: str) -> str:
+    """American Soundex of a normalized key (first word only); '' for empty input"""
+    word = ''.join(c for c in key.split(' ')[0] if c.isalpha()) if key else ''
+    if not word:
+        return ''
+    code = word[0].upper()
+    last = _SOUNDEX_CODES.get(word[0], '')
+    for c in word[1:]:
+        digit = _SOUNDEX_CODES.get(c, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code
+        if c not in 'hw':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def _person_rows(visit_id: int, parsed: ParsedContact) -> List[tuple]:
+    people = []
+    if parsed.gatekeeper:
+        people.append(parsed.gatekeeper)
+    if parsed.decision_maker:
+        people.append(parsed.decision_maker)
+    people.extend(parsed.others)
+
+    rows = []
+    for person in people:
+        first_key = name_key(person.first_name)
+        last_key = name_key(person.last_name)
+        rows.append((visit_id, person.person_type, person.role or None,
+                     person.first_name, person.last_name,
+                     first_key, last_key, soundex(first_key), soundex(last_key)))
+    return rows
+
+
+def index_visit_people(conn: sqlite3.Connection, visit_id: int, parsed: ParsedContact):
+    """
+    Replace the indexed people for one visit.
+    Does not commit - callers fold this into the transaction that wrote the visit.
+    """
+    conn.execute("DELETE FROM visit_people WHERE visit_id = ?", (visit_id,))
+    conn.executemany("""
+        INSERT INTO visit_people
+        (visit_id, person_type, role, first_name, last_name,
+         first_key, last_key, first_phonetic, last_phonetic)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, _person_rows(visit_id, parsed))
+
+
+def stale_count(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(*) FROM visit_people_stale").fetchone()[0]
+
+
+def refresh_stale(conn: sqlite3.Connection, parser: Optional[ContactParser] = None) -> int:
+    """
+    Re-index visits queued by trg_people_visit_update. Returns visits refreshed.
+    Does not commit - run it inside a write transaction.
+    """
+    parser = parser or ContactParser()
+    rows = conn.execute("""
+        SELECT s.visit_id, v.contact_name FROM visit_people_stale s
+        JOIN business_visits v ON v.id = s.visit_id
+    """).fetchall()
+    for visit_id, contact_name in rows:
+        index_visit_people(conn, visit_id, parser.parse(contact_name or ''))
+    conn.execute("DELETE FROM visit_people_stale")
+    return len(rows)
+
+
+def rebuild(conn: sqlite3.Connection, parser: Optional[ContactParser] = None) -> int:
+    """Re-parse every contact_name and rebuild visit_people from scratch. Returns people indexed."""
+    parser = parser or ContactParser()
+    conn.executescript(SCHEMA)
+    rows = []
+    for visit_id, contact_name in conn.execute(
+            "SELECT id, contact_name FROM business_visits WHERE contact_name IS NOT NULL AND contact_name != ''"):
+        rows.extend(_person_rows(visit_id, parser.parse(contact_name)))
+    with conn:
+        conn.execute("DELETE FROM visit_people")
+        conn.execute("DELETE FROM visit_people_stale")
+        conn.executemany("""
+            INSERT INTO visit_people
+            (visit_id, person_type, role, first_name, last_name,
+             first_key, last_key, first_phonetic, last_phonetic)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+    return len(rows)
+
+
+def _prefix_upper(key: str) -> str:
+    """Smallest string greater than every string starting with key (for index range scans)"""
+    return key[:-1] + chr(ord(key[-1]) + 1)
+
+
+def search_people(conn: sqlite3.Connection, query: str,
+                  person_type: Optional[str] = None,
+                  phonetic: bool = True,
+                  limit: int = 50) -> List[Dict]:
+    """
+    Find people by name.
+
+    The first word of the query is matched as a prefix of first or last name;
+    a second word narrows by last-name prefix. With phonetic=True, names that
+    sound alike (Soundex) are included after the prefix hits.
+
+    Args:
+        conn: Open connection
+        query: Name fragment, e.g. "yana" or "john sm"
+        person_type: Optional filter - gatekeeper, decision_maker, other
+        phonetic: Include sound-alike matches
+        limit: Max results
+
+    Returns:
+        List of dicts ordered exact > prefix > phonetic, then most recent visit
+    """
+    key = name_key(query)
+    if not key:
+        return []
+    words = key.split(' ')
+    first, rest = words[0], ' '.join(words[1:])
+
+    type_clause = " AND p.person_type = ?" if person_type else ""
+    type_params = [person_type] if person_type else []
+
+    select = """
+        SELECT p.id, p.visit_id, p.person_type, p.role, p.first_name, p.last_name,
+               p.first_key, p.last_key,
+               v.business_name, v.zip_code, v.visit_status, v.visit_date, v.phone, v.email
+        FROM visit_people p
+        JOIN business_visits v ON v.id = p.visit_id
+    """
+
+    # Each probe is a range or equality on an indexed key column
+    probes = []
+    if rest:
+        probes.append(("p.first_key = ? AND p.last_key >= ? AND p.last_key < ?",
+                       [first, rest, _prefix_upper(rest)], 'prefix'))
+    else:
+        probes.append(("p.first_key >= ? AND p.first_key < ?", [first, _prefix_upper(first)], 'prefix'))
+        probes.append(("p.last_key >= ? AND p.last_key < ?", [first, _prefix_upper(first)], 'prefix'))
+    if phonetic:
+        probes.append(("p.first_phonetic = ?", [soundex(first)], 'phonetic'))
+        if rest:
+            probes.append(("p.last_phonetic = ?", [soundex(rest)], 'phonetic'))
+
+    found = {}
+    for where, params, match in probes:
+        cursor = conn.execute(f"{select} WHERE {where}{type_clause} LIMIT ?",
+                              params + type_params + [limit])
+        for row in cursor.fetchall():
+            if row[0] in found:
+                continue
+            first_key, last_key = row[6], row[7]
+            if match == 'prefix' and (first_key == first or last_key == first) and not rest:
+                match_kind = 'exact'
+            elif match == 'prefix' and rest and last_key == rest:
+                match_kind = 'exact'
+            else:
+                match_kind = match
+            found[row[0]] = {
+                'visitId': str(row[1]),
+                'personType': row[2],
+                'role': row[3],
+                'firstName': row[4],
+                'lastName': row[5],
+                'businessName': row[8],
+                'zip': row[9],
+                'status': row[10],
+                'visitDate': row[11],
+                'phone': row[12],
+                'email': row[13],
+                'match': match_kind,
+            }
+
+    rank = {'exact': 0, 'prefix': 1, 'phonetic': 2}
+    people = sorted(found.values(), key=lambda p: p['visitDate'] or '', reverse=True)
+    people.sort(key=lambda p: rank[p['match']])
+    return people[:limit]
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        count = rebuild(conn)
+        print(f"Indexed {count} people")
+    elif len(sys.argv) > 2 and sys.argv[1] == "search":
+        ensure_schema(conn)
+        for person in search_people(conn, ' '.join(sys.argv[2:])):
+            print(f"{person['match']:8} {person['personType']:15} "
+                  f"{person['firstName']} {person['lastName']} - {person['businessName']} ({person['zip']})")
+    else:
+        print("Usage: python3 people_index.py [rebuild|search <name>]")
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Profiling - opt-in per-route timing and on-demand profiles for a live worker
+Per request it records:
+  - wall time
+  - SQL statement count and time, via ProfiledConnection. Time spent in
+    fetches counts too, since SQLite does most of its work while rows
+    are stepped.
+  - JSON serialization time, via ProfiledJSONProvider
+  - everything else (Python row conversion, CSV building, ...) as the remainder
+On demand it also takes a stack-sampling profile of every thread in the
+worker, or runs cProfile over the next N requests.
+Flask wiring lives in api_server_flask.py (COMCAST_PROFILE=1).
+"""
+
+import collections
+import cProfile
+import io
+import pstats
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flask.json.provider import DefaultJSONProvider
+
+RESERVOIR = 500                            # recent wall times kept per route for percentiles
+
+_local = threading.local()
+
+
+class RequestTimings:
+    __slots__ = ('started', 'sql_count', 'sql_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+def begin_request() -> RequestTimings:
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def end_request() -> Optional[RequestTimings]:
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    return timings
+
+
+def _current() -> Optional[RequestTimings]:
+    return getattr(_local, 'timings', None)
+
+
+# -- SQL ------------------------------------------------------------------------
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Times execute and fetch calls into the current request's timings"""
+
+    def _timed(self, method, *args, count: bool = False):
+        timings = _current()
+        if timings is None:
+            return method(self, *args)
+        started = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            timings.sql_seconds += time.perf_counter() - started
+            if count:
+                timings.sql_count += 1
+
+    def execute(self, *args):
+        return self._timed(sqlite3.Cursor.execute, *args, count=True)
+
+    def executemany(self, *args):
+        return self._timed(sqlite3.Cursor.executemany, *args, count=True)
+
+    def executescript(self, *args):
+        return self._timed(sqlite3.Cursor.executescript, *args, count=True)
+
+    def fetchone(self):
+        return self._timed(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(sqlite3.Cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(sqlite3.Cursor.fetchall)
+
+    def __next__(self):
+        return self._timed(sqlite3.Cursor.__next__)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """sqlite3.connect(..., factory=ProfiledConnection): every cursor is a ProfiledCursor"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+
+# -- JSON -----------------------------------------------------------------------
+
+class ProfiledJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that adds encode time to the current request"""
+
+    def dumps(self, obj, **kwargs):
+        timings = _current()
+        if timings is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            timings.serialize_seconds += time.perf_counter() - started
+
+
+# -- per-route aggregates ---------------------------------------------------------
+
+class RouteStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict] = {}
+
+    def record(self, route: str, timings: RequestTimings, status: int):
+        wall = time.perf_counter() - timings.started
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    'requests': 0, 'errors': 0, 'wall': 0.0, 'maxWall': 0.0, 'sqlCount': 0,
+                    'sql': 0.0, 'serialize': 0.0, 'recent': collections.deque(maxlen=RESERVOIR),
+                }
+            entry['requests'] += 1
+            entry['errors'] += status >= 500
+            entry['wall'] += wall
+            entry['maxWall'] = max(entry['maxWall'], wall)
+            entry['sqlCount'] += timings.sql_count
+            entry['sql'] += timings.sql_seconds
+            entry['serialize'] += timings.serialize_seconds
+            entry['recent'].append(wall)
+        return wall
+
+    def snapshot(self) -> List[Dict]:
+        """Per route: totals and means in ms, p50/p95 over recent requests; slowest total first"""
+        rows = []
+        with self._lock:
+            items = [(route, dict(entry, recent=sorted(entry['recent']))) for route, entry in self._routes.items()]
+        for route, entry in items:
+            n = entry['requests']
+            recent = entry['recent']
+            wall, sql, ser = entry['wall'], entry['sql'], entry['serialize']
+            rows.append({
+                'route': route,
+                'requests': n,
+                'errors': entry['errors'],
+                'totalMs': round(wall * 1000, 1),
+                'meanMs': round(wall / n * 1000, 2),
+                'p50Ms': round(recent[len(recent) // 2] * 1000, 2),
+                'p95Ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 2),
+                'maxMs': round(entry['maxWall'] * 1000, 2),
+                'sqlPerRequest': round(entry['sqlCount'] / n, 2),
+                'sqlMeanMs': round(sql / n * 1000, 2),
+                'serializeMeanMs': round(ser / n * 1000, 2),
+                'otherMeanMs': round(max(wall - sql - ser, 0.0) / n * 1000, 2),
+            })
+        rows.sort(key=lambda r: r['totalMs'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+def server_timing(timings: RequestTimings, wall: float) -> str:
+    """Server-Timing header value (shows up in browser devtools)"""
+    return (f"sql;desc=\"{timings.sql_count} queries\";dur={timings.sql_seconds * 1000:.2f}, "
+            f"json;dur={timings.serialize_seconds * 1000:.2f}, total;dur={wall * 1000:.2f}")
+
+
+# -- on-demand profiles -------------------------------------------------------------
+
+def sample_stacks(seconds: float, interval: float = 0.005, skip_thread: Optional[int] = None) -> Dict:
+    """
+    Stack-sampling profile of every thread in this process.
+
+    Returns:
+        {'samples': n, 'collapsed': {"a;b;c": count}, 'top': [...]} where collapsed
+        stacks are root-first (flamegraph.pl / speedscope input)
+    """
+    skip_thread = skip_thread if skip_thread is not None else threading.get_ident()
+    collapsed = collections.Counter()
+    self_counts = collections.Counter()
+    total_counts = collections.Counter()
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if not stack:
+                continue
+            samples += 1
+            stack.reverse()
+            collapsed[';'.join(stack)] += 1
+            self_counts[stack[-1]] += 1
+            for name in set(stack):
+                total_counts[name] += 1
+        time.sleep(interval)
+    top = [{'frame': name, 'self': count, 'total': total_counts[name]}
+           for name, count in self_counts.most_common(40)]
+    return {'samples': samples, 'seconds': seconds, 'intervalMs': interval * 1000,
+            'top': top, 'collapsed': dict(collapsed)}
+
+
+class RequestProfiler:
+    """cProfile over the next N requests, merged into one report.
+    One request is profiled at a time; requests overlapping it run unprofiled."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.remaining = 0
+        self._active = False
+        self._stats: Optional[pstats.Stats] = None
+        self.profiled = 0
+
+    def arm(self, requests: int):
+        with self._lock:
+            self.remaining = requests
+            self._stats = None
+            self.profiled = 0
+
+    def start(self) -> Optional[cProfile.Profile]:
+        with self._lock:
+            if self.remaining <= 0 or self._active:
+                return None
+            self.remaining -= 1
+            self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile: cProfile.Profile):
+        profile.disable()
+        with self._lock:
+            self._active = False
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.profiled += 1
+
+    def report(self, limit: int = 40, sort: str = 'cumulative') -> str:
+        with self._lock:
+            if self._stats is None:
+                return "No profiled requests yet"
+            out = io.StringIO()
+            self._stats.stream = out
+            self._stats.sort_stats(sort).print_stats(limit)
+            return f"{self.profiled} requests profiled, {self.remaining} still armed\n\n" + out.getvalue()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Query Plan Check - EXPLAIN QUERY PLAN regression suite for the API queries
+
+Builds a scratch database from schema.sql plus the derived schema, loads a
+large synthetic dataset, then for every SQL statement in api_server_flask.py,
+api_server.py and ghl_sync.py:
+  - asserts the plan uses the expected index and never full-scans business_visits
+  - asserts the median run time stays within its latency budget
+Any SQL literal in those files without a check below fails the run, so a new
+or edited query has to state its plan expectations here.
+
+Usage: python3 query_plan_check.py [rows]     (exit status 1 on any failure)
+"""
+
+import ast
+import os
+import random
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import db_schema
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCES = ('api_server_flask.py', 'api_server.py', 'ghl_sync.py')
+DEFAULT_ROWS = 50000
+RUNS = 7
+
+_SQL_START = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\s', re.IGNORECASE)
+_BARE_SCAN = re.compile(r'^SCAN (business_visits|sync_log)$')
+
+
+@dataclass
+class QueryCheck:
+    name: str
+    sql: str
+    params: tuple = ()
+    index: Optional[str] = None            # must appear in the plan
+    allow_sort: bool = True                # temp b-tree for ORDER BY acceptable
+    budget_ms: float = 10.0
+    write: bool = False                    # run inside a rolled-back transaction
+
+
+def normalize_sql(sql: str) -> str:
+    return ' '.join(sql.split())
+
+
+MAP_COLUMNS = """
+        SELECT id, business_name, contact_name, phone, email,
+               address, zip_code, lat, lng, visit_status,
+               visit_date, notes, ghl_contact_id, account_id_8498
+        FROM business_visits
+        WHERE lat IS NOT NULL AND lng IS NOT NULL
+        ORDER BY visit_date DESC
+"""
+
+REPORT_BASE = """
+        SELECT
+            id,
+            business_name,
+            contact_name,
+            phone,
+            email,
+            address,
+            city,
+            zip_code,
+            visit_status,
+            visit_date,
+            notes,
+            ghl_contact_id,
+            account_id_8498,
+            source,
+            created_at,
+            gatekeeper_first_name,
+            gatekeeper_last_name,
+            decision_maker_first_name,
+            decision_maker_last_name,
+            other_contacts,
+            mail_first_name,
+            mail_last_name
+        FROM business_visits
+        WHERE 1=1
+"""
+
+REPORT_FILTERS = {
+    'all': "",
+    'email_only': " AND email_norm IS NOT NULL AND phone_e164 IS NULL",
+    'phone_only': " AND phone_e164 IS NOT NULL AND email_norm IS NULL",
+    'both': " AND email_norm IS NOT NULL AND phone_e164 IS NOT NULL",
+    'missing_both': " AND email_norm IS NULL AND phone_e164 IS NULL",
+}
+
+CHECKS: List[QueryCheck] = [
+    # Map feed: partial index delivers geocoded rows already in date order
+    QueryCheck('visits.map', MAP_COLUMNS, index='idx_map_date', allow_sort=False, budget_ms=400),
+    QueryCheck('visits.map_all', """
+            SELECT * FROM business_visits
+            WHERE lat IS NOT NULL AND lng IS NOT NULL
+            ORDER BY visit_date DESC
+        """, index='idx_map_date', allow_sort=False, budget_ms=600),
+    QueryCheck('visits.by_zip', """
+        SELECT * FROM business_visits
+        WHERE zip_code = ?
+        ORDER BY visit_date DESC
+    """, ('98404',), index='idx_zip_date', allow_sort=False, budget_ms=60),
+    QueryCheck('visits.by_id', "SELECT * FROM business_visits WHERE id = ?", (25,),
+               index='INTEGER PRIMARY KEY', budget_ms=1),
+    QueryCheck('visits.deep_link',
+               "SELECT ghl_contact_id, ghl_location_id FROM business_visits WHERE id = ?", (25,),
+               index='INTEGER PRIMARY KEY', budget_ms=1),
+    QueryCheck('visits.pending_sync', "SELECT id FROM business_visits WHERE synced_to_ghl = 0",
+               index='idx_synced', budget_ms=40),
+
+    # Stats: counts and group-bys answered from covering indexes
+    QueryCheck('stats.total', "SELECT COUNT(*) as total FROM business_visits",
+               index='COVERING INDEX', budget_ms=15),
+    QueryCheck('stats.by_status', """
+        SELECT visit_status, COUNT(*) as count
+        FROM business_visits
+        GROUP BY visit_status
+    """, index='idx_status', allow_sort=False, budget_ms=30),
+    QueryCheck('stats.by_zip', """
+        SELECT zip_code, COUNT(*) as count
+        FROM business_visits
+        GROUP BY zip_code
+    """, index='idx_zip', allow_sort=False, budget_ms=30),
+    QueryCheck('reports.with_email', "SELECT COUNT(*) FROM business_visits WHERE email_norm IS NOT NULL",
+               index='idx_email_norm', budget_ms=15),
+    QueryCheck('reports.with_phone', "SELECT COUNT(*) FROM business_visits WHERE phone_e164 IS NOT NULL",
+               index='idx_phone_e164', budget_ms=15),
+    QueryCheck('reports.with_both', """
+        SELECT COUNT(*) FROM business_visits
+        WHERE email_norm IS NOT NULL AND phone_e164 IS NOT NULL
+    """, index='idx_email_norm', budget_ms=15),
+
+    # Writes
+    QueryCheck('sync_log.webhook', """
+        INSERT INTO sync_log (action, table_name, status, message)
+        VALUES (?, ?, ?, ?)
+    """, ('whatsapp_webhook', 'incoming', 'received', 'hello'), budget_ms=2, write=True),
+    QueryCheck('sync_log.success', """
+                    INSERT INTO sync_log (action, table_name, record_id, ghl_contact_id, status, message)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, ('create', 'business_visits', 25, 'abc', 'success', ''), budget_ms=2, write=True),
+    QueryCheck('sync_log.error', """
+                    INSERT INTO sync_log (action, table_name, record_id, status, message)
+                    VALUES (?, ?, ?, ?, ?)
+                """, ('create', 'business_visits', 25, 'error', 'HTTP 500'), budget_ms=2, write=True),
+    QueryCheck('visits.insert', """
+            INSERT INTO business_visits
+            (business_name, contact_name, phone, email, address, city, zip_code,
+             notes, visit_status, lat, lng, source, account_id_8498,
+             gatekeeper_first_name, gatekeeper_last_name,
+             decision_maker_first_name, decision_maker_last_name,
+             other_contacts, mail_first_name, mail_last_name)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                    ?, ?, ?, ?, ?, ?, ?)
+        """, ('Plan Check Cafe', 'Ann (owner)', '253-555-0100', 'a@b.com', '1 Main St', 'Tacoma',
+              '98404', 'note', 'interested', 47.25, -122.44, 'api', '', None, None, 'Ann', '', None,
+              'Ann', None),
+               budget_ms=5, write=True),
+    QueryCheck('visits.mark_synced', """
+                    UPDATE business_visits
+                    SET ghl_contact_id = ?, synced_to_ghl = 1, last_sync_error = NULL
+                    WHERE id = ?
+                """, ('plan-check', 25), index='INTEGER PRIMARY KEY', budget_ms=3, write=True),
+    QueryCheck('visits.sync_error', """
+                UPDATE business_visits SET last_sync_error = ? WHERE id = ?
+            """, ('boom', 25), index='INTEGER PRIMARY KEY', budget_ms=3, write=True),
+]
+
+# Contacts export: the base query is extended per filter at request time
+for _name, _clause in REPORT_FILTERS.items():
+    CHECKS.append(QueryCheck(
+        f'reports.contacts.{_name}', REPORT_BASE + _clause + " ORDER BY visit_date DESC",
+        index='idx_visit_date' if _name == 'all' else None,
+        allow_sort=_name != 'all',
+        budget_ms=800 if _name == 'all' else 400,
+    ))
+
+# Delta exports (?cursor= / ?since=) from a consumer that is up to date: a seek, read in index order
+CHECKS.append(QueryCheck('reports.contacts.cursor', REPORT_BASE + " AND change_seq > ? ORDER BY change_seq",
+                         (10 ** 9,), index='idx_change_seq', allow_sort=False, budget_ms=5))
+CHECKS.append(QueryCheck('reports.contacts.since', REPORT_BASE + " AND updated_at >= ? ORDER BY updated_at",
+                         ('2099-01-01',), index='idx_updated_at', allow_sort=False, budget_ms=5))
+
+# SQL literals that are only fragments of a checked statement
+COMPOSED = {normalize_sql(REPORT_BASE)}
+
+
+def source_statements() -> List[Tuple[str, int, str]]:
+    """(file, line, sql) for every SQL string literal in the API/sync sources"""
+    found = []
+    for filename in SOURCES:
+        with open(os.path.join(SCRIPT_DIR, filename)) as f:
+            tree = ast.parse(f.read(), filename)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and _SQL_START.match(node.value):
+                found.append((filename, node.lineno, node.value))
+    return found
+
+
+def build_database(path: str, rows: int):
+    """schema.sql + derived schema, filled with synthetic visits"""
+    conn = sqlite3.connect(path)
+    with open(os.path.join(SCRIPT_DIR, 'schema.sql')) as f:
+        conn.executescript(f.read())
+    db_schema.ensure_schema(conn)
+
+    rng = random.Random(8498)
+    zips = ['98404'] + [f"98{n:03d}" for n in rng.sample(range(1, 400), 39)]
+    statuses = ['interested', 'followup', 'not-interested', 'called', 'customer', 'initial_contact']
+    start = datetime(2025, 1, 1)
+    batch = []
+    for i in range(rows):
+        geocoded = rng.random() < 0.7
+        visit_date = start + timedelta(minutes=rng.randint(0, 60 * 24 * 600))
+        batch.append((
+            f"Business {i}", f"Person{i % 997} (owner)",
+            f"253-555-{i % 10000:04d}" if rng.random() < 0.6 else '',
+            f"owner{i}@example.com" if rng.random() < 0.35 else None,
+            f"{rng.randint(1, 9999)} Main St", 'Tacoma', rng.choice(zips),
+            47.1 + rng.random() * 0.4 if geocoded else None,
+            -122.6 + rng.random() * 0.4 if geocoded else None,
+            rng.choice(statuses), visit_date.strftime('%Y-%m-%d %H:%M:%S'),
+            'synthetic visit', 1 if rng.random() < 0.9 else 0,
+        ))
+    with conn:
+        conn.executemany("""
+            INSERT INTO business_visits
+            (business_name, contact_name, phone, email, address, city, zip_code,
+             lat, lng, visit_status, visit_date, notes, synced_to_ghl)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, batch)
+    return conn
+
+
+def run_check(conn: sqlite3.Connection, check: QueryCheck) -> List[str]:
+    """Return a list of failure messages (empty when the check passes)"""
+    failures = []
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {check.sql}", check.params)]
+
+    for step in plan:
+        if _BARE_SCAN.match(step):
+            failures.append(f"full table scan: {step}")
+    if check.index and not any(check.index in step for step in plan):
+        failures.append(f"expected {check.index} in plan")
+    if not check.allow_sort and any('TEMP B-TREE' in step for step in plan):
+        failures.append("sorts in a temp b-tree instead of reading index order")
+
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        if check.write:
+            conn.execute("SAVEPOINT plan_check")
+            conn.execute(check.sql, check.params)
+            conn.execute("ROLLBACK TO plan_check")
+            conn.execute("RELEASE plan_check")
+        else:
+            conn.execute(check.sql, check.params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(timings)
+    if median > check.budget_ms:
+        failures.append(f"median {median:.2f} ms over {check.budget_ms} ms budget")
+
+    status = 'FAIL' if failures else 'ok'
+    print(f"  {status:4}  {check.name:28} {median:8.2f} ms  | {' / '.join(plan) or '(no plan)'}")
+    return failures
+
+
+def main(rows: int) -> int:
+    failures = []
+
+    checked = {normalize_sql(check.sql) for check in CHECKS} | COMPOSED
+    for filename, line, sql in source_statements():
+        if normalize_sql(sql) not in checked:
+            failures.append(f"{filename}:{line} has no query plan check: {normalize_sql(sql)[:80]}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        conn = build_database(os.path.join(tmp, 'plan_check.db'), rows)
+        print(f"Loaded {rows:,} synthetic visits in {time.perf_counter() - started:.1f}s\n")
+
+        for check in CHECKS:
+            for failure in run_check(conn, check):
+                failures.append(f"{check.name}: {failure}")
+        conn.close()
+
+    print()
+    if failures:
+        print(f"{len(failures)} failure(s):")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print(f"All {len(CHECKS)} query checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS))
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Read Replica - per-process in-memory snapshot of comcast.db for hot reads
+The snapshot is copied with the SQLite online backup API and re-copied
+when PRAGMA data_version shows another connection committed (rate-limited),
+or when it gets older than max_age_seconds. Writes keep going to disk;
+readers share the snapshot connection and must not close it.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class ReadReplica:
+    def __init__(self, db_path: str,
+                 min_refresh_seconds: float = 1.0,
+                 max_age_seconds: float = 300.0,
+                 factory=sqlite3.Connection):
+        """
+        Args:
+            db_path: On-disk database to mirror
+            min_refresh_seconds: Copy at most this often, however busy the writers are
+            max_age_seconds: Re-copy at least this often even if data_version is unchanged
+            factory: Connection class for the snapshots (profiling.ProfiledConnection)
+        """
+        self.db_path = db_path
+        self.factory = factory
+        self.min_refresh_seconds = min_refresh_seconds
+        self.max_age_seconds = max_age_seconds
+
+        # Dedicated connection: data_version only moves for commits made elsewhere
+        self._disk = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[sqlite3.Connection] = None
+        self._version = None
+        self._loaded_at = 0.0
+        self.refreshes = 0
+        self.last_copy_ms = 0.0
+        self.refresh()
+
+    def _data_version(self) -> int:
+        return self._disk.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self):
+        """Copy the disk database into a fresh in-memory connection and swap it in"""
+        with self._lock:
+            started = time.perf_counter()
+            version = self._data_version()
+            snapshot = sqlite3.connect(':memory:', check_same_thread=False, factory=self.factory)
+            self._disk.backup(snapshot)
+            snapshot.row_factory = sqlite3.Row
+            # Old snapshot is left to in-flight readers and closed when they drop it
+            self._snapshot = snapshot
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+            self.last_copy_ms = (time.perf_counter() - started) * 1000
+
+    def connection(self) -> sqlite3.Connection:
+        """The current snapshot, refreshed first if the disk copy has moved on"""
+        age = time.monotonic() - self._loaded_at
+        if age >= self.min_refresh_seconds and not self._lock.locked():
+            if age >= self.max_age_seconds or self._data_version() != self._version:
+                self.refresh()
+        return self._snapshot
+
+    def stats(self) -> Dict:
+        return {
+            'dataVersion': self._version,
+            'ageSeconds': round(time.monotonic() - self._loaded_at, 3),
+            'refreshes': self.refreshes,
+            'lastCopyMs': round(self.last_copy_ms, 2),
+        }
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Report Jobs - CSV exports built in the background and cached as files
+A request submits a (report, params) job stamped with the current data
+version. If that job already exists, its finished file is reused, so
+repeated clicks on the same filter cost one lookup. Otherwise a worker
+thread claims the job, writes the artifact to disk, and marks it done.
+The reports page polls the job and then downloads the file.
+
+Jobs live in comcast.db, so any gunicorn worker can answer a poll for a
+job that another worker is building. The data version is a counter that
+triggers bump on every change to business_visits, so it is stable
+across connections and restarts, unlike PRAGMA data_version.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Dict, IO, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_data_version_insert
+AFTER INSERT ON business_visits
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_data_version_update
+AFTER UPDATE ON business_visits
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_data_version_delete
+AFTER DELETE ON business_visits
+BEGIN
+    UPDATE data_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id INTEGER PRIMARY KEY,
+    report TEXT NOT NULL,                  -- contacts, ...
+    params TEXT NOT NULL,                  -- canonical JSON, e.g. {"filter":"both"}
+    data_version INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done, failed
+    artifact TEXT,                         -- file name in the artifact directory
+    rows INTEGER,
+    bytes INTEGER,
+    error TEXT,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    UNIQUE (report, params, data_version)
+);
+
+CREATE INDEX IF NOT EXISTS idx_report_jobs_queued ON report_jobs(created_at)
+    WHERE status = 'queued';
+"""
+
+STALE_RUNNING_SECONDS = 600                # a job running this long lost its worker
+POLL_SECONDS = 1.0
+
+# builder(conn, params, out) writes the artifact to the text stream `out` and returns its row count
+Builder = Callable[[sqlite3.Connection, Dict, IO[str]], int]
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    conn.executescript(SCHEMA)
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """Counter bumped by every insert, update and delete on business_visits"""
+    return conn.execute("SELECT version FROM data_version WHERE id = 1").fetchone()[0]
+
+
+def default_artifact_dir(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'report_artifacts')
+
+
+def _job_dict(row) -> Dict:
+    job_id, report, params, version, status, artifact, rows, size, error, created, started, finished = row
+    return {
+        'jobId': job_id,
+        'report': report,
+        'params': json.loads(params),
+        'dataVersion': version,
+        'status': status,
+        'artifact': artifact,
+        'rows': rows,
+        'bytes': size,
+        'error': error,
+        'createdAt': created,
+        'seconds': round(finished - started, 3) if finished and started else None,
+    }
+
+
+class ReportJobs:
+    def __init__(self, db_path: str, artifact_dir: str, builders: Dict[str, Builder], threads: int = 1):
+        self.db_path = db_path
+        self.artifact_dir = artifact_dir
+        self.builders = builders
+        self.threads = threads
+        self._wakeup = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+        os.makedirs(artifact_dir, exist_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _start_workers(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for n in range(self.threads):
+            threading.Thread(target=self._run, args=(f"{prefix}:{n}",), daemon=True,
+                             name=f"report-{n}").start()
+
+    def submit(self, report: str, params: Dict) -> Dict:
+        """Job for (report, params) at the current data version - existing, or newly queued"""
+        if report not in self.builders:
+            raise ValueError(f"unknown report {report!r}")
+        canonical = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        conn = self._connect()
+        try:
+            version = data_version(conn)
+            conn.execute("""
+                INSERT OR IGNORE INTO report_jobs (report, params, data_version, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (report, canonical, version, time.time()))
+            # Failed jobs, and jobs whose worker died mid-build, go back in the queue
+            requeued = conn.execute("""
+                UPDATE report_jobs SET status = 'queued', error = NULL, worker = NULL
+                WHERE report = ? AND params = ? AND data_version = ?
+                  AND (status = 'failed' OR (status = 'running' AND started_at < ?))
+            """, (report, canonical, version, time.time() - STALE_RUNNING_SECONDS)).rowcount
+            job = self._get(conn, report=report, params=canonical, version=version)
+        finally:
+            conn.close()
+        if job['status'] == 'done' and not os.path.exists(self.path(job)):
+            return self._rebuild(job)
+        if job['status'] == 'queued' or requeued:
+            self._start_workers()
+            self._wakeup.set()
+        return job
+
+    def _rebuild(self, job: Dict) -> Dict:
+        """The artifact file went missing (new container, manual cleanup) - queue it again"""
+        conn = self._connect()
+        try:
+            conn.execute("UPDATE report_jobs SET status = 'queued', artifact = NULL WHERE id = ?", (job['jobId'],))
+            job = self._get(conn, job_id=job['jobId'])
+        finally:
+            conn.close()
+        self._start_workers()
+        self._wakeup.set()
+        return job
+
+    def _get(self, conn, job_id=None, report=None, params=None, version=None) -> Optional[Dict]:
+        columns = """id, report, params, data_version, status, artifact, rows, bytes, error,
+                     created_at, started_at, finished_at"""
+        if job_id is not None:
+            row = conn.execute(f"SELECT {columns} FROM report_jobs WHERE id = ?", (job_id,)).fetchone()
+        else:
+            row = conn.execute(f"""
+                SELECT {columns} FROM report_jobs WHERE report = ? AND params = ? AND data_version = ?
+            """, (report, params, version)).fetchone()
+        return _job_dict(tuple(row)) if row else None
+
+    def get(self, job_id: int) -> Optional[Dict]:
+        conn = self._connect()
+        try:
+            return self._get(conn, job_id=job_id)
+        finally:
+            conn.close()
+
+    def path(self, job: Dict) -> str:
+        return os.path.join(self.artifact_dir, job['artifact'] or '')
+
+    def wait(self, job: Dict, timeout: float = 5.0) -> Dict:
+        """Block until the job is finished (for callers that must answer synchronously)"""
+        deadline = time.monotonic() + timeout
+        while job['status'] in ('queued', 'running') and time.monotonic() < deadline:
+            time.sleep(0.05)
+            job = self.get(job['jobId'])
+        return job
+
+    def _claim(self, conn, worker: str) -> Optional[Dict]:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("""
+                SELECT id FROM report_jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1
+            """).fetchone()
+            if row is not None:
+                conn.execute("""
+                    UPDATE report_jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?
+                """, (worker, time.time(), row[0]))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self._get(conn, job_id=row[0]) if row else None
+
+    def _build(self, conn, job: Dict):
+        slug = '-'.join(str(v) for _, v in sorted(job['params'].items())) or 'all'
+        artifact = f"{job['report']}-{slug}-v{job['dataVersion']}-{job['jobId']}.csv"
+        final_path = os.path.join(self.artifact_dir, artifact)
+        tmp_path = final_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as out:
+                rows = self.builders[job['report']](conn, job['params'], out)
+            os.replace(tmp_path, final_path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            conn.execute("""
+                UPDATE report_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?
+            """, (f"{type(e).__name__}: {e}"[:500], time.time(), job['jobId']))
+            return
+        conn.execute("""
+            UPDATE report_jobs SET status = 'done', artifact = ?, rows = ?, bytes = ?, finished_at = ?
+            WHERE id = ?
+        """, (artifact, rows, os.path.getsize(final_path), time.time(), job['jobId']))
+        self._drop_superseded(conn, job)
+
+    def _drop_superseded(self, conn, job: Dict):
+        """Artifacts of the same report/params at older data versions will never be served again"""
+        old = conn.execute("""
+            SELECT id, artifact FROM report_jobs
+            WHERE report = ? AND params = ? AND data_version < ? AND status != 'running'
+        """, (job['report'], json.dumps(job['params'], sort_keys=True, separators=(',', ':')),
+              job['dataVersion'])).fetchall()
+        for job_id, artifact in old:
+            if artifact and os.path.exists(os.path.join(self.artifact_dir, artifact)):
+                os.remove(os.path.join(self.artifact_dir, artifact))
+        conn.executemany("DELETE FROM report_jobs WHERE id = ?", [(job_id,) for job_id, _ in old])
+
+    def _run(self, worker: str):
+        conn = self._connect()
+        while True:
+            try:
+                job = self._claim(conn, worker)
+            except sqlite3.Error as e:
+                print(f"[reports] {worker}: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+            try:
+                self._build(conn, job)
+            except Exception as e:
+                # Keep the worker alive; the job fails and can be resubmitted
+                print(f"[reports] {worker}: job {job['jobId']}: {e}")
+                try:
+                    conn.execute("""
+                        UPDATE report_jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?
+                    """, (f"{type(e).__name__}: {e}"[:500], time.time(), job['jobId']))
+                except sqlite3.Error:
+                    pass  # submit() requeues it once STALE_RUNNING_SECONDS have passed
+
+    def stats(self) -> Dict:
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM report_jobs GROUP BY status").fetchall())
+        finally:
+            conn.close()
+        return {'jobs': counts, 'workersStarted': self._started}
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    ensure_schema(conn)
+    print(f"data_version: {data_version(conn)}")
+    for row in conn.execute("""
+        SELECT id, report, params, data_version, status, rows, bytes FROM report_jobs ORDER BY id DESC LIMIT ?
+    """, (int(sys.argv[1]) if len(sys.argv) > 1 else 20,)):
+        print(*row)
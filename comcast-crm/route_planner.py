@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Route Planner - daily door-to-door route over open prospects and follow-ups
+Picks candidate stops around a start point (via the R*Tree), builds a
+vectorized travel-time matrix, then:
+  1. nearest-neighbour construction within the time budget
+  2. 2-opt to remove crossings
+  3. cheapest insertion of leftover candidates into freed-up time
+  4. a final 2-opt pass
+"""
+
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from geo_index import nearest_visits, EARTH_RADIUS_KM, KM_PER_MILE
+
+# Straight-line to street distance fudge factor for in-town driving
+DETOUR_FACTOR = 1.3
+
+
+@dataclass
+class RouteOptions:
+    """Planning knobs (minutes / km/h)"""
+    budget_minutes: float = 240.0
+    service_minutes: float = 15.0          # time spent at each door
+    speed_kmh: float = 40.0
+    return_to_start: bool = False
+    max_candidates: int = 500
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def distance_matrix_km(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """All-pairs haversine distance (km), computed with broadcasting"""
+    phi = np.radians(lats)
+    lam = np.radians(lngs)
+    dphi = phi[:, None] - phi[None, :]
+    dlam = lam[:, None] - lam[None, :]
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _route_minutes(route: List[int], minutes: np.ndarray, service: float) -> float:
+    """Travel plus service time for a route [start, stops..., end]"""
+    idx = np.asarray(route)
+    return float(minutes[idx[:-1], idx[1:]].sum()) + service * (len(route) - 2)
+
+
+def _nearest_neighbour(minutes: np.ndarray, end: int, budget: float, service: float) -> List[int]:
+    """Greedy: from the current node go to the closest stop that still lets us reach `end` in budget"""
+    n_stops = end - 1
+    unused = np.ones(end + 1, dtype=bool)
+    unused[0] = unused[end] = False
+    route = [0]
+    used_minutes = 0.0
+    current = 0
+    for _ in range(n_stops):
+        cost = minutes[current] + service
+        feasible = unused & (used_minutes + cost + minutes[:, end] <= budget)
+        if not feasible.any():
+            break
+        nxt = int(np.argmin(np.where(feasible, cost, np.inf)))
+        used_minutes += cost[nxt]
+        unused[nxt] = False
+        route.append(nxt)
+        current = nxt
+    route.append(end)
+    return route
+
+
+def _two_opt(route: List[int], minutes: np.ndarray, max_passes: int = 50) -> List[int]:
+    """
+    2-opt with fixed endpoints. For each i, the gain of reversing route[i..j]
+    is evaluated for every j at once.
+    """
+    route = np.asarray(route)
+    n = len(route)
+    if n < 5:
+        return route.tolist()
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 2):
+            a, b = route[i - 1], route[i]
+            cs = route[i + 1:n - 1]          # candidate segment ends (j = i+1 .. n-2)
+            es = route[i + 2:n]              # node after each segment end
+            delta = (minutes[a, cs] + minutes[b, es]) - (minutes[a, b] + minutes[cs, es])
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = i + 1 + k
+                route[i:j + 1] = route[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return route.tolist()
+
+
+def _insert_leftovers(route: List[int], minutes: np.ndarray, budget: float, service: float) -> List[int]:
+    """Cheapest insertion of unrouted stops while the budget allows"""
+    end = len(minutes) - 1
+    in_route = np.zeros(end + 1, dtype=bool)
+    in_route[route] = True
+    used = _route_minutes(route, minutes, service)
+    while True:
+        left = np.flatnonzero(~in_route)
+        if not len(left):
+            break
+        prev = np.asarray(route[:-1])
+        nxt = np.asarray(route[1:])
+        # extra[c, p] = cost of putting stop c between route[p] and route[p+1]
+        extra = minutes[prev[None, :], left[:, None]] + minutes[left[:, None], nxt[None, :]] \
+            - minutes[prev, nxt][None, :] + service
+        flat = int(np.argmin(extra))
+        c, p = divmod(flat, extra.shape[1])
+        if used + extra[c, p] > budget:
+            break
+        used += extra[c, p]
+        route.insert(p + 1, int(left[c]))
+        in_route[left[c]] = True
+    return route
+
+
+def plan_route(conn: sqlite3.Connection, start_lat: float, start_lng: float,
+               options: Optional[RouteOptions] = None,
+               statuses: Optional[Iterable[str]] = None) -> Dict:
+    """
+    Plan an ordered list of stops that fits in the time budget.
+
+    Args:
+        conn: Open connection
+        start_lat, start_lng: Where the day starts
+        options: RouteOptions (budget, service time, speed, ...)
+        statuses: visit_status values to include; None means all open statuses
+
+    Returns:
+        Dict with ordered stops (arrival minute, leg distance) and totals
+    """
+    options = options or RouteOptions()
+    started = time.perf_counter()
+
+    # Nothing beyond the budget's driving radius (half of it on a round trip) is reachable
+    reach_km = options.speed_kmh * options.budget_minutes / 60.0 / DETOUR_FACTOR
+    if options.return_to_start:
+        reach_km /= 2
+    candidates = nearest_visits(conn, start_lat, start_lng, k=options.max_candidates,
+                                statuses=statuses, max_km=max(reach_km, 0.1))
+
+    lats = np.array([start_lat] + [c['lat'] for c in candidates] + [start_lat], dtype=float)
+    lngs = np.array([start_lng] + [c['lng'] for c in candidates] + [start_lng], dtype=float)
+    km = distance_matrix_km(lats, lngs)
+    minutes = km * DETOUR_FACTOR / options.speed_kmh * 60.0
+
+    end = len(candidates) + 1
+    if not options.return_to_start:
+        # Open route: the virtual end node is free to reach from anywhere
+        minutes[:, end] = 0.0
+        minutes[end, :] = 0.0
+
+    budget, service = options.budget_minutes, options.service_minutes
+    route = _nearest_neighbour(minutes, end, budget, service)
+    route = _two_opt(route, minutes)
+    route = _insert_leftovers(route, minutes, budget, service)
+    route = _two_opt(route, minutes)
+
+    stops = []
+    clock = 0.0
+    total_km = 0.0
+    for prev, node in zip(route[:-2], route[1:-1]):
+        leg_km = float(km[prev, node]) * DETOUR_FACTOR
+        clock += float(minutes[prev, node])
+        total_km += leg_km
+        stop = dict(candidates[node - 1])
+        stop.pop('distanceKm', None)
+        stop.pop('distanceMi', None)
+        stop['order'] = len(stops) + 1
+        stop['arrivalMinute'] = round(clock, 1)
+        stop['legMi'] = round(leg_km / KM_PER_MILE, 2)
+        stops.append(stop)
+        clock += service
+    if options.return_to_start and stops:
+        leg_km = float(km[route[-2], 0]) * DETOUR_FACTOR
+        clock += float(minutes[route[-2], 0])
+        total_km += leg_km
+
+    return {
+        'start': {'lat': start_lat, 'lng': start_lng},
+        'options': options.to_dict(),
+        'stops': stops,
+        'count': len(stops),
+        'candidates': len(candidates),
+        'totalMinutes': round(clock, 1),
+        'totalMi': round(total_km / KM_PER_MILE, 2),
+        'solveMs': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    if len(sys.argv) < 3:
+        print("Usage: python3 route_planner.py <lat> <lng> [budget_minutes]")
+        sys.exit(1)
+
+    conn = sqlite3.connect(DB_PATH)
+    opts = RouteOptions(budget_minutes=float(sys.argv[3]) if len(sys.argv) > 3 else 240.0)
+    plan = plan_route(conn, float(sys.argv[1]), float(sys.argv[2]), opts)
+    for stop in plan['stops']:
+        print(f"{stop['order']:3}. +{stop['arrivalMinute']:6.1f} min  {stop['businessName']} "
+              f"({stop['address'] or stop['zip']}) [{stop['status']}]")
+    print(f"\n{plan['count']} stops of {plan['candidates']} candidates, "
+          f"{plan['totalMi']} mi, {plan['totalMinutes']} min, solved in {plan['solveMs']} ms")
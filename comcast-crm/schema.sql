@@ -40,6 +40,10 @@ CREATE TABLE IF NOT EXISTS business_visits (
     
     -- Metadata
     source TEXT DEFAULT 'whatsapp',        -- whatsapp, manual, import
+    account_id_8498 TEXT,                  -- Comcast 8498 account number
+    install_date TEXT,
+    mrc_amount TEXT,
+    visit_context TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     synced_to_ghl BOOLEAN DEFAULT 0,
@@ -80,3 +84,8 @@ INSERT OR IGNORE INTO ghl_field_mapping VALUES
     ('contact_name', 'contact_name', 'text'),
     ('lat', 'latitude', 'number'),
     ('lng', 'longitude', 'number');
+
+-- Everything derived from these tables (normalized/mail-name/change columns,
+-- search and spatial indexes, rollups, triggers, job and cache tables) is
+-- owned by its feature module and created by db_schema.ensure_schema():
+--   sqlite3 comcast.db < schema.sql && python3 db_schema.py
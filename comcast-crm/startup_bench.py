@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark - time from process start to the first 200 on /health
+Measures, per server mode, a fresh interpreter's import of api_server_flask
+and the wall time until a spawned server answers /health. Each run uses a
+throwaway copy of the database.
+
+  python3 startup_bench.py [--runs 5] [--db comcast.db]
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from config import BASE_DIR, DB_PATH
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def import_seconds(env) -> float:
+    """Fresh interpreter: time to import the Flask app module"""
+    code = "import time; t = time.perf_counter(); import api_server_flask; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def first_health_seconds(command, env, timeout: float = 60.0) -> float:
+    """Spawn a server and poll /health until it answers"""
+    port = _free_port()
+    env = dict(env, PORT=str(port))
+    command = [part.replace('{port}', str(port)) for part in command]
+    started = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=BASE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited with {proc.returncode}: {' '.join(command)}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError(f"no /health answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Cold start to first /health")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--db", default=DB_PATH)
+    args = arg_parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='startup-bench-')
+    db_copy = os.path.join(workdir, 'comcast.db')
+    shutil.copy(args.db, db_copy)
+    env = dict(os.environ, COMCAST_DB_PATH=db_copy, COMCAST_INGEST_DB=os.path.join(workdir, 'ingest.db'))
+
+    modes = {'flask dev server': [sys.executable, 'api_server_flask.py']}
+    try:
+        import gunicorn  # noqa: F401
+        bind = '127.0.0.1:{port}'
+        modes['gunicorn'] = [sys.executable, '-m', 'gunicorn', 'api_server_flask:app', '--bind', bind]
+        modes['gunicorn --preload (Procfile)'] = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                                  'api_server_flask:app', '--bind', bind]
+    except ImportError:
+        print("(gunicorn not installed - measuring the Flask dev server only)")
+
+    try:
+        imports = [import_seconds(env) for _ in range(args.runs)]
+        print(f"import api_server_flask: median {statistics.median(imports) * 1000:.0f} ms "
+              f"(min {min(imports) * 1000:.0f} ms)")
+        for name, command in modes.items():
+            runs = [first_health_seconds(command, env) for _ in range(args.runs)]
+            print(f"{name}: first /health after median {statistics.median(runs) * 1000:.0f} ms "
+                  f"(min {min(runs) * 1000:.0f} ms, max {max(runs) * 1000:.0f} ms)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
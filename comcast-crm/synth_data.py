@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Synthetic Territory Data - realistic fake visits for load and query testing
+Zips and centroids come from VERIFIED_ZIP_CODES.js, with coordinates
+scattered around each centroid. Names, contact strings (including role
+annotations and multi-person strings), phone formats and statuses mimic
+the real table. Rows go through GHLComcastSync.add_visits, the same write
+path as the API, so people_index, FTS, the R*Tree, rollups and the
+contact keys all fill as they do in production. Output is deterministic
+for a given --seed.
+
+By default it writes to synthetic.db, next to the real database, which is
+used as a starting copy. Point a server at the result with
+COMCAST_DB_PATH=.../synthetic.db.
+
+  python3 synth_data.py --rows 100000 [--db synthetic.db] [--seed 1]
+"""
+
+import argparse
+import math
+import os
+import random
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from config import BASE_DIR, DB_PATH
+
+ZIP_FILE = os.path.join(os.path.dirname(BASE_DIR), 'VERIFIED_ZIP_CODES.js')
+_ZIP_ENTRY = re.compile(r"zip:\s*'(\d{5})',\s*city:\s*'([^']*)',\s*lat:\s*(-?[\d.]+),\s*lng:\s*(-?[\d.]+)")
+
+FIRST_NAMES = ['James', 'Maria', 'David', 'Sarah', 'Michael', 'Jennifer', 'Tran', 'Nguyen', 'Erin', 'Aly',
+               'Chris', 'Jessica', 'Daniel', 'Ashley', 'Kevin', 'Lexus', 'Sydney', 'Adam', 'Priya', 'Omar',
+               'Linda', 'Robert', 'Kim', 'Jose', 'Mei', 'Tyler', 'Brianna', 'Hector', 'Fatima', 'Sam']
+LAST_NAMES = ['Smith', 'Nguyen', 'Johnson', 'Garcia', 'Brown', 'Lee', 'Martinez', 'Kim', 'Patel', 'Norwest',
+              'Toan', 'Wilson', 'Anderson', 'Thomas', 'Lopez', 'Park', 'Hernandez', 'Clark', 'Young', 'Singh']
+BUSINESS_WORDS = ['Grit City', 'Rainier', 'Puget', 'Evergreen', 'Summit', 'Harbor', 'Cascade', 'Tahoma',
+                  'Pearl Street', 'Lakeside', 'Old Town', 'Northwest', 'Golden', 'Blue Heron', 'Souper',
+                  'Plateau', 'Foothills', 'Narrows', 'Proctor', 'Stadium']
+BUSINESS_TYPES = ['Dental', 'Auto Repair', 'Coffee', 'Pho', 'Barbershop', 'Nail Salon', 'Law Office',
+                  'Insurance', 'Pizza', 'Brewing Co', 'Chiropractic', 'Tax Services', 'Veterinary Clinic',
+                  'Hardware', 'Bakery', 'Fitness', 'Realty', 'Tattoo', 'Daycare', 'Florist']
+BUSINESS_SUFFIXES = ['', '', '', ' LLC', ' & Co', ' Inc', ' Bar & Grill']
+STREETS = ['Pacific Ave', 'N Pearl St', '6th Ave', 'State Highway 410', 'Vashon Hwy SW', 'Meridian Ave E',
+           'S 38th St', 'Mountain Hwy E', 'Main St', 'Canyon Rd E', 'N 26th St', 'Ruston Way']
+ROLES = ['DM', 'Owner', 'Gatekeeper', 'Manager', 'decision-maker', 'Office Manager']
+STATUSES = [('interested', 50), ('followup', 10), ('customer', 9), ('initial_contact', 7), ('follow-up', 4),
+            ('not-interested', 3), ('existing_customer', 2), ('return-visit-needed', 2), ('partner', 2),
+            ('called', 1)]
+SOURCES = [('whatsapp', 45), ('GHL Sync', 20), ('csv-import', 12), ('manual', 6),
+           ('business-card-capture', 6), ('field_visit', 3), ('referral', 2)]
+NOTES = [
+    "Stopped by, DM not in today. Will follow up later.",
+    "Visited. Fiber prospect.",
+    "Currently has Comcast - account review opportunity.",
+    "Recently switched to {competitor}. Possible win-back depending on contract status.",
+    "Corporate-managed location. Store manager confirmed corporate handles all decisions.",
+    "Critical need: high-speed internet, whole business runs off it.",
+    "Overpaying for {competitor}. Wants a quote.",
+    "",
+]
+COMPETITORS = ['AT&T', 'CenturyLink', 'T-Mobile', 'Ziply', 'Starlink']
+MISSING_COORDS = 0.05                      # share of rows without lat/lng (kept off the map)
+JITTER_KM = 1.5                            # std dev of the scatter around each zip centroid
+
+
+def load_zips(path: str = ZIP_FILE) -> List[Dict]:
+    """Territory zips and centroids from VERIFIED_ZIP_CODES.js"""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    zips = [{'zip': z, 'city': re.sub(r'\s*\(.*\)', '', city), 'lat': float(lat), 'lng': float(lng)}
+            for z, city, lat, lng in _ZIP_ENTRY.findall(source)]
+    if not zips:
+        raise ValueError(f"no zip entries found in {path}")
+    return zips
+
+
+def _weighted(rng: random.Random, choices):
+    return rng.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+
+def _person(rng: random.Random, full: bool) -> str:
+    first = rng.choice(FIRST_NAMES)
+    return f"{first} {rng.choice(LAST_NAMES)}" if full else first
+
+
+def _contact_name(rng: random.Random) -> str:
+    shape = rng.random()
+    if shape < 0.35:
+        return _person(rng, full=True)
+    if shape < 0.55:
+        return _person(rng, full=False)
+    if shape < 0.75:
+        return f"{_person(rng, rng.random() < 0.5)} ({rng.choice(ROLES)})"
+    if shape < 0.88:
+        return f"{_person(rng, False)} (DM) / {_person(rng, False)} (Gatekeeper)"
+    if shape < 0.93:
+        return f"Dr. {_person(rng, full=True)}"
+    if shape < 0.97:
+        return "Store Manager (corporate-managed)"
+    return ""
+
+
+def _phone(rng: random.Random) -> str:
+    area = rng.choice(['253', '253', '253', '206', '360'])
+    line, last4 = rng.randint(200, 999), rng.randint(0, 9999)
+    return rng.choice([f"{area}{line}{last4:04d}", f"{area}-{line}-{last4:04d}",
+                       f"({area}) {line}-{last4:04d}", "", None])
+
+
+def fake_visit(rng: random.Random, zips: List[Dict]) -> Dict:
+    """One visit as GHLComcastSync.add_visit keyword arguments"""
+    territory = rng.choice(zips)
+    business = f"{rng.choice(BUSINESS_WORDS)} {rng.choice(BUSINESS_TYPES)}{rng.choice(BUSINESS_SUFFIXES)}"
+    contact = _contact_name(rng)
+    domain = re.sub(r'[^a-z]', '', business.lower())[:18] + rng.choice(['.com', '.net', '.org'])
+    email = None
+    if rng.random() < 0.55:
+        local = contact.split()[0].lower().strip('.') if contact and not contact.startswith('Store') else 'info'
+        email = f"{local}@{rng.choice([domain, 'gmail.com', 'aol.com'])}"
+    lat = lng = None
+    if rng.random() >= MISSING_COORDS:
+        lat = territory['lat'] + rng.gauss(0, JITTER_KM / 111.0)
+        lng = territory['lng'] + rng.gauss(0, JITTER_KM / (111.0 * math.cos(math.radians(territory['lat']))))
+    status = _weighted(rng, STATUSES)
+    return {
+        'business_name': business,
+        'zip_code': territory['zip'],
+        'contact_name': contact,
+        'phone': _phone(rng),
+        'email': email,
+        'address': f"{rng.randint(100, 39999)} {rng.choice(STREETS)}",
+        'city': territory['city'],
+        'notes': rng.choice(NOTES).format(competitor=rng.choice(COMPETITORS)),
+        'status': status,
+        'lat': round(lat, 6) if lat is not None else None,
+        'lng': round(lng, 6) if lng is not None else None,
+        'source': _weighted(rng, SOURCES),
+        'account_id_8498': f"8498{rng.randint(0, 10 ** 12 - 1):012d}" if 'customer' in status else '',
+    }
+
+
+def generate(db_path: str, rows: int, seed: int = 1, batch: int = 5000, days: int = 730) -> float:
+    """Append `rows` synthetic visits to db_path; returns seconds taken"""
+    from ghl_sync import GHLComcastSync
+    import db_schema
+
+    rng = random.Random(seed)
+    zips = load_zips()
+    sync = GHLComcastSync(db_path)
+    db_schema.ensure_schema(sync.conn)
+    now = datetime.now()
+    started = time.perf_counter()
+    done = 0
+    while done < rows:
+        visits = [fake_visit(rng, zips) for _ in range(min(batch, rows - done))]
+        visit_ids = sync.add_visits(visits, sync=False)
+        # Spread visit dates over the last `days` days (the rollup trigger follows the update)
+        dates = [((now - timedelta(seconds=rng.uniform(0, days * 86400))).strftime('%Y-%m-%d %H:%M:%S'),
+                  visit_id) for visit_id in visit_ids]
+        with sync.conn:
+            sync.conn.executemany("UPDATE business_visits SET visit_date = ?1, created_at = ?1 WHERE id = ?2",
+                                  dates)
+        done += len(visits)
+        elapsed = time.perf_counter() - started
+        print(f"  {done:>9,} / {rows:,} rows  ({done / elapsed:,.0f} rows/s)", end='\r', flush=True)
+    print()
+    sync.conn.execute("ANALYZE")
+    sync.conn.close()
+    return time.perf_counter() - started
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Fill a database with synthetic territory visits")
+    arg_parser.add_argument("--rows", type=int, default=10000, help="visits to add (10k-1M is the useful range)")
+    arg_parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), 'synthetic.db'))
+    arg_parser.add_argument("--base", default=DB_PATH, help="database copied as the starting point when --db is new")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--batch", type=int, default=5000, help="visits per transaction")
+    arg_parser.add_argument("--days", type=int, default=730, help="spread visit dates over this many days")
+    args = arg_parser.parse_args()
+
+    if not os.path.exists(args.db):
+        shutil.copy(args.base, args.db)
+    print(f"Adding {args.rows:,} synthetic visits to {args.db}")
+    seconds = generate(args.db, args.rows, args.seed, args.batch, args.days)
+    total = sqlite3.connect(args.db).execute("SELECT COUNT(*) FROM business_visits").fetchone()[0]
+    print(f"Done in {seconds:.1f}s - {total:,} visits in {args.db} ({os.path.getsize(args.db) / 1e6:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Visit Rollups - pre-aggregated visit counts per day / week x zip x status
+Triggers on business_visits keep both rollup tables current, so trend
+queries read a few hundred aggregate rows instead of every visit.
+A visit is bucketed by visit_date, else created_at. When neither is a
+date it goes to the '' period. The bucket must never depend on the clock:
+the delete trigger has to find the same row the insert trigger counted.
+"""
+
+import sqlite3
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# granularity -> (table, period column, SQL expression of a date into its bucket)
+GRANULARITIES = {
+    'day': ('visit_rollup_daily', 'day', "date({d})"),
+    'week': ('visit_rollup_weekly', 'week_start', "date({d}, 'weekday 0', '-6 days')"),  # Monday
+}
+
+DIMENSIONS = ('zip', 'status')
+_DIM_COLUMNS = {'zip': 'zip_code', 'status': 'visit_status'}
+
+
+def bucket_sql(granularity: str, row: str = '') -> str:
+    """Period of a visit (row is 'NEW.' / 'OLD.' inside triggers); '' when it has no usable date"""
+    when = f"COALESCE({row}visit_date, {row}created_at)"
+    return f"COALESCE({GRANULARITIES[granularity][2].format(d=when)}, '')"
+
+
+def _bucket(granularity: str, row: str) -> str:
+    return bucket_sql(granularity, f"{row}.")
+
+
+def _schema() -> Tuple[str, Dict[str, str]]:
+    """(table DDL, trigger name -> CREATE TRIGGER statement as sqlite_master stores it)"""
+    ddl = []
+    bump = []
+    drop = []
+    for granularity, (table, period, _) in GRANULARITIES.items():
+        ddl.append(f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    {period} TEXT NOT NULL,
+    zip_code TEXT NOT NULL,
+    visit_status TEXT NOT NULL,            -- '' when the visit has no status
+    visits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY ({period}, zip_code, visit_status)
+) WITHOUT ROWID;""")
+        bump.append(f"""
+    INSERT INTO {table} ({period}, zip_code, visit_status, visits)
+    VALUES ({_bucket(granularity, 'NEW')}, COALESCE(NEW.zip_code, ''), COALESCE(NEW.visit_status, ''), 1)
+    ON CONFLICT ({period}, zip_code, visit_status) DO UPDATE SET visits = visits + 1;""")
+        drop.append(f"""
+    UPDATE {table} SET visits = visits - 1
+    WHERE {period} = {_bucket(granularity, 'OLD')}
+      AND zip_code = COALESCE(OLD.zip_code, '')
+      AND visit_status = COALESCE(OLD.visit_status, '');
+    DELETE FROM {table}
+    WHERE {period} = {_bucket(granularity, 'OLD')}
+      AND zip_code = COALESCE(OLD.zip_code, '')
+      AND visit_status = COALESCE(OLD.visit_status, '')
+      AND visits <= 0;""")
+
+    triggers = {
+        'trg_rollup_insert': f"""CREATE TRIGGER trg_rollup_insert
+AFTER INSERT ON business_visits
+BEGIN{''.join(bump)}
+END""",
+        'trg_rollup_delete': f"""CREATE TRIGGER trg_rollup_delete
+AFTER DELETE ON business_visits
+BEGIN{''.join(drop)}
+END""",
+        'trg_rollup_update': f"""CREATE TRIGGER trg_rollup_update
+AFTER UPDATE OF visit_date, created_at, zip_code, visit_status ON business_visits
+BEGIN{''.join(drop)}{''.join(bump)}
+END""",
+    }
+    return '\n'.join(ddl), triggers
+
+
+_TABLES, TRIGGERS = _schema()
+SCHEMA = _TABLES + '\n' + ''.join(
+    '\n' + sql.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1) + ';\n' for sql in TRIGGERS.values())
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """
+    Create rollup tables and triggers. Newly created tables are filled from
+    business_visits; triggers from an older bucketing rule are replaced and
+    the rollups rebuilt, since their counts were kept under that rule.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visit_rollup_daily'"
+    ).fetchone()
+    stored = dict(conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_rollup_%'").fetchall())
+    outdated = [name for name, sql in TRIGGERS.items() if stored.get(name, sql) != sql]
+    if outdated:
+        with conn:
+            for name in TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.executescript(SCHEMA)
+    if not exists or outdated:
+        rebuild(conn)
+
+
+def rebuild(conn: sqlite3.Connection):
+    """Recompute every rollup from business_visits in one transaction"""
+    with conn:
+        for granularity, (table, period, _) in GRANULARITIES.items():
+            bucket = bucket_sql(granularity)
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"""
+                INSERT INTO {table} ({period}, zip_code, visit_status, visits)
+                SELECT {bucket}, COALESCE(zip_code, ''), COALESCE(visit_status, ''), COUNT(*)
+                FROM business_visits
+                GROUP BY 1, 2, 3
+            """)
+
+
+def timeseries(conn: sqlite3.Connection,
+               granularity: str = 'day',
+               date_from: Optional[str] = None,
+               date_to: Optional[str] = None,
+               by: Iterable[str] = DIMENSIONS,
+               zip_code: Optional[str] = None,
+               status: Optional[str] = None) -> List[Dict]:
+    """
+    Visit counts per period from the rollup tables.
+
+    Args:
+        conn: Open connection
+        granularity: 'day' or 'week' (weeks start Monday)
+        date_from, date_to: Inclusive YYYY-MM-DD bounds on the period
+        by: Dimensions to keep - any of 'zip', 'status'; others are summed away
+        zip_code, status: Optional filters
+
+    Returns:
+        [{'period': ..., 'zip': ..., 'status': ..., 'visits': n}, ...] ordered by period
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    by = [d for d in DIMENSIONS if d in set(by)]
+    table, period, _ = GRANULARITIES[granularity]
+
+    where, params = [], []
+    if date_from:
+        where.append(f"{period} >= ?")
+        params.append(date_from)
+    if date_to:
+        where.append(f"{period} <= ?")
+        params.append(date_to)
+    if zip_code:
+        where.append("zip_code = ?")
+        params.append(zip_code)
+    if status:
+        where.append("visit_status = ?")
+        params.append(status)
+
+    group_cols = [period] + [_DIM_COLUMNS[d] for d in by]
+    sql = f"""
+        SELECT {', '.join(group_cols)}, SUM(visits)
+        FROM {table}
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        GROUP BY {', '.join(group_cols)}
+        ORDER BY {', '.join(group_cols)}
+    """
+
+    series = []
+    for row in conn.execute(sql, params).fetchall():
+        point = {'period': row[0]}
+        for i, dim in enumerate(by, start=1):
+            point[dim] = row[i]
+        point['visits'] = row[-1]
+        series.append(point)
+    return series
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        conn.executescript(SCHEMA)
+        rebuild(conn)
+        print("Rollups rebuilt")
+    else:
+        ensure_schema(conn)
+        granularity = sys.argv[1] if len(sys.argv) > 1 else 'week'
+        for point in timeseries(conn, granularity, by=()):
+            print(f"{point['period']}  {point['visits']}")
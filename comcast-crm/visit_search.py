@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Visit Search - SQLite FTS5 index over business visits
+External-content FTS5 table kept in sync with business_visits by triggers,
+queried with prefix matching, BM25 ranking and highlighted snippets.
+"""
+
+import re
+import sqlite3
+import sys
+from typing import Dict, List, Optional
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS visits_fts USING fts5(
+    business_name, contact_name, notes, address, city,
+    content='business_visits',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_visits_fts_insert
+AFTER INSERT ON business_visits
+BEGIN
+    INSERT INTO visits_fts (rowid, business_name, contact_name, notes, address, city)
+    VALUES (NEW.id, NEW.business_name, NEW.contact_name, NEW.notes, NEW.address, NEW.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_visits_fts_delete
+AFTER DELETE ON business_visits
+BEGIN
+    INSERT INTO visits_fts (visits_fts, rowid, business_name, contact_name, notes, address, city)
+    VALUES ('delete', OLD.id, OLD.business_name, OLD.contact_name, OLD.notes, OLD.address, OLD.city);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_visits_fts_update
+AFTER UPDATE OF business_name, contact_name, notes, address, city ON business_visits
+BEGIN
+    INSERT INTO visits_fts (visits_fts, rowid, business_name, contact_name, notes, address, city)
+    VALUES ('delete', OLD.id, OLD.business_name, OLD.contact_name, OLD.notes, OLD.address, OLD.city);
+    INSERT INTO visits_fts (rowid, business_name, contact_name, notes, address, city)
+    VALUES (NEW.id, NEW.business_name, NEW.contact_name, NEW.notes, NEW.address, NEW.city);
+END;
+"""
+
+# BM25 column weights: business_name, contact_name, notes, address, city
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0, 2.0, 1.0)
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create the FTS table and sync triggers; a newly created index is populated from business_visits"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'visits_fts'"
+    ).fetchone()
+    conn.executescript(SCHEMA)
+    if not exists:
+        rebuild(conn)
+
+
+def rebuild(conn: sqlite3.Connection):
+    """Rebuild the FTS index from the content table"""
+    with conn:
+        conn.execute("INSERT INTO visits_fts (visits_fts) VALUES ('rebuild')")
+
+
+def build_match_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression.
+    Every word must match; each word is quoted (so FTS operators in user
+    input are inert) and prefix-matched: 'joe piz' -> '"joe"* "piz"*'
+    """
+    return ' '.join(f'"{term}"*' for term in _TERM.findall(text))
+
+
+def search_visits(conn: sqlite3.Connection, text: str,
+                  zip_code: Optional[str] = None,
+                  status: Optional[str] = None,
+                  limit: int = 25) -> List[Dict]:
+    """
+    Full-text search over visits.
+
+    Args:
+        conn: Open connection
+        text: Free text, e.g. "yana heating" or "vash"
+        zip_code: Optional zip filter
+        status: Optional visit_status filter
+        limit: Max results
+
+    Returns:
+        Visits ordered by BM25 rank (best first), each with a highlighted snippet
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+    sql = f"""
+        SELECT v.id, v.business_name, v.contact_name, v.phone, v.email,
+               v.address, v.city, v.zip_code, v.lat, v.lng, v.visit_status, v.visit_date,
+               snippet(visits_fts, -1, '<mark>', '</mark>', '…', 12) AS snippet,
+               bm25(visits_fts, {weights}) AS rank
+        FROM visits_fts
+        JOIN business_visits v ON v.id = visits_fts.rowid
+        WHERE visits_fts MATCH ?
+    """
+    params = [match]
+    if zip_code:
+        sql += " AND v.zip_code = ?"
+        params.append(zip_code)
+    if status:
+        sql += " AND v.visit_status = ?"
+        params.append(status)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+
+    results = []
+    for row in conn.execute(sql, params).fetchall():
+        results.append({
+            '_id': str(row[0]),
+            'businessName': row[1],
+            'contactName': row[2],
+            'phone': row[3],
+            'email': row[4],
+            'address': row[5],
+            'city': row[6],
+            'zip': row[7],
+            'lat': row[8],
+            'lng': row[9],
+            'status': row[10],
+            'visitDate': row[11],
+            'snippet': row[12],
+            'score': round(-row[13], 4),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    from config import DB_PATH
+
+    conn = sqlite3.connect(DB_PATH)
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        conn.executescript(SCHEMA)
+        rebuild(conn)
+        print("FTS index rebuilt")
+    elif len(sys.argv) > 2 and sys.argv[1] == "search":
+        ensure_schema(conn)
+        for visit in search_visits(conn, ' '.join(sys.argv[2:])):
+            print(f"{visit['score']:8.3f}  {visit['businessName']} ({visit['zip']}) - {visit['snippet']}")
+    else:
+        print("Usage: python3 visit_search.py [rebuild|search <text>]")